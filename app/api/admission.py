@@ -0,0 +1,159 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+
+from app.observability.metrics import REGISTRY
+
+
+SHED = REGISTRY.counter(
+    "admission_shed_total", "Requests rejected before the pipeline", ["reason"]
+)
+QUEUE_SECONDS = REGISTRY.histogram(
+    "admission_queue_seconds", "Time an admitted request waited for a slot"
+)
+
+
+class Overloaded(RuntimeError):
+    """No slot within the request's budget; retry_after is the expected wait in seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Per-client token buckets: `rate` requests per second, bursts up to `burst`.
+
+    - rate <= 0 disables limiting
+    - buckets of the least recently seen clients are dropped past
+      max_clients; a dropped client starts again with a full bucket
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """0.0 when the request may proceed, otherwise seconds until the next token."""
+        if self.rate <= 0:
+            return 0.0
+
+        now = self._clock()
+        tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        wait = 0.0 if tokens >= 1.0 else (1.0 - tokens) / self.rate
+        if not wait:
+            tokens -= 1.0
+
+        self._buckets[client] = (tokens, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded FIFO queue, for one event loop.
+
+    - up to max_concurrency requests run; up to max_queue more wait for
+      a slot, each at most queue_timeout or its own (shorter) budget
+    - a request whose expected wait already exceeds its budget, or that
+      finds the queue full, is rejected at once instead of queueing
+    - the expected wait comes from a moving average of slot hold times
+    - max_concurrency <= 0 admits everything
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._service: Optional[float] = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        if self._service is None or self.max_concurrency <= 0:
+            return 0.0
+        return (len(self._waiters) + 1) * self._service / self.max_concurrency
+
+    def _shed(self, reason: str) -> Overloaded:
+        SHED.labels(reason=reason).inc()
+        return Overloaded(reason, self.expected_wait())
+
+    async def acquire(self, timeout: Optional[float] = None) -> float:
+        """Take a slot, waiting in line if needed; returns the seconds spent waiting."""
+        if self.max_concurrency <= 0:
+            return 0.0
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return 0.0
+
+        budget = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        if len(self._waiters) >= self.max_queue:
+            raise self._shed("queue_full")
+        if budget <= 0 or self.expected_wait() > budget:
+            raise self._shed("deadline")
+
+        slot = asyncio.get_running_loop().create_future()
+        self._waiters.append(slot)
+        started = self._clock()
+        try:
+            await asyncio.wait_for(slot, budget)
+        except BaseException as error:
+            if slot.done() and not slot.cancelled():
+                # Handed a slot just as the wait ended: pass it on
+                self.release()
+            elif slot in self._waiters:
+                self._waiters.remove(slot)
+            if isinstance(error, asyncio.TimeoutError):
+                raise self._shed("queue_timeout") from None
+            raise
+
+        waited = self._clock() - started
+        QUEUE_SECONDS.labels().observe(waited)
+        return waited
+
+    def release(self, held: Optional[float] = None) -> None:
+        """Give a slot back, handing it straight to the oldest waiter if any."""
+        if self.max_concurrency <= 0:
+            return
+        if held is not None:
+            self._service = held if self._service is None else 0.8 * self._service + 0.2 * held
+
+        while self._waiters:
+            slot = self._waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[float]:
+        waited = await self.acquire(timeout)
+        started = self._clock()
+        try:
+            yield waited
+        finally:
+            self.release(self._clock() - started)
+
+    def stats(self) -> dict:
+        return {"active": self.active, "queued": len(self._waiters)}
@@ -1,14 +1,116 @@
-from fastapi import FastAPI
+import asyncio
+import hmac
+import json
+import math
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import Optional
 
-from app.main import handle_request
+from app import executors
+from app.api.admission import SHED, AdmissionController, Overloaded, RateLimiter
+from app.audit.logger import close_audit
+from app.config import settings
+from app.embeddings.factory import warm_encoders
+from app.executors import run_io
+from app.main import StreamedRequest, classify_query, handle_request_async, policy_blocks
+from app.observability.metrics import REGISTRY
+from app.retrieval import retriever
+
+
+FAST_PATH = REGISTRY.counter(
+    "admission_fast_path_total", "Policy-blocked requests answered without queueing"
+)
+
+# Per worker: each process admits its own share of the traffic
+_admission = AdmissionController(
+    settings.admission_max_concurrency,
+    settings.admission_max_queue,
+    settings.admission_queue_timeout,
+)
+_limiter = RateLimiter(settings.rate_limit_rps, settings.rate_limit_burst)
+
+
+def _collect_metrics():
+    stats = _admission.stats()
+    yield "admission_active", "gauge", "Admitted /query requests running", [({}, stats["active"])]
+    yield "admission_queued", "gauge", "/query requests waiting for a slot", [({}, stats["queued"])]
+
+
+REGISTRY.register_collector(_collect_metrics)
+
+
+def _retry_after(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+def _client_id(request: Request, client_id: Optional[str]) -> str:
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "unknown"
+
+
+def _precheck(request: Request, payload, client_id: Optional[str]) -> tuple:
+    """Readiness and the client's rate limit, then stages 1-2: (risk, policy)."""
+    if not _warmup_state(request)[0]:
+        raise HTTPException(status_code=503, detail="Warming up", headers={"Retry-After": "1"})
+
+    wait = _limiter.take(_client_id(request, client_id))
+    if wait:
+        SHED.labels(reason="rate_limited").inc()
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers=_retry_after(wait))
+
+    return classify_query(payload.query)
+
+
+def _overloaded(error: Overloaded) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(error), headers=_retry_after(error.retry_after))
+
+
+def warm_up_encoders() -> None:
+    """Load the default encoder and any configured overrides."""
+    models = [None] + [
+        m.strip() for m in settings.embedding_warm_models.split(",") if m.strip()
+    ]
+    warm_encoders(models)
+
+
+def _warm_up() -> None:
+    warm_up_encoders()
+    retriever.warm_up()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: the process starts listening at once,
+    # /ready reports 200 once encoders and indexes are loaded
+    app.state.warmup = asyncio.create_task(run_io(_warm_up))
+    yield
+    # Drain queued audit records before the pools go away
+    close_audit()
+    executors.shutdown()
+
+
+def _warmup_state(request: Request) -> tuple[bool, Optional[str]]:
+    warmup = getattr(request.app.state, "warmup", None)
+    if warmup is None or not warmup.done():
+        return False, None
+    if warmup.cancelled():
+        return False, "warmup cancelled"
+    error = warmup.exception()
+    return error is None, None if error is None else f"{type(error).__name__}: {error}"
+
 
 app = FastAPI(
     title="LLM Control Plane API",
     description="Controlled, auditable inference backend",
     version="0.4.0",
+    lifespan=lifespan,
 )
 
 # Enable CORS for frontend communication
@@ -26,13 +128,105 @@ class QueryRequest(BaseModel):
     embedding_model: Optional[str] = None  # NEW
 
 
+@app.get("/ready")
+def ready(request: Request):
+    """Readiness probe: 503 until warmup has loaded encoders and indexes."""
+    is_ready, error = _warmup_state(request)
+    body = {"ready": is_ready} if error is None else {"ready": False, "error": error}
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
+
 @app.post("/query")
-def query_control_plane(payload: QueryRequest):
+async def query_control_plane(
+    payload: QueryRequest,
+    request: Request,
+    x_client_id: Optional[str] = Header(default=None),
+    x_request_timeout: Optional[float] = Header(default=None),
+):
+    """
+    Thin HTTP adapter with admission control.
+
+    - 429 when the client is over its rate limit
+    - policy-blocked requests are answered at once: they never
+      touch the encoder or vector store, so they do not queue
+    - others wait for a slot, at most X-Request-Timeout seconds;
+      503 with Retry-After when the queue is full or too slow
+    """
+    classified = _precheck(request, payload, x_client_id)
+    if policy_blocks(classified[1]):
+        FAST_PATH.labels().inc()
+        return await handle_request_async(payload.query, payload.embedding_model, classified)
+
+    try:
+        async with _admission.slot(x_request_timeout):
+            return await handle_request_async(payload.query, payload.embedding_model, classified)
+    except Overloaded as error:
+        raise _overloaded(error)
+
+
+async def _sse(events):
+    try:
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    except Exception as error:
+        yield f"event: error\ndata: {json.dumps({'error': type(error).__name__})}\n\n"
+
+
+@app.post("/query/stream")
+async def query_stream(
+    payload: QueryRequest,
+    request: Request,
+    x_client_id: Optional[str] = Header(default=None),
+    x_request_timeout: Optional[float] = Header(default=None),
+):
     """
-    Thin HTTP adapter.
-    No logic lives here.
+    /query as server-sent events, one per stage as it completes:
+    risk, policy, retrieval, confidence, decision, answer, done.
+
+    Same admission rules; the slot is held until the request's audit
+    record is written, which happens after the last event is sent.
     """
-    return handle_request(
-        user_query=payload.query,
-        embedding_model=payload.embedding_model,
+    classified = _precheck(request, payload, x_client_id)
+    admitted = not policy_blocks(classified[1])
+    if admitted:
+        try:
+            await _admission.acquire(x_request_timeout)
+        except Overloaded as error:
+            raise _overloaded(error)
+    else:
+        FAST_PATH.labels().inc()
+
+    try:
+        stream = StreamedRequest(payload.query, payload.embedding_model, classified)
+    except BaseException:
+        if admitted:
+            _admission.release()
+        raise
+    if admitted:
+        started = time.monotonic()
+        stream.task.add_done_callback(lambda _: _admission.release(time.monotonic() - started))
+
+    # close() runs after the response, even if the body was never iterated
+    return StreamingResponse(
+        _sse(stream.events()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(stream.close),
     )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of pipeline, encoder and audit metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/reload")
+async def admin_reload(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Re-read the knowledge base source and apply the difference in place.
+    Only this worker reloads; with several workers, call each one.
+    """
+    if settings.admin_token and not hmac.compare_digest(x_admin_token or "", settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    return await run_io(retriever.reload_knowledge_base)
@@ -0,0 +1,222 @@
+"""
+Multi-process serving over one shared index.
+
+    python -m app.api.supervisor --workers 4 --port 8000
+
+- the supervisor loads the encoders (no inference) and has a short-lived
+  builder process encode the corpus straight into shared memory
+- workers are forked afterwards: they share the encoder weights
+  copy-on-write and attach the published vectors without copying or
+  re-encoding, so memory grows with models, not with workers
+- SIGHUP publishes a new index generation from the document source
+  (the embedding cache keeps unchanged documents free) and replaces
+  workers one at a time; the old generation is unlinked once the last
+  worker using it has exited
+- SIGTERM/SIGINT stop every worker gracefully; a worker that dies is
+  replaced
+POSIX only (fork).
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import socket
+import sys
+import time
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Serve the API from several workers sharing one index")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--ready-timeout", type=float, default=60.0, help="seconds to wait for a new worker")
+    parser.add_argument("--grace", type=float, default=30.0, help="seconds a stopping worker may drain")
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args()
+
+
+def _log(message: str) -> None:
+    print(f"supervisor[{os.getpid()}]: {message}", file=sys.stderr, flush=True)
+
+
+def _build(name: str, conn) -> None:
+    """Builder process: encode the corpus into a new shared segment and send back its handle."""
+    from app.config import settings
+    from app.embeddings.factory import get_embedding_encoder
+    from app.retrieval.index import content_hash
+    from app.retrieval.retriever import source_documents
+    from app.vectorstore.shm_store import build_shared_index
+
+    try:
+        documents = source_documents()
+        handle = build_shared_index(
+            [doc.id for doc in documents],
+            [doc.content for doc in documents],
+            [content_hash(doc.content) for doc in documents],
+            get_embedding_encoder(),
+            name,
+            settings.embedding_dim,
+        )
+        conn.send(handle)
+    except Exception as error:
+        conn.send(RuntimeError(f"{type(error).__name__}: {error}"))
+    finally:
+        conn.close()
+
+
+def _serve(sock: socket.socket, handle, ready, log_level: str) -> None:
+    """Worker process: attach the shared index, warm up, then serve on the inherited socket."""
+    for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+
+    import uvicorn
+
+    from app.api.server import app
+    from app.retrieval import retriever
+    from app.vectorstore.shm_store import set_shared_index
+
+    set_shared_index(handle)
+    retriever.warm_up()
+    ready.set()
+
+    uvicorn.Server(uvicorn.Config(app, log_level=log_level)).run(sockets=[sock])
+
+
+class Supervisor:
+    def __init__(self, args, sock: socket.socket):
+        self.args = args
+        self.sock = sock
+        self.ctx = mp.get_context("fork")
+        self.handle = None
+        self.workers: list = []
+        self._generation = 0
+        self._stop = False
+        self._reload = False
+
+    def _publish(self):
+        self._generation += 1
+        name = f"lcp-{os.getpid()}-{self._generation}"
+        receiver, sender = self.ctx.Pipe(duplex=False)
+        builder = self.ctx.Process(target=_build, args=(name, sender), name="index-builder")
+
+        started = time.perf_counter()
+        builder.start()
+        sender.close()
+        try:
+            result = receiver.recv()
+        except EOFError:
+            result = RuntimeError(f"index builder exited with code {builder.exitcode}")
+        finally:
+            receiver.close()
+            builder.join()
+
+        if isinstance(result, BaseException):
+            raise result
+
+        _log(f"published {name}: {result.count} rows in {time.perf_counter() - started:.1f}s")
+        return result
+
+    def _spawn(self):
+        ready = self.ctx.Event()
+        worker = self.ctx.Process(
+            target=_serve, args=(self.sock, self.handle, ready, self.args.log_level), name="api-worker"
+        )
+        worker.start()
+        return worker, ready
+
+    def _stop_worker(self, worker) -> None:
+        worker.terminate()  # SIGTERM: uvicorn finishes in-flight requests
+        worker.join(self.args.grace)
+        if worker.is_alive():
+            worker.kill()
+            worker.join()
+
+    def _rolling_restart(self) -> None:
+        from app.vectorstore.shm_store import unlink_shared_index
+
+        try:
+            handle = self._publish()
+        except Exception as error:
+            _log(f"rebuild failed, keeping the current index: {error}")
+            return
+
+        previous, self.handle = self.handle, handle
+        for i, (worker, _) in enumerate(list(self.workers)):
+            if self._stop:
+                break
+            replacement = self._spawn()
+            if not replacement[1].wait(self.args.ready_timeout):
+                _log(f"worker {replacement[0].pid} not ready after {self.args.ready_timeout}s")
+            self._stop_worker(worker)
+            self.workers[i] = replacement
+
+        # Workers keep their mapping after unlink; the name just disappears
+        unlink_shared_index(previous)
+        _log(f"workers now serve generation {self._generation}")
+
+    def run(self) -> int:
+        from app.api.server import warm_up_encoders
+        from app.vectorstore.shm_store import unlink_shared_index
+
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "_reload", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "_stop", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "_stop", True))
+
+        # Loaded before any fork so builder and workers share the weights;
+        # the supervisor itself never runs inference
+        warm_up_encoders()
+        self.handle = self._publish()
+
+        try:
+            self.workers = [self._spawn() for _ in range(max(1, self.args.workers))]
+            _log(f"serving on {self.args.host}:{self.args.port} with {len(self.workers)} workers")
+
+            while not self._stop:
+                if self._reload:
+                    self._reload = False
+                    self._rolling_restart()
+
+                for i, (worker, _) in enumerate(self.workers):
+                    if not worker.is_alive() and not self._stop:
+                        _log(f"worker {worker.pid} exited with code {worker.exitcode}; restarting")
+                        self.workers[i] = self._spawn()
+                time.sleep(0.2)
+        finally:
+            for worker, _ in self.workers:
+                self._stop_worker(worker)
+            unlink_shared_index(self.handle)
+            _log("stopped")
+        return 0
+
+
+def main() -> int:
+    args = _parse_args()
+
+    # Settings are read at import time: configure before importing app
+    os.environ["VECTOR_STORE"] = "shared"
+
+    # Make sure the resource tracker belongs to the supervisor, not to a
+    # short-lived builder that would take the shared segments with it
+    from multiprocessing import resource_tracker
+
+    resource_tracker.ensure_running()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Imported once here so forked workers start with every module loaded
+    import app.api.server  # noqa: F401
+
+    try:
+        return Supervisor(args, sock).run()
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Query the audit trail.
+
+    python -m app.audit get <request_id>
+    python -m app.audit find --since 1h --reason-code POLICY_BLOCK --limit 20
+    python -m app.audit count --by decision,risk_category --since 24h
+    python -m app.audit reindex     # index closed segments written before indexing
+
+Records are printed as JSON lines; counts as one JSON object per group.
+"""
+
+import argparse
+import json
+import sys
+
+from app.audit.index import SUMMARY_FIELDS, index_segment, load_index
+from app.audit.query import count_records, find_records, get_record, parse_time
+from app.audit.reader import segment_paths
+from app.audit.writer import SEGMENT_PREFIX
+from app.config import settings
+
+
+def _add_filters(parser) -> None:
+    parser.add_argument("--since", type=parse_time, help="ISO timestamp or age (30m, 1h, 7d)")
+    parser.add_argument("--until", type=parse_time, help="ISO timestamp or age, exclusive")
+    for field in SUMMARY_FIELDS:
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(prog="python -m app.audit", description="Query the audit trail")
+    parser.add_argument("--dir", default=settings.log_dir, help=f"audit directory (default: {settings.log_dir})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    get = commands.add_parser("get", help="print the record of one request")
+    get.add_argument("request_id")
+
+    find = commands.add_parser("find", help="print matching records, oldest first")
+    _add_filters(find)
+    find.add_argument("--limit", type=int)
+
+    count = commands.add_parser("count", help="count records per group")
+    _add_filters(count)
+    count.add_argument("--by", default="decision", help=f"comma-separated, from {','.join(SUMMARY_FIELDS)}")
+
+    reindex = commands.add_parser("reindex", help="write missing sidecar indexes for closed segments")
+    reindex.add_argument("--compress", action="store_true", help="also gzip plain closed segments")
+
+    return parser.parse_args()
+
+
+def _filters(args) -> dict:
+    return {field: getattr(args, field) for field in SUMMARY_FIELDS if getattr(args, field)}
+
+
+def main() -> int:
+    args = _parse_args()
+    out = sys.stdout
+
+    try:
+        if args.command == "get":
+            record = get_record(args.dir, args.request_id)
+            if record is None:
+                print(f"audit: no record for {args.request_id}", file=sys.stderr)
+                return 1
+            out.write(json.dumps(record, ensure_ascii=False, indent=2) + "\n")
+
+        elif args.command == "find":
+            for record in find_records(args.dir, args.since, args.until, args.limit, **_filters(args)):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        elif args.command == "count":
+            by = [field.strip() for field in args.by.split(",") if field.strip()]
+            counts = count_records(args.dir, by, args.since, args.until, **_filters(args))
+            for group, count in counts.items():
+                out.write(json.dumps({**dict(zip(by, group)), "count": count}) + "\n")
+
+        else:
+            indexed = 0
+            for path in segment_paths(args.dir):
+                if path.name.startswith(SEGMENT_PREFIX) and load_index(path) is None:
+                    index_segment(path, compress=args.compress)
+                    indexed += 1
+            print(f"audit: indexed {indexed} segments", file=sys.stderr)
+    except ValueError as error:
+        print(f"audit: {error}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Sidecar indexes for closed audit segments.
+
+<segment>.idx holds one JSON header line followed by two tables:
+  records  one row per record in file order: timestamp, summary
+           (decision, reason code, risk category, embedding model)
+           and the record's position in the segment
+  ids      blake2b-8 of each request_id -> record row, sorted
+
+Compressed segments are written as a series of independent gzip
+members (still one valid .gz file): a position is the member's byte
+offset plus the record's offset inside it, so a reader decompresses
+one member instead of the whole segment.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.fileutils import fsync_dir
+
+
+INDEX_VERSION = 1
+SUMMARY_FIELDS = ("decision", "reason_code", "risk_category", "embedding_model")
+
+_RECORD = np.dtype([("ts", "<f8"), ("summary", "<u4"), ("block", "<u8"), ("offset", "<u8")])
+_ID = np.dtype([("key", "<u8"), ("row", "<u4")])
+_BLOCK_BYTES = 256 * 1024
+
+
+def _nested(record: dict, field: str, key: str):
+    value = record.get(field)
+    return value.get(key) if isinstance(value, dict) else None
+
+
+def summarize(record: dict) -> Tuple[str, ...]:
+    """(decision, reason_code, risk_category, embedding_model); older records fill in what they have."""
+    response = record.get("response") if isinstance(record.get("response"), dict) else {}
+    return (
+        _nested(record, "decision", "decision") or response.get("status") or response.get("decision") or "unknown",
+        _nested(record, "decision", "reason_code") or response.get("reason_code") or "unknown",
+        _nested(record, "risk", "category") or "unknown",
+        record.get("embedding_model") or "unknown",
+    )
+
+
+def timestamp_of(record: dict) -> float:
+    """Epoch seconds of the record's timestamp; naive timestamps are UTC, missing ones 0."""
+    try:
+        moment = datetime.fromisoformat(str(record["timestamp"]))
+    except (KeyError, ValueError):
+        return 0.0
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def id_key(request_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(request_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def index_path(segment: Path) -> Path:
+    name = segment.name
+    for suffix in (".log.gz", ".log"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+            break
+    return segment.with_name(name + ".idx")
+
+
+def _source_lines(path: Path) -> Iterator[bytes]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        yield from f
+
+
+def index_segment(path: str | Path, compress: bool = False) -> Path:
+    """
+    Write the sidecar index of a closed segment and return the data file
+    it describes. compress=True turns a .log into a member-blocked .log.gz
+    (the .log is removed once both files are durable); a .gz is always
+    rewritten member-blocked. The index is derived data: rebuilding it is
+    always safe.
+    """
+    path = Path(path)
+    compress = compress or path.suffix == ".gz"
+    target = path if path.suffix == ".gz" or not compress else path.with_name(path.name + ".gz")
+    tmp = target.with_name(target.name + ".tmp")
+
+    ts, summaries, blocks, offsets, keys = [], [], [], [], []
+    combos: dict = {}
+
+    out = tmp.open("wb") if compress else None
+    block_at, block = 0, bytearray()
+
+    def flush_block():
+        nonlocal block_at, block
+        if block:
+            member = gzip.compress(bytes(block), mtime=0)
+            out.write(member)
+            block_at += len(member)
+            block = bytearray()
+
+    position = 0
+    try:
+        for line in _source_lines(path):
+            if compress and len(block) >= _BLOCK_BYTES:
+                flush_block()
+            here = (block_at, len(block)) if compress else (0, position)
+            position += len(line)
+            if compress:
+                block += line
+
+            stripped = line.strip()
+            if not stripped:
+                continue
+            try:
+                record = json.loads(stripped)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+
+            ts.append(timestamp_of(record))
+            summaries.append(combos.setdefault(summarize(record), len(combos)))
+            blocks.append(here[0])
+            offsets.append(here[1])
+            request_id = record.get("request_id")
+            if isinstance(request_id, str):
+                keys.append((id_key(request_id), len(ts) - 1))
+
+        if compress:
+            flush_block()
+            out.flush()
+            os.fsync(out.fileno())
+            out.close()
+    except BaseException:
+        if compress:
+            out.close()
+            tmp.unlink(missing_ok=True)
+        raise
+
+    records = np.zeros(len(ts), dtype=_RECORD)
+    records["ts"], records["summary"], records["block"], records["offset"] = ts, summaries, blocks, offsets
+    ids = np.array(sorted(keys), dtype=_ID)
+
+    counts = np.bincount(records["summary"], minlength=len(combos)) if len(records) else np.zeros(len(combos))
+    header = {
+        "version": INDEX_VERSION,
+        "segment": target.name,
+        "size": (tmp if compress else target).stat().st_size,
+        "compressed": compress,
+        "count": len(records),
+        "min_ts": float(records["ts"].min()) if len(records) else 0.0,
+        "max_ts": float(records["ts"].max()) if len(records) else 0.0,
+        "fields": list(SUMMARY_FIELDS),
+        "summaries": [[list(combo), int(count)] for combo, count in zip(combos, counts)],
+    }
+
+    sidecar = index_path(target)
+    sidecar_tmp = sidecar.with_name(sidecar.name + ".tmp")
+    with sidecar_tmp.open("wb") as f:
+        f.write(json.dumps(header).encode("utf-8") + b"\n")
+        f.write(records.tobytes())
+        f.write(ids.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    if compress:
+        os.replace(tmp, target)
+    os.replace(sidecar_tmp, sidecar)
+    fsync_dir(target.parent)
+    if target != path:
+        path.unlink()
+    return target
+
+
+class SegmentIndex:
+    """Read side of a sidecar; the tables are memory-mapped, not loaded."""
+
+    def __init__(self, sidecar: Path):
+        with sidecar.open("rb") as f:
+            line = f.readline()
+        self.header = json.loads(line)
+        self.path = sidecar.with_name(self.header["segment"])
+        self.compressed = self.header["compressed"]
+        self.count = self.header["count"]
+        self.summaries = [tuple(combo) for combo, _ in self.header["summaries"]]
+        self.summary_counts = [count for _, count in self.header["summaries"]]
+
+        size = sidecar.stat().st_size
+        records_at = len(line)
+        ids_at = records_at + self.count * _RECORD.itemsize
+        if size < ids_at or (size - ids_at) % _ID.itemsize:
+            raise ValueError(f"Truncated audit index: {sidecar}")
+        self.records = _table(sidecar, _RECORD, records_at, self.count)
+        self.ids = _table(sidecar, _ID, ids_at, (size - ids_at) // _ID.itemsize)
+
+    @property
+    def min_ts(self) -> float:
+        return self.header["min_ts"]
+
+    @property
+    def max_ts(self) -> float:
+        return self.header["max_ts"]
+
+    def is_current(self) -> bool:
+        """False once the data file is gone or no longer the one indexed."""
+        try:
+            return self.path.stat().st_size == self.header["size"]
+        except FileNotFoundError:
+            return False
+
+    def rows_for(self, request_id: str) -> np.ndarray:
+        key = np.uint64(id_key(request_id))
+        lo = np.searchsorted(self.ids["key"], key, side="left")
+        hi = np.searchsorted(self.ids["key"], key, side="right")
+        return np.asarray(self.ids["row"][lo:hi])
+
+    def read_rows(self, rows) -> Iterator[dict]:
+        """Records at the given rows, in row order; one member decompressed per block."""
+        with self.path.open("rb") as f:
+            if not self.compressed:
+                for row in sorted(rows):
+                    f.seek(int(self.records["offset"][row]))
+                    yield json.loads(f.readline())
+                return
+
+            current, data = None, b""
+            for row in sorted(rows):
+                block = int(self.records["block"][row])
+                if block != current:
+                    current, data = block, _read_member(f, block)
+                start = int(self.records["offset"][row])
+                end = data.find(b"\n", start)
+                yield json.loads(data[start:end if end >= 0 else len(data)])
+
+
+def _table(path: Path, dtype: np.dtype, offset: int, count: int) -> np.ndarray:
+    if not count:
+        return np.zeros(0, dtype=dtype)  # numpy cannot map an empty range
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+
+
+def _read_member(f, offset: int) -> bytes:
+    """Decompress the single gzip member that starts at offset."""
+    f.seek(offset)
+    decompressor = zlib.decompressobj(wbits=31)
+    out: List[bytes] = []
+    while not decompressor.eof:
+        chunk = f.read(64 * 1024)
+        if not chunk:
+            break
+        out.append(decompressor.decompress(chunk))
+    return b"".join(out)
+
+
+def load_index(segment: Path) -> Optional[SegmentIndex]:
+    """The segment's sidecar if it exists and still describes it."""
+    sidecar = index_path(segment)
+    if not sidecar.exists():
+        return None
+    try:
+        index = SegmentIndex(sidecar)
+    except (ValueError, OSError):
+        return None
+    if index.path != segment or not index.is_current():
+        return None
+    return index
@@ -1,17 +1,85 @@
-import json
+import atexit
+import threading
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
+from app.audit.writer import AuditWriter
 from app.config import settings
+from app.executors import run_io
+from app.observability.metrics import REGISTRY
 
 
 LOG_DIR = Path(settings.log_dir)
 LOG_DIR.mkdir(exist_ok=True)
 
+_writer: Optional[AuditWriter] = None
+_writer_lock = threading.Lock()
 
-def audit_log(**record: Any) -> None:
+
+def get_audit_writer() -> AuditWriter:
+    """Process-wide audit writer, started on first use and flushed at exit."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditWriter(
+                    LOG_DIR,
+                    queue_size=settings.audit_queue_size,
+                    flush_interval=settings.audit_flush_interval,
+                    max_bytes=settings.audit_max_bytes,
+                    max_age=settings.audit_max_age,
+                    compress=settings.audit_compress,
+                    backpressure=settings.audit_backpressure,
+                    fsync=settings.audit_fsync,
+                )
+                atexit.register(_writer.close)
+    return _writer
+
+
+def _stamp(record: dict) -> dict:
     record["schema_version"] = "v1"
-    log_file = LOG_DIR / "audit.log"
+    return record
+
+
+def audit_log(**record: Any) -> None:
+    """Enqueue one audit record; it is durable after the next group commit or flush_audit()."""
+    get_audit_writer().write(_stamp(record))
+
+
+async def audit_log_async(**record: Any) -> None:
+    """audit_log without blocking the event loop, even when the queue is full."""
+    writer = get_audit_writer()
+    record = _stamp(record)
+    if not writer.try_write(record):
+        await run_io(writer.write, record)
+
+
+def flush_audit(timeout: Optional[float] = None) -> bool:
+    """Wait until every record logged so far is fsynced."""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout)
+
+
+def close_audit(timeout: Optional[float] = None) -> None:
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close(timeout)
+            _writer = None
+
+
+def _collect_metrics():
+    if _writer is None:
+        return
+    stats = _writer.stats()
+    yield "audit_queue_depth", "gauge", "Audit records waiting for commit", [({}, stats["queued"])]
+    yield "audit_records_written_total", "counter", "Audit records committed", [({}, stats["written"])]
+    yield "audit_commits_total", "counter", "Audit group commits", [({}, stats["batches"])]
+    yield "audit_records_spilled_total", "counter", "Audit records spilled under backpressure", [({}, stats["spilled"])]
+    yield "audit_rotations_total", "counter", "Audit segment rotations", [({}, stats["rotations"])]
+    yield "audit_commit_failures_total", "counter", "Audit batches whose commit failed", [({}, stats["commit_failures"])]
+    yield "audit_records_dropped_total", "counter", "Audit records neither committed nor spilled", [({}, stats["dropped"])]
+
 
-    with log_file.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+REGISTRY.register_collector(_collect_metrics)
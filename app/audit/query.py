@@ -0,0 +1,172 @@
+import json
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.audit.index import SUMMARY_FIELDS, load_index, summarize, timestamp_of
+from app.audit.reader import read_lines, segment_paths
+from app.audit.writer import SEGMENT_PREFIX
+
+
+_RELATIVE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: str, now: Optional[float] = None) -> float:
+    """ISO timestamp (naive = UTC) or an age such as 90s, 15m, 1h, 7d -> epoch seconds."""
+    match = _RELATIVE.match(value.strip())
+    if match:
+        return (time.time() if now is None else now) - float(match.group(1)) * _UNITS[match.group(2)]
+    try:
+        moment = datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"Expected an ISO timestamp or an age like 1h, got {value!r}")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _check(filters: Dict[str, str], by: Sequence[str] = ()) -> None:
+    unknown = (set(filters) | set(by)) - set(SUMMARY_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown audit fields {sorted(unknown)}; expected {SUMMARY_FIELDS}")
+
+
+def _wanted(summary: Tuple[str, ...], filters: Dict[str, str]) -> bool:
+    return all(summary[SUMMARY_FIELDS.index(field)] == value for field, value in filters.items())
+
+
+def _segments(directory: str | Path):
+    """(path, index or None) oldest first; closed segments use their sidecar when current."""
+    for path in segment_paths(directory):
+        index = load_index(path) if path.name.startswith(SEGMENT_PREFIX) else None
+        yield path, index
+
+
+def _scan(path: Path, needle: Optional[bytes] = None) -> Iterator[dict]:
+    """Records of an unindexed segment; needle skips lines that cannot match before parsing."""
+    for line in read_lines(path):
+        if needle is not None and needle not in line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            yield record
+
+
+def _in_range(ts: float, since: Optional[float], until: Optional[float]) -> bool:
+    return (since is None or ts >= since) and (until is None or ts < until)
+
+
+def _overlaps(index, since: Optional[float], until: Optional[float]) -> bool:
+    return (since is None or index.max_ts >= since) and (until is None or index.min_ts < until)
+
+
+def _rows(index, since, until, filters) -> np.ndarray:
+    """Rows of an indexed segment that match, from the record table alone."""
+    allowed = [i for i, summary in enumerate(index.summaries) if _wanted(summary, filters)]
+    if not allowed:
+        return np.zeros(0, dtype=np.int64)
+
+    records = index.records
+    mask = np.isin(records["summary"], allowed)
+    if since is not None:
+        mask &= records["ts"] >= since
+    if until is not None:
+        mask &= records["ts"] < until
+    return np.flatnonzero(mask)
+
+
+def get_record(directory: str | Path, request_id: str) -> Optional[dict]:
+    """
+    The audit record of one request. Indexed segments are looked up in
+    their sidecar and read at the record's position; the active segment
+    and unindexed ones are scanned for the id before any JSON is parsed.
+    """
+    needle = request_id.encode("utf-8")
+    for path, index in reversed(list(_segments(directory))):
+        if index is None:
+            records = _scan(path, needle)
+        else:
+            records = index.read_rows(index.rows_for(request_id))
+        for record in records:
+            if record.get("request_id") == request_id:
+                return record
+    return None
+
+
+def find_records(
+    directory: str | Path,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: Optional[int] = None,
+    **filters: str,
+) -> Iterator[dict]:
+    """
+    Records in [since, until) whose summary fields equal filters, oldest
+    first. Segments outside the range or without a matching summary are
+    skipped from their header; matches are read directly at their position.
+    """
+    _check(filters)
+    found = 0
+    for path, index in _segments(directory):
+        if index is None:
+            records = (
+                r for r in _scan(path)
+                if _in_range(timestamp_of(r), since, until) and _wanted(summarize(r), filters)
+            )
+        elif _overlaps(index, since, until):
+            records = index.read_rows(_rows(index, since, until, filters))
+        else:
+            continue
+
+        for record in records:
+            if limit is not None and found >= limit:
+                return
+            found += 1
+            yield record
+
+
+def count_records(
+    directory: str | Path,
+    by: Sequence[str] = ("decision",),
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    **filters: str,
+) -> Dict[Tuple[str, ...], int]:
+    """
+    Record counts grouped by summary fields. Indexed segments are counted
+    from their header or record table without reading the segment.
+    """
+    _check(filters, by)
+    columns = [SUMMARY_FIELDS.index(field) for field in by]
+    totals: Counter = Counter()
+
+    def add(summary, count):
+        if count and _wanted(summary, filters):
+            totals[tuple(summary[c] for c in columns)] += int(count)
+
+    for path, index in _segments(directory):
+        if index is None:
+            for record in _scan(path):
+                if _in_range(timestamp_of(record), since, until):
+                    add(summarize(record), 1)
+        elif not _overlaps(index, since, until):
+            continue
+        elif _in_range(index.min_ts, since, until) and _in_range(index.max_ts, since, until):
+            for summary, count in zip(index.summaries, index.summary_counts):
+                add(summary, count)
+        else:
+            rows = _rows(index, since, until, {})
+            counts = np.bincount(index.records["summary"][rows], minlength=len(index.summaries))
+            for summary, count in zip(index.summaries, counts):
+                add(summary, count)
+
+    return dict(totals.most_common())
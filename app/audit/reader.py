@@ -0,0 +1,45 @@
+import gzip
+import json
+from pathlib import Path
+from typing import Iterator, List
+
+from app.audit.writer import ACTIVE_SEGMENT, SEGMENT_PREFIX, SPILL_FILE
+
+
+def segment_paths(directory: str | Path) -> List[Path]:
+    """Closed segments oldest first, then the active segment and the spill file."""
+    directory = Path(directory)
+    closed = sorted(
+        p for p in directory.glob(f"{SEGMENT_PREFIX}*")
+        if p.name.endswith(".log") or p.name.endswith(".log.gz")
+    )
+    # A segment being compressed exists as both .log and .log.gz; read it once
+    names = {p.name for p in closed}
+    closed = [p for p in closed if not (p.suffix == ".log" and p.name + ".gz" in names)]
+
+    tail = [directory / ACTIVE_SEGMENT, directory / SPILL_FILE]
+    return closed + [p for p in tail if p.exists()]
+
+
+def read_lines(path: Path) -> Iterator[bytes]:
+    """Non-blank lines of one segment as bytes, streamed (plain or gzipped)."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def read_segment(path: Path) -> Iterator[dict]:
+    """Records of one segment; torn or blank lines are skipped."""
+    for line in read_lines(path):
+        try:
+            yield json.loads(line.decode("utf-8", errors="replace"))
+        except json.JSONDecodeError:
+            continue
+
+
+def iter_records(directory: str | Path) -> Iterator[dict]:
+    for path in segment_paths(directory):
+        yield from read_segment(path)
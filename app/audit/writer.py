@@ -0,0 +1,316 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from app.audit.index import index_segment
+from app.fileutils import FileLock, fsync_dir
+
+
+ACTIVE_SEGMENT = "audit.log"
+SPILL_FILE = "audit.spill.log"
+# Serialises commits and rotation across processes; holds the start
+# time of the active segment
+LOCK_FILE = "audit.lock"
+SEGMENT_PREFIX = "audit-"
+
+BACKPRESSURE_POLICIES = ("block", "spill")
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = True
+
+
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Background audit writer with group commit and rotation.
+
+    Callers enqueue records; one writer thread collects them for up to
+    flush_interval seconds and commits each batch with a single write
+    and fsync. The active segment (audit.log) is rotated when it exceeds
+    max_bytes or max_age seconds; closed segments are renamed to
+    audit-<UTC timestamp>.log, then indexed (audit-<stamp>.idx) and
+    optionally gzipped in the background.
+
+    Several processes (API workers) may share one directory: commits and
+    rotation take an exclusive lock on audit.lock, size and age are those
+    of the shared file, and a writer whose audit.log was rotated by
+    another process reopens it before writing.
+
+    Crash-safety guarantees:
+    - once flush() returns True, every record written before the call
+      is on disk (fsynced) and survives a process or OS crash
+    - a hard crash loses at most the records still queued, i.e. about
+      one flush_interval of traffic; nothing already committed is lost
+    - records are whole JSON lines; a crash during a write can only
+      leave a torn last line in audit.log, which is terminated on the
+      next start and skipped by readers
+    - closed segments are renamed before a new one is opened, and a
+      gzip copy replaces its source only after it and its index have
+      been fsynced
+    - when the queue is full, "block" makes callers wait; "spill"
+      makes callers append and fsync the record to audit.spill.log
+      themselves, so records are never dropped
+    - a failed commit (disk full, I/O error) does not stop the writer:
+      the batch goes to audit.spill.log instead, is only counted as
+      dropped if that fails too, and flush() then returns False
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        queue_size: int = 10_000,
+        flush_interval: float = 0.05,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age: float = 24 * 3600,
+        compress: bool = True,
+        backpressure: str = "block",
+        fsync: bool = True,
+    ):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown audit backpressure policy: {backpressure}")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.backpressure = backpressure
+        self.fsync = fsync
+
+        self.written = 0
+        self.batches = 0
+        self.spilled = 0
+        self.rotations = 0
+        self.commit_failures = 0
+        self.dropped = 0
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._spill_lock = threading.Lock()
+        self._indexers: list[threading.Thread] = []
+        # Held from the closed check to the enqueue, so nothing lands behind _STOP
+        self._state_lock = threading.Lock()
+        self._closed = False
+
+        self._lock = FileLock(self.directory / LOCK_FILE)
+        with self._lock:
+            self._open_segment()
+
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    # -- caller side ---------------------------------------------------------
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+
+        with self._state_lock:
+            if self._closed:
+                raise RuntimeError("AuditWriter is closed")
+            if self.backpressure == "block":
+                self._queue.put(line)
+                return
+            try:
+                self._queue.put_nowait(line)
+                return
+            except queue.Full:
+                pass
+        self._spill(line)
+
+    def try_write(self, record: dict) -> bool:
+        """Enqueue without blocking; False if the queue is full (nothing written)."""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._state_lock:
+            if self._closed:
+                raise RuntimeError("AuditWriter is closed")
+            try:
+                self._queue.put_nowait(line)
+            except queue.Full:
+                return False
+        return True
+
+    def _spill(self, line: str) -> None:
+        self._spill_lines([line.encode("utf-8")])
+
+    def _spill_lines(self, lines: list[bytes]) -> None:
+        with self._spill_lock:
+            with (self.directory / SPILL_FILE).open("ab") as f:
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self.spilled += len(lines)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until everything enqueued so far is committed. False on
+        timeout, or when records could be neither committed nor spilled.
+        """
+        if self._closed or not self._thread.is_alive():
+            return self._queue.empty()
+
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout) and marker.ok
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        if self._closed:
+            return
+
+        self.flush(timeout)
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            # Writers that got past the closed check have enqueued by now
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+        for thread in self._indexers:
+            thread.join(timeout)
+
+    # -- writer thread -------------------------------------------------------
+
+    def _open_segment(self) -> None:
+        """Open the current audit.log; called with the lock held."""
+        path = self.directory / ACTIVE_SEGMENT
+        self._file = path.open("ab")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._opened = self._segment_started()
+
+        # Terminate a torn last line left by a crash
+        if self._file.tell():
+            with path.open("rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write(b"\n")
+
+    def _segment_started(self, reset: bool = False) -> float:
+        path = self.directory / LOCK_FILE
+        if not reset:
+            try:
+                return float(path.read_text())
+            except (OSError, ValueError):
+                pass
+        started = time.time()
+        path.write_text(repr(started))
+        return started
+
+    def _reopen_if_rotated(self) -> None:
+        try:
+            current = os.stat(self.directory / ACTIVE_SEGMENT).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != self._inode:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._open_segment()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            batch: list[bytes] = []
+            flushes: list[_Flush] = []
+            deadline = time.monotonic() + self.flush_interval
+
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, _Flush):
+                    flushes.append(item)
+                    break
+                batch.append(item.encode("utf-8"))
+
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            ok = not batch or self._persist(batch)
+            for marker in flushes:
+                marker.ok = ok
+                marker.done.set()
+
+        self._file.close()
+
+    def _persist(self, batch: list[bytes]) -> bool:
+        """Commit a batch, falling back to the spill file; False if both fail."""
+        try:
+            self._commit(batch)
+            return True
+        except Exception:
+            self.commit_failures += 1
+            # Reopen audit.log before the next commit: the handle may be unusable
+            self._inode = None
+
+        try:
+            self._spill_lines(batch)
+            return True
+        except Exception:
+            self.dropped += len(batch)
+            return False
+
+    def _commit(self, batch: list[bytes]) -> None:
+        data = b"".join(batch)
+
+        with self._lock:
+            self._reopen_if_rotated()
+            size = os.fstat(self._file.fileno()).st_size
+            if size and (
+                size + len(data) > self.max_bytes
+                or time.time() - self._opened >= self.max_age
+            ):
+                self._rotate()
+
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+        self.written += len(batch)
+        self.batches += 1
+
+    def _rotate(self) -> None:
+        """Close audit.log and start a new one; called with the lock held."""
+        self._file.close()
+
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        closed = self.directory / f"{SEGMENT_PREFIX}{stamp}.log"
+        os.replace(self.directory / ACTIVE_SEGMENT, closed)
+        self._segment_started(reset=True)
+        fsync_dir(self.directory)
+        self.rotations += 1
+
+        self._open_segment()
+
+        thread = threading.Thread(
+            target=index_segment, args=(closed, self.compress), name="audit-index", daemon=True
+        )
+        thread.start()
+        self._indexers = [t for t in self._indexers if t.is_alive()] + [thread]
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "spilled": self.spilled,
+            "rotations": self.rotations,
+            "commit_failures": self.commit_failures,
+            "dropped": self.dropped,
+        }
+
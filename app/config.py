@@ -10,11 +10,83 @@ class Settings:
     environment: str = "local"
 
     # logging
-    log_dir: str = "logs"
+    log_dir: str = os.getenv("LOG_DIR", "logs")
+
+    # fraction of requests whose stage timings are attached to the audit record
+    profile_sample_rate: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+    # audit writer: group commit every flush interval, rotate by size/age
+    audit_queue_size: int = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+    audit_flush_interval: float = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.05"))
+    audit_max_bytes: int = int(os.getenv("AUDIT_MAX_BYTES", str(64 * 1024 * 1024)))
+    audit_max_age: float = float(os.getenv("AUDIT_MAX_AGE", str(24 * 3600)))
+    audit_compress: bool = os.getenv("AUDIT_COMPRESS", "1") != "0"
+    audit_backpressure: str = os.getenv("AUDIT_BACKPRESSURE", "block")  # block | spill
+    audit_fsync: bool = os.getenv("AUDIT_FSYNC", "1") != "0"
+
+    # knowledge base: JSONL file, directory or ingested index root
+    # (python -m app.ingest); empty serves the bundled documents
+    knowledge_base_path: str = os.getenv("KNOWLEDGE_BASE_PATH", "")
+    # changed rows served from the update overlay before a full rebuild
+    index_overlay_max: int = int(os.getenv("INDEX_OVERLAY_MAX", "10000"))
+
+    # API admission control: concurrent /query requests per worker
+    # (0 = unlimited), queued ones beyond that, and the longest queue wait
+    admission_max_concurrency: int = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))
+    admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))
+    admission_queue_timeout: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+    # per-client token bucket, keyed by X-Client-Id or address (0 disables)
+    rate_limit_rps: float = float(os.getenv("RATE_LIMIT_RPS", "0"))
+    rate_limit_burst: int = int(os.getenv("RATE_LIMIT_BURST", "20"))
+
+    # /query/stream: longest wait for the response to finish before the
+    # request is audited anyway (the client may never read the body)
+    stream_send_timeout: float = float(os.getenv("STREAM_SEND_TIMEOUT", "30"))
+
+    # admin routes (POST /admin/reload) require X-Admin-Token when set
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")
+
+    # risk classifier: optional JSON file of extra keywords per category
+    risk_keywords_path: str = os.getenv("RISK_KEYWORDS_PATH", "")
+
+    # result cache for repeated queries (0 disables)
+    result_cache_size: int = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+    result_cache_ttl: float = float(os.getenv("RESULT_CACHE_TTL", "300"))
+    result_cache_policy: str = os.getenv("RESULT_CACHE_POLICY", "lru")  # lru | lfu
+    # requests whose policy blocks generation skip retrieval
+    policy_fast_path: bool = os.getenv("POLICY_FAST_PATH", "1") != "0"
+    # concurrent identical queries share one run of stages 1-3
+    request_coalescing: bool = os.getenv("REQUEST_COALESCING", "1") != "0"
+
+    # async pipeline thread pools
+    encoder_threads: int = int(os.getenv("ENCODER_THREADS", str(min(4, os.cpu_count() or 1))))
+    io_threads: int = int(os.getenv("IO_THREADS", "16"))
 
     # embeddings
     embedding_backend: str = os.getenv("EMBEDDING_BACKEND", "local")
     embedding_dim: int = 384
+    encoder_cache_size: int = int(os.getenv("ENCODER_CACHE_SIZE", "4"))
+    # comma-separated model overrides to load at startup
+    embedding_warm_models: str = os.getenv("EMBEDDING_WARM_MODELS", "")
+    # persistent embedding cache; defaults to <log_dir>/embedding_cache
+    embedding_cache_enabled: bool = os.getenv("EMBEDDING_CACHE", "1") != "0"
+    embedding_cache_dir: str = os.getenv("EMBEDDING_CACHE_DIR", "")
+    # corpus vectors only; no new rows are added past this many per model
+    embedding_cache_max_rows: int = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "1000000"))
+    # coalesce concurrent queries per backend: "<backend>=<max batch>:<max wait ms>",
+    # comma-separated; backends not listed encode each request on its own
+    embedding_microbatch: str = os.getenv("EMBEDDING_MICROBATCH", "local=32:3")
+
+    # vector store: "memory", "mmap" (persistent, shared across workers),
+    # "ivf" (approximate) or "quantized" (compressed)
+    vector_store: str = os.getenv("VECTOR_STORE", "memory")
+    vector_store_dir: str = os.getenv("VECTOR_STORE_DIR", "")
+    ivf_nlist: int = int(os.getenv("IVF_NLIST", "0"))  # 0 = sqrt(N)
+    ivf_nprobe: int = int(os.getenv("IVF_NPROBE", "8"))
+    ivf_exact_threshold: int = int(os.getenv("IVF_EXACT_THRESHOLD", "10000"))
+    quantization: str = os.getenv("VECTOR_QUANTIZATION", "int8")  # float16 | int8 | pq
+    quantization_rerank: int = int(os.getenv("VECTOR_RERANK", "0"))
+    pq_subspaces: int = int(os.getenv("PQ_SUBSPACES", "48"))
 
     # bytez api
     bytez_api_key: Optional[str] = os.getenv("BYTEZ_API_KEY")
@@ -22,6 +94,15 @@ class Settings:
         "BYTEZ_EMBEDDING_MODEL",
         "sentence-transformers/all-MiniLM-L6-v2",
     )
+    bytez_max_concurrency: int = int(os.getenv("BYTEZ_MAX_CONCURRENCY", "8"))
+    # >1 sends lists of texts per request; only for models that accept list input
+    bytez_batch_size: int = int(os.getenv("BYTEZ_BATCH_SIZE", "1"))
+    bytez_timeout: float = float(os.getenv("BYTEZ_TIMEOUT", "30"))
+    bytez_max_retries: int = int(os.getenv("BYTEZ_MAX_RETRIES", "3"))
+    bytez_backoff_base: float = float(os.getenv("BYTEZ_BACKOFF_BASE", "0.5"))
+    bytez_backoff_max: float = float(os.getenv("BYTEZ_BACKOFF_MAX", "8"))
+    bytez_breaker_threshold: int = int(os.getenv("BYTEZ_BREAKER_THRESHOLD", "5"))
+    bytez_breaker_reset: float = float(os.getenv("BYTEZ_BREAKER_RESET", "30"))
 
 
 settings = Settings()
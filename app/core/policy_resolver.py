@@ -1,26 +1,47 @@
-from app.schemas.contracts import PolicyDecision, RiskLevel
-
+import hashlib
+import json
+from dataclasses import asdict
 
-def resolve_policy(risk) -> PolicyDecision:
-    if risk.level == RiskLevel.HIGH:
-        return PolicyDecision(
-            mode="strict",
-            min_confidence=0.85,
-            retrieval_required=True,
-            generation_allowed=False,
-        )
+from app.schemas.contracts import PolicyDecision, RiskLevel
 
-    if risk.level == RiskLevel.MEDIUM:
-        return PolicyDecision(
-            mode="conservative",
-            min_confidence=0.7,
-            retrieval_required=True,
-            generation_allowed=True,
-        )
 
-    return PolicyDecision(
+POLICY_TABLE = {
+    RiskLevel.HIGH: PolicyDecision(
+        mode="strict",
+        min_confidence=0.85,
+        retrieval_required=True,
+        generation_allowed=False,
+        # Strict mode only trusts first-party evidence
+        allowed_sources=("internal:*",),
+    ),
+    RiskLevel.MEDIUM: PolicyDecision(
+        mode="conservative",
+        min_confidence=0.7,
+        retrieval_required=True,
+        generation_allowed=True,
+    ),
+    RiskLevel.LOW: PolicyDecision(
         mode="normal",
         min_confidence=0.5,
         retrieval_required=True,
         generation_allowed=True,
-    )
+    ),
+}
+
+_version: tuple[tuple, str] = ((), "")
+
+
+def resolve_policy(risk) -> PolicyDecision:
+    return POLICY_TABLE.get(risk.level, POLICY_TABLE[RiskLevel.LOW])
+
+
+def policy_version() -> str:
+    """Fingerprint of POLICY_TABLE; changes whenever an entry is replaced."""
+    global _version
+    items = tuple(POLICY_TABLE.items())
+    if items != _version[0]:
+        payload = json.dumps(
+            [[level.value, asdict(policy)] for level, policy in items], sort_keys=True
+        )
+        _version = (items, hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16])
+    return _version[1]
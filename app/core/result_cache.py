@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+class _Entry:
+    __slots__ = ("value", "expires", "hits")
+
+    def __init__(self, value: Any, expires: float):
+        self.value = value
+        self.expires = expires
+        self.hits = 0
+
+
+class ResultCache:
+    """
+    Bounded in-process cache for pipeline results.
+
+    - entries expire `ttl` seconds after they were stored (0 = never);
+      expired entries are dropped when next looked up
+    - when full, "lru" evicts the least recently used entry and "lfu"
+      the least frequently used one (ties: least recently used), O(1)
+    - keys must carry every input the cached value depends on; stale
+      versions are never looked up again and simply age out
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float = 0.0,
+        policy: str = "lru",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown result cache policy: {policy}")
+
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self.policy = policy
+        self._clock = clock
+
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        # lfu: hit count -> keys in recency order, for O(1) eviction
+        self._buckets: dict[int, "OrderedDict[Hashable, None]"] = {}
+        self._min_hits = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if self.ttl and self._clock() >= entry.expires:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._touch(key, entry)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+
+        with self._lock:
+            expires = self._clock() + self.ttl if self.ttl else float("inf")
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.value, entry.expires = value, expires
+                self._touch(key, entry)
+                return
+
+            while len(self._entries) >= self.max_size:
+                self._evict()
+
+            self._entries[key] = _Entry(value, expires)
+            if self.policy == "lfu":
+                self._buckets.setdefault(0, OrderedDict())[key] = None
+                self._min_hits = 0
+
+    def _touch(self, key: Hashable, entry: _Entry) -> None:
+        self._entries.move_to_end(key)
+        if self.policy == "lfu":
+            bucket = self._buckets[entry.hits]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[entry.hits]
+                if self._min_hits == entry.hits:
+                    self._min_hits += 1
+            self._buckets.setdefault(entry.hits + 1, OrderedDict())[key] = None
+        entry.hits += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        if self.policy == "lfu":
+            bucket = self._buckets[entry.hits]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[entry.hits]
+
+    def _evict(self) -> None:
+        if self.policy == "lru":
+            self._entries.popitem(last=False)
+        else:
+            # Lowest hit count, least recently used among those.
+            # _remove() on expiry can leave _min_hits pointing at a gone bucket.
+            if self._min_hits not in self._buckets:
+                self._min_hits = min(self._buckets)
+            key = next(iter(self._buckets[self._min_hits]))
+            self._remove(key)
+        self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._min_hits = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
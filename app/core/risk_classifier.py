@@ -1,4 +1,10 @@
+import hashlib
+import json
 import re
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+from app.config import settings
 from app.schemas.contracts import RiskAssessment, RiskCategory, RiskLevel
 
 
@@ -26,36 +32,148 @@ ADVICE_PATTERNS = [
     r"\bshould one\b",
 ]
 
+CATEGORIES = ("policy", "advice", "medical", "legal", "financial")
+
+# Same definition of a word character as the regex \b the matcher replaces
+_WORD = re.compile(r"\w+")
+
+
+class KeywordMatcher:
+    """
+    All keyword sets compiled into one lookup table.
+
+    - the query is tokenized once into maximal word runs (what \\b
+      delimits), so a keyword hit is a token (or run of tokens) equal
+      to the keyword; no regex per keyword
+    - single-word keywords are one dict lookup per token
+    - phrases are indexed by their first word and must match the
+      separators between their words exactly
+    - per-query cost depends on query length, not on keyword count
+    """
+
+    def __init__(self, keyword_sets: Dict[str, Iterable[str]]):
+        self._words: Dict[str, FrozenSet[str]] = {}
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], Tuple[str, ...], str]]] = {}
+
+        words: Dict[str, set] = {}
+        digest = hashlib.sha256()
+
+        for category in sorted(keyword_sets):
+            for keyword in sorted({k.lower() for k in keyword_sets[category]}):
+                digest.update(f"{category}\0{keyword}\0".encode("utf-8"))
+
+                tokens, separators = _split(keyword)
+                if len(tokens) == 1:
+                    words.setdefault(tokens[0], set()).add(category)
+                else:
+                    self._phrases.setdefault(tokens[0], []).append(
+                        (tokens, separators, category)
+                    )
+
+        self._words = {w: frozenset(c) for w, c in words.items()}
+        self.fingerprint = digest.hexdigest()[:16]
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """Every category with at least one keyword in text (already lowercased)."""
+        spans = [(m.group(), m.start(), m.end()) for m in _WORD.finditer(text)]
+        hits: set = set()
+
+        for i, (token, _, _) in enumerate(spans):
+            categories = self._words.get(token)
+            if categories:
+                hits |= categories
+
+            for tokens, separators, category in self._phrases.get(token, ()):
+                if category in hits or i + len(tokens) > len(spans):
+                    continue
+                if all(
+                    spans[i + j][0] == tokens[j]
+                    and text[spans[i + j - 1][2]:spans[i + j][1]] == separators[j - 1]
+                    for j in range(1, len(tokens))
+                ):
+                    hits.add(category)
+
+        return frozenset(hits)
+
+
+def _split(keyword: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    matches = list(_WORD.finditer(keyword))
+    if not matches or matches[0].start() != 0 or matches[-1].end() != len(keyword):
+        raise ValueError(f"Keyword must start and end with a word character: {keyword!r}")
+
+    tokens = tuple(m.group() for m in matches)
+    separators = tuple(
+        keyword[a.end():b.start()] for a, b in zip(matches, matches[1:])
+    )
+    return tokens, separators
+
+
+def _builtin_sets() -> Dict[str, set]:
+    return {
+        "policy": set(POLICY_KEYWORDS),
+        "advice": {p.replace(r"\b", "") for p in ADVICE_PATTERNS},
+        "medical": set(MEDICAL_KEYWORDS),
+        "legal": set(LEGAL_KEYWORDS),
+        "financial": set(FINANCIAL_KEYWORDS),
+    }
+
+
+def load_keywords(path: str | Path) -> KeywordMatcher:
+    """
+    Extend the built-in sets from a JSON file of
+    {"policy": [...], "advice": [...], "medical": [...], ...}
+    and make the result the active matcher.
+    """
+    with Path(path).open(encoding="utf-8") as f:
+        extra = json.load(f)
+
+    unknown = set(extra) - set(CATEGORIES)
+    if unknown:
+        raise ValueError(f"Unknown risk keyword categories: {sorted(unknown)}")
+
+    sets = _builtin_sets()
+    for category, keywords in extra.items():
+        sets[category].update(keywords)
+
+    return set_matcher(KeywordMatcher(sets))
+
+
+def matcher() -> KeywordMatcher:
+    return _matcher
+
 
-def _contains_any(query: str, keywords: set[str]) -> bool:
-    return any(re.search(rf"\b{k}\b", query) for k in keywords)
+def set_matcher(new: KeywordMatcher) -> KeywordMatcher:
+    global _matcher
+    _matcher = new
+    return new
 
 
-def _is_advice_seeking(query: str) -> bool:
-    return any(re.search(pattern, query) for pattern in ADVICE_PATTERNS)
+_matcher = KeywordMatcher(_builtin_sets())
+if settings.risk_keywords_path:
+    load_keywords(settings.risk_keywords_path)
 
 
 def classify_risk(query: str) -> RiskAssessment:
-    q = query.lower()
+    hits = _matcher.match(query.lower())
 
     # 1. Policy violations (always highest priority)
-    if _contains_any(q, POLICY_KEYWORDS):
+    if "policy" in hits:
         return RiskAssessment(RiskCategory.POLICY, RiskLevel.HIGH)
 
     # 2. Explicit advice / decision intent
-    if _is_advice_seeking(q):
-        if _contains_any(q, FINANCIAL_KEYWORDS):
+    if "advice" in hits:
+        if "financial" in hits:
             return RiskAssessment(RiskCategory.FINANCIAL, RiskLevel.HIGH)
         return RiskAssessment(RiskCategory.GENERAL, RiskLevel.MEDIUM)
 
     # 3. Domain-specific risks
-    if _contains_any(q, MEDICAL_KEYWORDS):
+    if "medical" in hits:
         return RiskAssessment(RiskCategory.MEDICAL, RiskLevel.HIGH)
 
-    if _contains_any(q, LEGAL_KEYWORDS):
+    if "legal" in hits:
         return RiskAssessment(RiskCategory.LEGAL, RiskLevel.HIGH)
 
-    if _contains_any(q, FINANCIAL_KEYWORDS):
+    if "financial" in hits:
         return RiskAssessment(RiskCategory.FINANCIAL, RiskLevel.MEDIUM)
 
     # 4. Default
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+
+
+# Set by a leader that was cancelled: its followers run the call themselves
+_RETRY = object()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    - the first caller for a key (the leader) runs the call; callers
+      arriving while it runs wait for its result, or its exception
+    - sync callers block on the shared future, async callers await it
+      without blocking the event loop; both kinds share one flight
+    - nothing is kept once the call returns: repeated (not concurrent)
+      calls are the result cache's job
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, Future] = {}
+
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+
+            flight = self._flights[key] = Future()
+            self.leaders += 1
+            return flight, True
+
+    def _land(self, key: Hashable, flight: Future, outcome, error: BaseException | None = None) -> None:
+        with self._lock:
+            del self._flights[key]
+        if error is not None:
+            flight.set_exception(error)
+        else:
+            flight.set_result(outcome)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(fn() or the result of the identical call in flight, whether it was shared)."""
+        while True:
+            flight, leader = self._join(key)
+            if not leader:
+                result = flight.result()
+                if result is _RETRY:
+                    continue
+                return result, True
+
+            try:
+                result = fn()
+            except Exception as error:
+                self._land(key, flight, None, error)
+                raise
+            except BaseException:
+                self._land(key, flight, _RETRY)
+                raise
+            self._land(key, flight, result)
+            return result, False
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """do() for coroutines; a cancelled leader hands the call to a waiting follower."""
+        while True:
+            flight, leader = self._join(key)
+            if not leader:
+                # Shielded: a cancelled follower must not cancel the shared flight
+                result = await asyncio.shield(asyncio.wrap_future(flight))
+                if result is _RETRY:
+                    continue
+                return result, True
+
+            try:
+                result = await fn()
+            except Exception as error:
+                self._land(key, flight, None, error)
+                raise
+            except BaseException:
+                self._land(key, flight, _RETRY)
+                raise
+            self._land(key, flight, result)
+            return result, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._flights), "leaders": self.leaders, "coalesced": self.coalesced}
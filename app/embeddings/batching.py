@@ -0,0 +1,161 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+
+from app.embeddings.encoder import EmbeddingEncoder
+from app.observability.metrics import REGISTRY
+
+
+BATCH_SIZE = REGISTRY.histogram(
+    "embedding_microbatch_size", "Texts per coalesced encoder call", ["backend", "model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+QUEUE_SECONDS = REGISTRY.histogram(
+    "embedding_microbatch_queue_seconds", "Time a request waited to join a batch", ["backend", "model"],
+)
+
+
+def parse_batching(spec: str) -> Dict[str, Tuple[int, float]]:
+    """
+    "local=32:3,bytez=8:5" -> {"local": (32, 0.003), "bytez": (8, 0.005)}:
+    max texts per batch and max wait in milliseconds, per backend.
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        backend, _, value = item.partition("=")
+        size, _, wait_ms = value.partition(":")
+        try:
+            limits[backend.strip().lower()] = (int(size), float(wait_ms or 0) / 1000)
+        except ValueError:
+            raise ValueError(f"Bad micro-batching entry {item!r}, expected <backend>=<size>:<wait ms>")
+    return limits
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+
+
+class MicroBatchingEncoder(EmbeddingEncoder):
+    """
+    Coalesces concurrent small encode() calls into one encoder call.
+
+    - callers enqueue their texts and wait on a future for their rows
+    - a scheduler thread flushes once max_batch texts are queued or the
+      oldest request has waited max_wait seconds
+    - one batch runs at a time; the next one gathers meanwhile, so
+      batches grow with load instead of adding forward passes
+    - requests of max_batch texts or more (index builds) skip the queue
+    - the scheduler starts on first use, also in forked workers
+    """
+
+    def __init__(self, encoder: EmbeddingEncoder, max_batch: int, max_wait: float, backend: str = "", model: str = ""):
+        self.encoder = encoder
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+
+        self._batch_size = BATCH_SIZE.labels(backend=backend, model=model)
+        self._queue_seconds = QUEUE_SECONDS.labels(backend=backend, model=model)
+
+        self._cond = threading.Condition()
+        self._pending: deque[_Request] = deque()
+        self._queued = 0
+        self._closed = False
+        self._pid = None
+        self._thread = None
+
+    def _submit(self, texts: List[str]) -> Future:
+        request = _Request(list(texts))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("encoder is closed")
+            if self._pid != os.getpid():
+                # First use in this process: a scheduler thread does not survive fork
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+            self._pending.append(request)
+            self._queued += len(request.texts)
+            self._cond.notify()
+        return request.future
+
+    def _take(self) -> List[_Request]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return []
+
+            deadline = self._pending[0].enqueued + self.max_wait
+            while self._queued < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0].texts) <= self.max_batch):
+                request = self._pending.popleft()
+                batch.append(request)
+                size += len(request.texts)
+            self._queued -= size
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take()
+            if not batch:
+                return
+
+            started = time.monotonic()
+            texts = [text for request in batch for text in request.texts]
+            for request in batch:
+                self._queue_seconds.observe(started - request.enqueued)
+            self._batch_size.observe(len(texts))
+
+            try:
+                vectors = self.encoder.encode(texts)
+            except Exception as error:
+                for request in batch:
+                    request.future.set_exception(error)
+                continue
+
+            offset = 0
+            for request in batch:
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch:
+            return self.encoder.encode(texts)
+        return self._submit(texts).result()
+
+    async def aencode(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch:
+            return await self.encoder.aencode(texts)
+        return await asyncio.wrap_future(self._submit(texts))
+
+    def close(self) -> None:
+        # Queued requests are still served before the scheduler exits
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread if self._pid == os.getpid() else None
+        if thread is not None:
+            thread.join()
+
+        close = getattr(self.encoder, "close", None)
+        if close is not None:
+            close()
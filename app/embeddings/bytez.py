@@ -1,33 +1,94 @@
-from typing import List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Any, List, Optional
 
-from bytez import Bytez
 
 from app.embeddings.encoder import EmbeddingEncoder
+from app.embeddings.resilience import CircuitBreaker, CircuitOpenError, backoff_delays
 from app.config import settings
+from app.executors import run_io
+from app.observability.metrics import Histogram
+
+
+# Provider errors that will not go away by retrying
+_PERMANENT_ERRORS = ("plan", "unauthorized", "forbidden", "api key", "not found", "invalid")
+
+
+class BytezError(RuntimeError):
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
 
 
 class BytezEmbeddingEncoder(EmbeddingEncoder):
     """
     Bytez API embedding encoder using the official Bytez SDK.
     Uses model.run() for feature extraction (embeddings).
+
+    - one model handle per encoder, reused across calls
+    - up to max_concurrency requests in flight per encode()
+    - batch_size > 1 coalesces texts into one list request
+      (only for models whose provider accepts list input)
+    - per-call timeout, exponential-backoff retries with jitter
+      and a circuit breaker in front of the provider
     """
 
-    def __init__(self, model_override: Optional[str] = None, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        model_override: Optional[str] = None,
+        api_key: Optional[str] = None,
+        sdk: Any = None,
+        max_concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
         self.api_key = api_key or settings.bytez_api_key
-        if not self.api_key:
+        if sdk is None and not self.api_key:
             raise RuntimeError("BYTEZ_API_KEY not configured")
 
         self.model_id = model_override or settings.bytez_embedding_model
         if not self.model_id:
             raise RuntimeError("BYTEZ_EMBEDDING_MODEL not configured")
 
-        self.sdk = Bytez(self.api_key)
+        if sdk is None:
+            from bytez import Bytez  # imported only when the real SDK is used
+
+            sdk = Bytez(self.api_key)
+        self.sdk = sdk
+        self.model = self.sdk.model(self.model_id)
+
+        self.max_concurrency = max(1, max_concurrency or settings.bytez_max_concurrency)
+        self.batch_size = max(1, batch_size or settings.bytez_batch_size)
+        self.timeout = timeout if timeout is not None else settings.bytez_timeout
+        self.max_retries = max_retries if max_retries is not None else settings.bytez_max_retries
+        self.backoff_base = backoff_base if backoff_base is not None else settings.bytez_backoff_base
+        self.backoff_max = backoff_max if backoff_max is not None else settings.bytez_backoff_max
+        self.breaker = breaker or CircuitBreaker(
+            settings.bytez_breaker_threshold, settings.bytez_breaker_reset
+        )
+
+        # Chunks run on _pool; each provider call runs on _calls so that
+        # a hung request can be abandoned after `timeout` seconds.
+        self._pool = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="bytez")
+        self._calls = ThreadPoolExecutor(self.max_concurrency * 2, thread_name_prefix="bytez-call")
+
+        self.latency = Histogram()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
 
     def _extract_embedding(self, result):
         """Normalize Bytez response shape to a list of floats."""
         err = getattr(result, "error", None)
         if err:
-            raise RuntimeError(f"Bytez error: {err}")
+            permanent = any(marker in str(err).lower() for marker in _PERMANENT_ERRORS)
+            raise BytezError(f"Bytez error: {err}", retryable=not permanent)
 
         if hasattr(result, "output"):
             output = result.output
@@ -39,16 +100,94 @@ class BytezEmbeddingEncoder(EmbeddingEncoder):
             output = result
 
         if not isinstance(output, list):
-            raise RuntimeError(f"Unexpected Bytez response format: {result}")
+            raise BytezError(f"Unexpected Bytez response format: {result}", retryable=False)
 
         return output
 
+    def _call(self, payload):
+        future = self._calls.submit(self.model.run, payload)
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeout:
+            raise BytezError(f"Bytez call timed out after {self.timeout}s") from None
+
+    def _run_chunk(self, chunk: List[str]) -> List[List[float]]:
+        payload = chunk[0] if len(chunk) == 1 else chunk
+        delays = backoff_delays(self.max_retries, self.backoff_base, self.backoff_max)
+
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Bytez circuit open for {self.model_id}")
+
+            started = time.perf_counter()
+            try:
+                output = self._extract_embedding(self._call(payload))
+                embeddings = [output] if len(chunk) == 1 else output
+                if len(embeddings) != len(chunk) or not all(isinstance(e, list) for e in embeddings):
+                    raise BytezError(
+                        f"Bytez returned {len(embeddings)} embeddings for {len(chunk)} texts",
+                        retryable=False,
+                    )
+            except Exception as error:
+                if not isinstance(error, BytezError):
+                    # Transport and SDK errors (ConnectionError, ...) count as
+                    # retryable provider failures, so a half-open trial always ends
+                    wrapped = BytezError(f"Bytez call failed: {type(error).__name__}: {error}")
+                    wrapped.__cause__ = error
+                    error = wrapped
+
+                self.latency.observe(time.perf_counter() - started)
+                with self._lock:
+                    self.calls += 1
+                    self.failures += 1
+
+                if not error.retryable:
+                    # Configuration or contract errors say nothing about provider health
+                    self.breaker.record_success()
+                    raise error
+
+                self.breaker.record_failure()
+                delay = next(delays, None)
+                if delay is None:
+                    raise error
+
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+                continue
+
+            self.latency.observe(time.perf_counter() - started)
+            self.breaker.record_success()
+            with self._lock:
+                self.calls += 1
+            return embeddings
+
     def encode(self, texts: List[str]) -> List[List[float]]:
-        model = self.sdk.model(self.model_id)
+        if not texts:
+            return []
+
+        chunks = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(chunks) == 1:
+            results = [self._run_chunk(chunks[0])]
+        else:
+            results = list(self._pool.map(self._run_chunk, chunks))
+
+        return [embedding for chunk in results for embedding in chunk]
+
+    async def aencode(self, texts: List[str]) -> List[List[float]]:
+        # Network-bound: wait on the I/O pool, not the CPU encoder executor
+        return await run_io(self.encode, texts)
 
-        embeddings: List[List[float]] = []
-        for text in texts:
-            result = model.run(text)
-            embeddings.append(self._extract_embedding(result))
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "breaker": self.breaker.state,
+                "latency": self.latency.snapshot(),
+            }
 
-        return embeddings
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._calls.shutdown(wait=False, cancel_futures=True)
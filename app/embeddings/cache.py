@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.embeddings.encoder import EmbeddingEncoder
+from app.fileutils import FileLock
+
+
+_DIGEST_SIZE = 32
+META_FILE = "meta.json"
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache on disk.
+
+    One directory per (backend, model, dim) namespace:
+      vectors.f32  raw float32 rows, read through numpy.memmap
+      keys.bin     sha256 digest of the source text, 32 bytes per row
+      meta.json    backend, model and dim, so open_existing() can
+                   reopen the namespace without knowing the dimension
+
+    Both files are append-only. Vectors are written before keys, so a
+    crash can only leave unreferenced trailing bytes, which are trimmed
+    the next time the cache is opened. Once max_rows rows are stored,
+    new vectors are no longer added (lookups keep working).
+    """
+
+    def __init__(self, root: str | Path, backend: str, model_id: str, dim: int, max_rows: Optional[int] = None):
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self.max_rows = max_rows
+
+        self.path = Path(root) / f"{_namespace(backend, model_id)}__{dim}"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._write_meta({"backend": backend, "model": model_id, "dim": dim})
+
+        self._vectors_file = self.path / "vectors.f32"
+        self._keys_file = self.path / "keys.bin"
+        self._lock_file = self.path / ".lock"
+        self._vectors_file.touch()
+        self._keys_file.touch()
+
+        self._lock = threading.Lock()
+        self._rows: dict[bytes, int] = {}
+        self._count = 0
+        self._map: Optional[np.memmap] = None
+
+        with self._lock, self._file_lock():
+            self._repair()
+            self._refresh()
+
+    @classmethod
+    def open_existing(
+        cls, root: str | Path, backend: str, model_id: str, max_rows: Optional[int] = None
+    ) -> Optional["EmbeddingCache"]:
+        """The namespace already on disk for (backend, model) with the most rows, or None."""
+        found = []
+        for path in Path(root).glob(f"{_namespace(backend, model_id)}__*"):
+            meta = _read_meta(path / META_FILE)
+            if meta is None or (meta.get("backend"), meta.get("model")) != (backend, model_id):
+                continue
+            keys = path / "keys.bin"
+            rows = keys.stat().st_size // _DIGEST_SIZE if keys.exists() else 0
+            if rows:
+                found.append((rows, int(meta["dim"])))
+        if not found:
+            return None
+        return cls(root, backend, model_id, max(found)[1], max_rows=max_rows)
+
+    def _write_meta(self, meta: dict) -> None:
+        path = self.path / META_FILE
+        if _read_meta(path) == meta:
+            return
+        tmp = path.with_name(f"{META_FILE}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _file_lock(self):
+        return FileLock(self._lock_file)
+
+    def _repair(self) -> None:
+        """Trim torn tails so both files describe the same number of rows."""
+        rows = min(
+            self._keys_file.stat().st_size // _DIGEST_SIZE,
+            self._vectors_file.stat().st_size // self.row_bytes,
+        )
+        for file, size in (
+            (self._keys_file, rows * _DIGEST_SIZE),
+            (self._vectors_file, rows * self.row_bytes),
+        ):
+            if file.stat().st_size != size:
+                os.truncate(file, size)
+
+    def _refresh(self) -> None:
+        """Pick up rows appended since the last read (by this or another process)."""
+        size = self._keys_file.stat().st_size // _DIGEST_SIZE
+        if size == self._count:
+            return
+
+        with self._keys_file.open("rb") as f:
+            f.seek(self._count * _DIGEST_SIZE)
+            data = f.read((size - self._count) * _DIGEST_SIZE)
+
+        for i in range(len(data) // _DIGEST_SIZE):
+            digest = data[i * _DIGEST_SIZE:(i + 1) * _DIGEST_SIZE]
+            self._rows.setdefault(digest, self._count + i)
+
+        self._count = size
+        self._map = np.memmap(self._vectors_file, dtype=np.float32, mode="r", shape=(size, self.dim))
+
+    def get_many(self, digests: List[bytes]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            if any(d not in self._rows for d in digests):
+                self._refresh()
+
+            return [
+                np.array(self._map[self._rows[d]]) if d in self._rows else None
+                for d in digests
+            ]
+
+    def put_many(self, digests: List[bytes], vectors: List[List[float]]) -> None:
+        with self._lock, self._file_lock():
+            self._refresh()
+
+            new: dict[bytes, np.ndarray] = {}
+            for digest, vector in zip(digests, vectors):
+                arr = np.asarray(vector, dtype=np.float32)
+                if digest in self._rows or arr.shape != (self.dim,):
+                    continue
+                new[digest] = arr
+
+            if self.max_rows is not None:
+                new = dict(list(new.items())[:max(0, self.max_rows - self._count)])
+            if not new:
+                return
+
+            with self._vectors_file.open("ab") as f:
+                f.write(np.stack(list(new.values())).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._keys_file.open("ab") as f:
+                f.write(b"".join(new))
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._refresh()
+
+
+def _namespace(backend: str, model_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", f"{backend}__{model_id}")
+
+
+def _read_meta(path: Path) -> Optional[dict]:
+    try:
+        meta = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return meta if isinstance(meta, dict) else None
+
+
+class CachedEmbeddingEncoder(EmbeddingEncoder):
+    """
+    Read-through cache in front of any encoder, for corpus encoding.
+
+    - encode_documents(): only texts never seen before reach the wrapped
+      encoder, in a single encode() call per request
+    - encode() / aencode() (queries) go straight to the wrapped encoder:
+      no disk I/O on the request path, and queries are never stored
+    - cache is an EmbeddingCache, or open_cache(dim): open_cache(None)
+      reopens a namespace already on disk (or returns None), and only
+      when there is none is a text encoded to learn the dimension and
+      open_cache(dim) called; a fully cached corpus thus needs no
+      encoder call, even after a restart
+
+    Fresh vectors are rounded to float32 like cached ones, so results
+    do not depend on whether a text was already cached.
+    """
+
+    def __init__(
+        self,
+        encoder: EmbeddingEncoder,
+        cache: EmbeddingCache | Callable[[Optional[int]], Optional[EmbeddingCache]],
+    ):
+        self.encoder = encoder
+        if isinstance(cache, EmbeddingCache):
+            self.cache, self._open_cache = cache, None
+        else:
+            self.cache, self._open_cache = None, cache
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, texts: List[str]):
+        digests = [content_hash(t) for t in texts]
+        cached = self.cache.get_many(digests)
+
+        missing: dict[bytes, str] = {}
+        for digest, text, vector in zip(digests, texts, cached):
+            if vector is None:
+                missing.setdefault(digest, text)
+
+        self.hits += len(texts) - sum(v is None for v in cached)
+        self.misses += len(missing)
+        return digests, cached, missing
+
+    def _fill(self, digests, cached, missing, vectors) -> List[List[float]]:
+        fresh = {
+            digest: np.asarray(vector, dtype=np.float32).tolist()
+            for digest, vector in zip(missing, vectors)
+        }
+        if fresh:
+            self.cache.put_many(list(fresh), list(fresh.values()))
+
+        return [
+            vector.tolist() if vector is not None else fresh[digest]
+            for digest, vector in zip(digests, cached)
+        ]
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        return self.encoder.encode(texts)
+
+    async def aencode(self, texts: List[str]) -> List[List[float]]:
+        return await self.encoder.aencode(texts)
+
+    def encode_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if self.cache is None:
+            self.cache = self._open_cache(None)
+        if self.cache is None:
+            # Nothing on disk yet: the first vector tells the dimension
+            first = self.encoder.encode(texts[:1])
+            self.cache = self._open_cache(len(first[0]))
+            self.cache.put_many([content_hash(texts[0])], first)
+
+        digests, cached, missing = self._lookup(texts)
+        vectors = self.encoder.encode(list(missing.values())) if missing else []
+        return self._fill(digests, cached, missing, vectors)
+
+    def close(self) -> None:
+        close = getattr(self.encoder, "close", None)
+        if close is not None:
+            close()
@@ -1,5 +1,7 @@
 from typing import List
 
+from app.executors import run_cpu
+
 
 class EmbeddingEncoder:
     """
@@ -9,3 +11,17 @@ class EmbeddingEncoder:
 
     def encode(self, texts: List[str]) -> List[List[float]]:
         raise NotImplementedError
+
+    def encode_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Encode corpus texts for an index. Same vectors as encode(); only
+        these may be persisted (queries never are).
+        """
+        return self.encode(texts)
+
+    async def aencode(self, texts: List[str]) -> List[List[float]]:
+        """
+        Non-blocking encode for the async pipeline.
+        Defaults to running encode() on the dedicated encoder executor.
+        """
+        return await run_cpu(self.encode, texts)
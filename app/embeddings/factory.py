@@ -1,17 +1,328 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+
 from app.config import settings
-from app.embeddings.local import LocalEmbeddingEncoder
-from app.embeddings.bytez import BytezEmbeddingEncoder
+from app.embeddings.batching import MicroBatchingEncoder, parse_batching
+from app.embeddings.cache import CachedEmbeddingEncoder, EmbeddingCache
+from app.embeddings.encoder import EmbeddingEncoder
+from app.observability.metrics import REGISTRY
+
+
+LOCAL_MODEL = "all-MiniLM-L6-v2"
+
+
+class EncoderRegistry:
+    """
+    Process-wide cache of embedding encoders.
+
+    - one instance per (backend, model) key
+    - bounded LRU for rarely used model overrides
+    - warmed keys are pinned and never evicted
+    - lazy, thread-safe construction (each key is loaded at most once)
+    - eviction only forgets an encoder; it is closed, on a background
+      thread, once the last lease() on it ends
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max(1, max_size)
+
+        self._encoders: "OrderedDict[tuple[str, str], EmbeddingEncoder]" = OrderedDict()
+        self._pinned: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+        # id(encoder) -> (encoder, active leases); evicted encoders stay here until released
+        self._leases: dict[int, list] = {}
+        self._retired: set[int] = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.load_seconds = 0.0
+        self.evictions = 0
+
+    def get(
+        self,
+        key: tuple[str, str],
+        build: Callable[[], EmbeddingEncoder],
+        pin: bool = False,
+        lease: bool = False,
+    ) -> EmbeddingEncoder:
+        """The encoder for key; with lease=True it is not closed before release()."""
+        with self._lock:
+            encoder = self._encoders.get(key)
+            if encoder is not None:
+                self._encoders.move_to_end(key)
+                self.hits += 1
+                if pin:
+                    self._pinned.add(key)
+                if lease:
+                    self._lease(encoder)
+                return encoder
+
+            self.misses += 1
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Build outside the registry lock so a slow model load
+        # does not block lookups for other keys.
+        with key_lock:
+            with self._lock:
+                encoder = self._encoders.get(key)
+                if encoder is not None:
+                    self._encoders.move_to_end(key)
+                    if pin:
+                        self._pinned.add(key)
+                    if lease:
+                        self._lease(encoder)
+                    return encoder
+
+            started = time.perf_counter()
+            try:
+                encoder = build()
+            except Exception:
+                with self._lock:
+                    self.load_failures += 1
+                raise
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self.loads += 1
+                self.load_seconds += elapsed
+                self._encoders[key] = encoder
+                if pin:
+                    self._pinned.add(key)
+                if lease:
+                    self._lease(encoder)
+                evicted = self._evict()
+
+        _close(evicted)
+        return encoder
+
+    def _lease(self, encoder: EmbeddingEncoder) -> None:
+        self._leases.setdefault(id(encoder), [encoder, 0])[1] += 1
+
+    def release(self, encoder: EmbeddingEncoder) -> None:
+        """End a lease taken with get(lease=True)."""
+        with self._lock:
+            entry = self._leases.get(id(encoder))
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._leases[id(encoder)]
+            if id(encoder) not in self._retired:
+                return
+            self._retired.discard(id(encoder))
+        _close([encoder])
+
+    @contextmanager
+    def lease(
+        self, key: tuple[str, str], build: Callable[[], EmbeddingEncoder]
+    ) -> Iterator[EmbeddingEncoder]:
+        encoder = self.get(key, build, lease=True)
+        try:
+            yield encoder
+        finally:
+            self.release(encoder)
+
+    def _evict(self) -> list:
+        """Drop least recently used entries past max_size; returns those free to close."""
+        closable = []
+        for key in list(self._encoders):
+            if len(self._encoders) <= self.max_size:
+                break
+            if key in self._pinned:
+                continue
+            encoder = self._encoders.pop(key)
+            self._key_locks.pop(key, None)
+            self.evictions += 1
+
+            if id(encoder) in self._leases:
+                self._retired.add(id(encoder))
+            else:
+                closable.append(encoder)
+        return closable
+
+    def clear(self) -> None:
+        with self._lock:
+            self._encoders.clear()
+            self._pinned.clear()
+            self._key_locks.clear()
+
+    def keys(self) -> list[tuple[str, str]]:
+        with self._lock:
+            return list(self._encoders)
+
+    def items(self) -> list[tuple[tuple[str, str], EmbeddingEncoder]]:
+        with self._lock:
+            return list(self._encoders.items())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._encoders),
+                "max_size": self.max_size,
+                "pinned": len(self._pinned),
+                "leased": len(self._leases),
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "load_failures": self.load_failures,
+                "load_seconds": round(self.load_seconds, 6),
+                "evictions": self.evictions,
+            }
+
+
+def _close(encoders: list) -> None:
+    """Close evicted encoders off the caller's thread: close() may join worker threads."""
+    closers = [close for close in (getattr(e, "close", None) for e in encoders) if close is not None]
+    if not closers:
+        return
+
+    def run() -> None:
+        for close in closers:
+            close()
+
+    threading.Thread(target=run, name="encoder-close", daemon=True).start()
+
+
+_registry = EncoderRegistry(settings.encoder_cache_size)
+
+
+def _with_cache(key: tuple[str, str], build: Callable[[], EmbeddingEncoder]):
+    if not settings.embedding_cache_enabled:
+        return build
+
+    def build_cached() -> EmbeddingEncoder:
+        root = settings.embedding_cache_dir or os.path.join(settings.log_dir, "embedding_cache")
+        backend, model_id = key
+
+        def open_cache(dim: Optional[int]) -> Optional[EmbeddingCache]:
+            max_rows = settings.embedding_cache_max_rows
+            if dim is None:
+                return EmbeddingCache.open_existing(root, backend, model_id, max_rows=max_rows)
+            return EmbeddingCache(root, backend, model_id, dim, max_rows=max_rows)
 
+        return CachedEmbeddingEncoder(build(), open_cache)
 
-def get_embedding_encoder(embedding_model: str | None = None):
+    return build_cached
+
+
+def _with_batching(key: tuple[str, str], build: Callable[[], EmbeddingEncoder]):
+    limits = parse_batching(settings.embedding_microbatch).get(key[0])
+    if limits is None:
+        return build
+
+    def build_batched() -> EmbeddingEncoder:
+        backend, model_id = key
+        return MicroBatchingEncoder(build(), *limits, backend=backend, model=model_id)
+
+    return build_batched
+
+
+def _build_local(model_name: str) -> EmbeddingEncoder:
+    from app.embeddings.local import LocalEmbeddingEncoder
+
+    return LocalEmbeddingEncoder(model_name)
+
+
+def _build_bytez(model_id: str) -> EmbeddingEncoder:
+    from app.embeddings.bytez import BytezEmbeddingEncoder
+
+    return BytezEmbeddingEncoder(model_override=model_id)
+
+
+def _build_hash(dim: int) -> EmbeddingEncoder:
+    from app.embeddings.hashing import HashEmbeddingEncoder
+
+    return HashEmbeddingEncoder(dim)
+
+
+def _resolve(embedding_model: Optional[str]):
+    # Backend modules (and torch / the Bytez SDK behind them) are
+    # imported only when an encoder of that backend is first built.
     backend = settings.embedding_backend.lower()
 
     if backend == "local":
-        return LocalEmbeddingEncoder()
+        # The local backend always serves the bundled model;
+        # overrides only apply to remote providers.
+        key = (backend, LOCAL_MODEL)
+        return key, _with_cache(key, _with_batching(key, lambda: _build_local(LOCAL_MODEL)))
 
     if backend == "bytez":
-        return BytezEmbeddingEncoder(
-            model_override=embedding_model
-        )
+        model_id = embedding_model or settings.bytez_embedding_model
+        key = (backend, model_id)
+        return key, _with_cache(key, _with_batching(key, lambda: _build_bytez(model_id)))
+
+    if backend == "hash":
+        # Offline and deterministic; benchmarks and tests. Never cached on disk.
+        key = (backend, f"hash-{settings.embedding_dim}")
+        return key, _with_batching(key, lambda: _build_hash(settings.embedding_dim))
 
     raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def get_embedding_encoder(embedding_model: str | None = None) -> EmbeddingEncoder:
+    """
+    The shared encoder for embedding_model. It may be closed once evicted;
+    for use while other models come and go, hold it with encoder_lease().
+    """
+    key, build = _resolve(embedding_model)
+    return _registry.get(key, build)
+
+
+def encoder_lease(embedding_model: str | None = None):
+    """Context manager: the shared encoder, kept open until the block ends."""
+    key, build = _resolve(embedding_model)
+    return _registry.lease(key, build)
+
+
+def encoder_key(embedding_model: str | None = None) -> tuple[str, str]:
+    """(backend, model id) the encoder for embedding_model is registered under."""
+    key, _ = _resolve(embedding_model)
+    return key
+
+
+def warm_encoders(models: Iterable[str | None] = (None,)) -> None:
+    """
+    Load encoders ahead of traffic so no model load lands on the request path.
+    Warmed encoders are pinned in the registry.
+    """
+    for model in models:
+        key, build = _resolve(model)
+        _registry.get(key, build, pin=True)
+
+
+def encoder_stats() -> dict:
+    return _registry.stats()
+
+
+def _collect_metrics():
+    stats = _registry.stats()
+    yield "encoder_registry_size", "gauge", "Encoders currently loaded", [({}, stats["size"])]
+    for name in ("hits", "misses", "loads", "load_failures", "evictions"):
+        yield (
+            f"encoder_registry_{name}_total", "counter",
+            f"Encoder registry {name.replace('_', ' ')}", [({}, stats[name])],
+        )
+    yield "encoder_registry_load_seconds_total", "counter", "Time spent loading encoders", [({}, stats["load_seconds"])]
+
+    cached = [
+        ({"backend": backend, "model": model}, encoder)
+        for (backend, model), encoder in _registry.items()
+        if isinstance(encoder, CachedEmbeddingEncoder)
+    ]
+    yield "embedding_cache_hits_total", "counter", "Texts served from the embedding cache", [
+        (labels, encoder.hits) for labels, encoder in cached
+    ]
+    yield "embedding_cache_misses_total", "counter", "Texts sent to the encoder", [
+        (labels, encoder.misses) for labels, encoder in cached
+    ]
+
+
+REGISTRY.register_collector(_collect_metrics)
@@ -0,0 +1,43 @@
+import hashlib
+import re
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+from app.embeddings.encoder import EmbeddingEncoder
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=1 << 16)
+def _bucket(token: str, dim: int) -> tuple[int, float]:
+    digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest % dim, 1.0 if digest >> 63 else -1.0
+
+
+class HashEmbeddingEncoder(EmbeddingEncoder):
+    """
+    Feature-hashing encoder: signed token counts folded into `dim`
+    buckets, L2-normalised.
+
+    Deterministic across processes and fully offline; texts sharing
+    words get similar vectors. Meant for benchmarks and tests, not
+    for semantic quality.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                col, sign = _bucket(token, self.dim)
+                out[row, col] += sign
+
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out.tolist()
@@ -1,5 +1,4 @@
 from typing import List
-from sentence_transformers import SentenceTransformer
 
 from app.embeddings.encoder import EmbeddingEncoder
 
@@ -11,6 +10,9 @@ class LocalEmbeddingEncoder(EmbeddingEncoder):
     """
 
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        # torch is loaded here, not when the module is imported
+        from sentence_transformers import SentenceTransformer
+
         self.model = SentenceTransformer(model_name)
 
     def encode(self, texts: List[str]) -> List[List[float]]:
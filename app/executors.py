@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from app.config import settings
+
+
+_lock = threading.Lock()
+_executors: dict[str, ThreadPoolExecutor] = {}
+
+
+def _executor(name: str, workers: int) -> ThreadPoolExecutor:
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(max(1, workers), thread_name_prefix=name)
+            _executors[name] = executor
+        return executor
+
+
+def cpu_executor() -> ThreadPoolExecutor:
+    """Dedicated pool for encoder inference and vector search."""
+    return _executor("encode", settings.encoder_threads)
+
+
+def io_executor() -> ThreadPoolExecutor:
+    """Pool for blocking I/O: remote embedding calls and audit writes."""
+    return _executor("io", settings.io_threads)
+
+
+async def run_cpu(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor(), partial(fn, *args, **kwargs))
+
+
+async def run_io(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor(), partial(fn, *args, **kwargs))
+
+
+def shutdown() -> None:
+    with _lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=True)
+        _executors.clear()
@@ -0,0 +1,78 @@
+"""
+Stream documents into a persistent (mmap) vector index.
+
+    python -m app.ingest corpus/ extra.jsonl --out logs/vector_index
+    python -m app.ingest corpus/ --resume      # continue an interrupted run
+
+Serve the result with VECTOR_STORE=mmap, VECTOR_STORE_DIR=<out> and
+KNOWLEDGE_BASE_PATH=<out>.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from app.config import settings
+from app.embeddings.factory import encoder_key, get_embedding_encoder
+from app.ingest.pipeline import SnapshotSink, ingest, source_fingerprint
+from app.ingest.sources import iter_documents
+
+
+def _parse_args():
+    default_out = settings.vector_store_dir or os.path.join(settings.log_dir, "vector_index")
+    parser = argparse.ArgumentParser(description="Ingest documents into the vector index")
+    parser.add_argument("sources", nargs="+", help="JSONL files, .txt/.md files or directories")
+    parser.add_argument("--out", default=default_out, help=f"index root (default: {default_out})")
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks per encoder call")
+    parser.add_argument("--chunk-chars", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="batches between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    parser.add_argument("--embedding-model", help="encoder model override")
+    return parser.parse_args()
+
+
+def _report(stats) -> None:
+    print(
+        f"ingest: {stats.resumed_from + stats.documents} documents, {stats.chunks} chunks, "
+        f"{stats.chunks_per_second:.0f} chunks/s",
+        file=sys.stderr,
+    )
+
+
+def main() -> int:
+    args = _parse_args()
+
+    encoder = get_embedding_encoder(args.embedding_model)
+    backend, model_id = encoder_key(args.embedding_model)
+    fingerprint = source_fingerprint(
+        args.sources,
+        backend=backend,
+        model=model_id,
+        chunk_chars=args.chunk_chars,
+        overlap=args.overlap,
+    )
+
+    # The dimension comes from the encoder's first batch
+    sink = SnapshotSink(args.out, fingerprint=fingerprint, resume=args.resume)
+    if sink.start:
+        print(f"ingest: resuming after {sink.start} documents", file=sys.stderr)
+
+    stats = ingest(
+        iter_documents(args.sources),
+        encoder,
+        sink,
+        batch_size=args.batch_size,
+        max_chars=args.chunk_chars,
+        overlap=args.overlap,
+        checkpoint_every=args.checkpoint_every,
+        progress=_report,
+    )
+
+    print(json.dumps(stats.to_dict(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
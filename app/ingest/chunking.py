@@ -0,0 +1,68 @@
+from dataclasses import replace
+from typing import Iterator, List
+
+from app.retrieval.documents import Document
+
+
+CHUNK_SEPARATOR = "#"
+
+
+def split_text(text: str, max_chars: int, overlap: int = 0) -> List[str]:
+    """
+    Split text into pieces of at most max_chars, breaking at whitespace
+    where possible; consecutive pieces share about `overlap` characters.
+    """
+    if max_chars <= 0:
+        raise ValueError("max_chars must be positive")
+    if not 0 <= overlap < max_chars:
+        raise ValueError("overlap must be in [0, max_chars)")
+
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text]
+
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + max_chars)
+        if end < len(text):
+            cut = text.rfind(" ", start + 1, end)
+            if cut > start + overlap:
+                end = cut
+        pieces.append(text[start:end].strip())
+        if end >= len(text):
+            break
+
+        # Step back by the overlap, then forward to a word start
+        start = max(start + 1, end - overlap)
+        if overlap and start > 0 and not text[start - 1].isspace():
+            space = text.find(" ", start, end)
+            if space != -1:
+                start = space + 1
+
+    return [p for p in pieces if p]
+
+
+def chunk_document(doc: Document, max_chars: int = 1000, overlap: int = 100) -> List[Document]:
+    """
+    Long documents become `<id>#<n>` chunks that keep the parent's
+    title, source and reliability; short ones pass through unchanged.
+    Source ids may not contain `#`, so a chunk id never equals a
+    document id.
+    """
+    if CHUNK_SEPARATOR in doc.id:
+        raise ValueError(f"Document id {doc.id!r} contains {CHUNK_SEPARATOR!r}, which is reserved for chunk ids")
+
+    pieces = split_text(doc.content, max_chars, overlap)
+    if len(pieces) == 1:
+        return [doc]
+
+    return [
+        replace(doc, id=f"{doc.id}{CHUNK_SEPARATOR}{n}", content=piece)
+        for n, piece in enumerate(pieces)
+    ]
+
+
+def chunk_documents(documents, max_chars: int = 1000, overlap: int = 100) -> Iterator[Document]:
+    for doc in documents:
+        yield from chunk_document(doc, max_chars, overlap)
@@ -0,0 +1,299 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.fileutils import FileLock
+from app.ingest.chunking import chunk_document
+from app.ingest.sources import DOCUMENTS_FILE, document_to_record
+from app.retrieval.documents import Document
+from app.retrieval.keyword_index import KeywordIndex
+from app.vectorstore.mmap_store import SnapshotWriter
+from app.vectorstore.store import VectorStore
+
+
+STAGING_DIR = ".ingest"
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+@dataclass
+class IngestStats:
+    documents: int = 0
+    chunks: int = 0
+    batches: int = 0
+    resumed_from: int = 0
+    seconds: float = 0.0
+    encode_seconds: float = 0.0
+    generation: Optional[str] = None
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "batches": self.batches,
+            "resumed_from": self.resumed_from,
+            "seconds": round(self.seconds, 3),
+            "encode_seconds": round(self.encode_seconds, 3),
+            "chunks_per_second": round(self.chunks_per_second, 1),
+            "generation": self.generation,
+        }
+
+
+class IndexSink:
+    """Upserts each batch straight into a live vector store and keyword index."""
+
+    start = 0
+
+    def __init__(self, store: VectorStore, keyword_index: KeywordIndex):
+        self.store = store
+        self.keyword_index = keyword_index
+
+    def write(self, chunks: List[Document], vectors) -> None:
+        self.store.upsert([c.id for c in chunks], vectors)
+        self.keyword_index.add(chunks)
+
+    def checkpoint(self, position: int) -> None:
+        pass
+
+    def close(self) -> Optional[str]:
+        return None
+
+    def release(self) -> None:
+        pass
+
+
+class SnapshotSink:
+    """
+    Streams vectors and documents into a new mmap index generation.
+
+    Memory stays bounded by the batch size: rows go straight to a
+    staging directory (root/.ingest). checkpoint() makes the staging
+    files durable and records how many source documents they cover;
+    a later run with resume=True and the same fingerprint continues
+    from there. close() publishes the generation atomically.
+
+    - dim None takes the dimension from the first encoded batch; the
+      checkpoint records it for a resumed run
+    """
+
+    def __init__(self, root: str | Path, dim: Optional[int] = None, fingerprint: str = "", resume: bool = False):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.fingerprint = fingerprint
+
+        # One ingest per index root at a time
+        self._lock = FileLock(self.root / ".ingest.lock")
+        self._lock.__enter__()
+
+        staging = self.root / STAGING_DIR
+        state = _read_checkpoint(staging / CHECKPOINT_FILE) if resume else None
+        if state is not None and state.get("fingerprint") != fingerprint:
+            state = None  # different sources or settings: start over
+
+        if state is None:
+            self.start = 0
+            self.writer = SnapshotWriter(self.root, dim, staging=staging)
+            self._documents = (staging / DOCUMENTS_FILE).open("w", encoding="utf-8")
+        else:
+            self.start = state["position"]
+            self.writer = SnapshotWriter.resume(self.root, state.get("dim", dim), staging, state["rows"])
+            with (staging / DOCUMENTS_FILE).open("r+b") as f:
+                f.truncate(state["documents_bytes"])
+            self._documents = (staging / DOCUMENTS_FILE).open("a", encoding="utf-8")
+
+    def write(self, chunks: List[Document], vectors) -> None:
+        self.writer.append([c.id for c in chunks], np.asarray(vectors, dtype=np.float32))
+        self._documents.write(
+            "".join(json.dumps(document_to_record(c), ensure_ascii=False) + "\n" for c in chunks)
+        )
+
+    def checkpoint(self, position: int) -> None:
+        self.writer.sync()
+        self._documents.flush()
+        os.fsync(self._documents.fileno())
+
+        state = {
+            "fingerprint": self.fingerprint,
+            "position": position,
+            "rows": self.writer.count,
+            "dim": self.writer.dim,
+            "documents_bytes": self._documents.tell(),
+        }
+        path = self.writer.tmp / CHECKPOINT_FILE
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def close(self) -> str:
+        try:
+            self._documents.flush()
+            os.fsync(self._documents.fileno())
+            self._documents.close()
+            (self.writer.tmp / CHECKPOINT_FILE).unlink(missing_ok=True)
+            return self.writer.commit()
+        finally:
+            self._lock.__exit__(None, None, None)
+
+    def release(self) -> None:
+        """Stop without publishing; the staging directory is kept for resume."""
+        if not self._documents.closed:
+            self._documents.close()
+        self.writer.release()
+        self._lock.__exit__(None, None, None)
+
+
+def _read_checkpoint(path: Path) -> Optional[dict]:
+    try:
+        with path.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def source_fingerprint(paths: Iterable[str | Path], **settings) -> str:
+    """Identifies an ingest run for resume: source paths, sizes, mtimes and settings."""
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path])
+
+    digest = hashlib.sha256()
+    for path in files:
+        stat = path.stat()
+        digest.update(f"{path.resolve()}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+_DONE = object()
+
+
+def _batches(
+    documents: Iterator[Document], batch_size: int, max_chars: int, overlap: int
+) -> Iterator[Tuple[int, List[Document]]]:
+    """
+    Whole documents' chunks grouped into batches of about batch_size,
+    each with the number of source documents consumed so far. Batches
+    end on document boundaries so that number is a safe resume point.
+    """
+    position = 0
+    batch: List[Document] = []
+    for doc in documents:
+        batch.extend(chunk_document(doc, max_chars, overlap))
+        position += 1
+        if len(batch) >= batch_size:
+            yield position, batch
+            batch = []
+    if batch:
+        yield position, batch
+
+
+def _prefetch(items: Iterator, depth: int) -> Iterator:
+    """Produce items on a background thread, at most `depth` ahead of the consumer."""
+    buffer: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                buffer.put(item)
+            buffer.put(_DONE)
+        except BaseException as error:  # re-raised in the consumer
+            buffer.put(error)
+
+    thread = threading.Thread(target=produce, name="ingest-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full buffer
+        while thread.is_alive():
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                thread.join(0.05)
+
+
+def ingest(
+    documents: Iterable[Document],
+    encoder,
+    sink,
+    batch_size: int = 64,
+    max_chars: int = 1000,
+    overlap: int = 100,
+    prefetch: int = 2,
+    checkpoint_every: int = 10,
+    progress: Optional[Callable[[IngestStats], None]] = None,
+    progress_every: float = 5.0,
+) -> IngestStats:
+    """
+    Stream documents into a sink.
+
+    Reading and chunking run one thread ahead (up to `prefetch`
+    batches) while the current batch is encoded and written, so at most
+    (prefetch + 1) batches are in memory. The sink is checkpointed every
+    `checkpoint_every` batches and at the end.
+    """
+    stats = IngestStats(resumed_from=sink.start)
+    started = last_report = time.perf_counter()
+
+    source = islice(iter(documents), sink.start, None)
+    position = sink.start
+    # Corpus encoding: may be persisted by a caching encoder; plain encoders just encode()
+    encode = getattr(encoder, "encode_documents", encoder.encode)
+
+    try:
+        for consumed, chunks in _prefetch(_batches(source, batch_size, max_chars, overlap), prefetch):
+            position = sink.start + consumed
+
+            t0 = time.perf_counter()
+            vectors = encode([c.content for c in chunks])
+            stats.encode_seconds += time.perf_counter() - t0
+
+            sink.write(chunks, vectors)
+            stats.batches += 1
+            stats.chunks += len(chunks)
+            stats.documents = consumed
+
+            if stats.batches % checkpoint_every == 0:
+                sink.checkpoint(position)
+
+            now = time.perf_counter()
+            if progress is not None and now - last_report >= progress_every:
+                stats.seconds = now - started
+                progress(stats)
+                last_report = now
+
+        sink.checkpoint(position)
+    except BaseException:
+        # Keep what was checkpointed; a resumed run continues from there
+        sink.release()
+        raise
+
+    stats.generation = sink.close()
+    stats.seconds = time.perf_counter() - started
+    return stats
@@ -0,0 +1,101 @@
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+from app.retrieval.documents import Document
+
+
+DEFAULT_RELIABILITY = 0.5
+TEXT_SUFFIXES = (".txt", ".md")
+DOCUMENTS_FILE = "documents.jsonl"
+
+
+def document_from_record(record: dict, origin: str) -> Document:
+    try:
+        doc_id, content = str(record["id"]), str(record["content"])
+    except KeyError as missing:
+        raise ValueError(f"{origin}: record has no {missing.args[0]!r}") from None
+
+    return Document(
+        id=doc_id,
+        title=str(record.get("title") or doc_id),
+        content=content,
+        source=str(record.get("source") or f"file:{origin.split(':')[0]}"),
+        reliability=float(record.get("reliability", DEFAULT_RELIABILITY)),
+    )
+
+
+def document_to_record(doc: Document) -> dict:
+    return {
+        "id": doc.id,
+        "title": doc.title,
+        "content": doc.content,
+        "source": doc.source,
+        "reliability": doc.reliability,
+    }
+
+
+def read_jsonl(path: str | Path) -> Iterator[Document]:
+    """One Document per non-blank line: {"id", "content", "title"?, "source"?, "reliability"?}."""
+    path = Path(path)
+    with path.open(encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"{path}:{number}: {error}") from None
+            yield document_from_record(record, f"{path}:{number}")
+
+
+def read_text_file(path: Path, root: Path) -> Document:
+    """A whole .txt/.md file; the id is its path relative to root."""
+    content = path.read_text(encoding="utf-8")
+    rel = path.relative_to(root).as_posix()
+    first = next((line.strip("# ").strip() for line in content.splitlines() if line.strip()), rel)
+    return Document(
+        id=rel,
+        title=first[:200],
+        content=content,
+        source=f"file:{rel}",
+        reliability=DEFAULT_RELIABILITY,
+    )
+
+
+def read_directory(path: str | Path) -> Iterator[Document]:
+    """Every .jsonl, .txt and .md file under path, in sorted (reproducible) order."""
+    root = Path(path)
+    for file in sorted(p for p in root.rglob("*") if p.is_file()):
+        if file.suffix == ".jsonl":
+            yield from read_jsonl(file)
+        elif file.suffix in TEXT_SUFFIXES:
+            yield read_text_file(file, root)
+
+
+def iter_documents(paths: Iterable[str | Path]) -> Iterator[Document]:
+    """Stream documents from JSONL files and directories, one at a time."""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            yield from read_directory(path)
+        elif path.suffix == ".jsonl":
+            yield from read_jsonl(path)
+        elif path.suffix in TEXT_SUFFIXES:
+            yield read_text_file(path, path.parent)
+        else:
+            raise ValueError(f"Unsupported document source: {path}")
+
+
+def load_documents(path: str | Path) -> List[Document]:
+    """
+    Documents from a JSONL file, a directory, or an ingested index
+    root (its current generation's documents.jsonl).
+    """
+    from app.vectorstore.mmap_store import read_current
+
+    path = Path(path)
+    generation = read_current(path) if path.is_dir() else None
+    if generation:
+        return list(read_jsonl(path / generation / DOCUMENTS_FILE))
+    return list(iter_documents([path]))
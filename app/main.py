@@ -1,58 +1,165 @@
+import asyncio
+import time
 from uuid import uuid4
 from datetime import datetime, timezone
 
-from app.core.risk_classifier import classify_risk
-from app.core.policy_resolver import resolve_policy
+from app.config import settings
+from app.core.risk_classifier import classify_risk, matcher
+from app.core.policy_resolver import resolve_policy, policy_version
 from app.core.eligibility_gate import evaluate_eligibility
-from app.retrieval.retriever import retrieve_context
+from app.core.result_cache import ResultCache
+from app.core.singleflight import SingleFlight
+from app.retrieval.retriever import (
+    knowledge_base_version,
+    retrieve_context,
+    retrieve_context_async,
+    retrieve_context_batch,
+)
 from app.retrieval.confidence import score_confidence
+from app.schemas.contracts import RetrievalResult
 from app.generation.generator import generate_answer
-from app.audit.logger import audit_log
+from app.audit.logger import audit_log, audit_log_async
+from app.embeddings.factory import encoder_key
+from app.observability.metrics import REGISTRY
+from app.observability.profiler import StageTimer
 
 
-def handle_request(user_query: str, embedding_model: str | None = None) -> dict:
-    """
-    Handle a single user query through the LLM control pipeline.
+DECISIONS = REGISTRY.counter(
+    "pipeline_decisions_total", "Eligibility decisions", ["decision", "reason_code"]
+)
+RISKS = REGISTRY.counter(
+    "pipeline_risk_total", "Risk classifications", ["category", "level"]
+)
+
+# Stages 1-3 results (risk, policy, retrieval) of recent queries
+_results = ResultCache(
+    settings.result_cache_size,
+    ttl=settings.result_cache_ttl,
+    policy=settings.result_cache_policy,
+)
+
+# Concurrent misses for the same cache key wait for one run of stages 1-3
+_inflight = SingleFlight()
+
+
+def _new_request() -> tuple[str, str]:
+    return str(uuid4()), datetime.now(timezone.utc).isoformat()
+
+
+# Retrieval result of requests whose policy blocks generation
+_SKIPPED = RetrievalResult(documents=[], retrieval_score=0.0, candidate_count=0)
+
+
+def _classify(user_query: str, timer: StageTimer):
+    """Stages 1-2: risk classification and policy resolution."""
+    with timer.stage("risk"):
+        risk = classify_risk(user_query)
+
+    with timer.stage("policy"):
+        policy = resolve_policy(risk)
+
+    return risk, policy
 
-    Deterministic, auditable, and safe by default.
-    """
-    request_id = str(uuid4())
-    timestamp = datetime.now(timezone.utc).isoformat()
 
-    # 1. Risk classification
+def classify_query(user_query: str):
+    """Stages 1-2 alone, for admission decisions ahead of the pipeline: (risk, policy)."""
     risk = classify_risk(user_query)
+    return risk, resolve_policy(risk)
 
-    # 2. Policy resolution
-    policy = resolve_policy(risk)
 
-    # 3. Grounded retrieval
-    retrieval = retrieve_context(
-    user_query,
-    policy,
-    embedding_model=embedding_model,  # NEW
+def policy_blocks(policy) -> bool:
+    """
+    The policy forbids generation, so the decision is POLICY_BLOCK
+    whatever retrieval finds: such requests skip the encoder and
+    vector store (POLICY_FAST_PATH=0 keeps retrieving, for the audit).
+    """
+    return settings.policy_fast_path and not policy.generation_allowed
+
+
+def _cache_key(user_query: str, embedding_model: str | None) -> tuple:
+    """
+    Everything stages 1-3 depend on. Only surrounding whitespace is
+    normalised: case and inner spacing can change risk phrases and
+    embeddings. A new corpus, policy table or keyword set changes the
+    version fields, so older entries are never hit again.
+    """
+    return (
+        user_query.strip(),
+        embedding_model,
+        knowledge_base_version(),
+        policy_version(),
+        matcher().fingerprint,
     )
 
 
+def _coalesce(key, stages, timer: StageTimer):
+    """
+    Stages 1-3 for a cache miss, shared with an identical request already
+    running them. Returns ((risk, policy, retrieval), coalesced); a
+    coalesced request times its wait instead of the stages.
+    """
+    if not settings.request_coalescing:
+        return stages(), False
+    started = time.perf_counter()
+    result, coalesced = _inflight.do(key, stages)
+    if coalesced:
+        timer.record("coalesced_wait", time.perf_counter() - started)
+    return result, coalesced
+
+
+async def _acoalesce(key, stages, timer: StageTimer):
+    """_coalesce for the async path; sync and async requests share flights."""
+    if not settings.request_coalescing:
+        return await stages(), False
+    started = time.perf_counter()
+    result, coalesced = await _inflight.ado(key, stages)
+    if coalesced:
+        timer.record("coalesced_wait", time.perf_counter() - started)
+    return result, coalesced
+
+
+def _judge(risk, policy, retrieval, timer: StageTimer):
+    """Stages 4-5: confidence scoring and the eligibility decision."""
+    RISKS.labels(category=risk.category.value, level=risk.level.value).inc()
+
     # 4. Confidence scoring
-    confidence = score_confidence(retrieval)
+    with timer.stage("confidence"):
+        confidence = score_confidence(retrieval)
 
     # 5. Eligibility decision
-    eligibility = evaluate_eligibility(policy, confidence)
+    with timer.stage("eligibility"):
+        eligibility = evaluate_eligibility(policy, confidence)
+
+    DECISIONS.labels(
+        decision=eligibility.decision.value,
+        reason_code=eligibility.reason_code.value,
+    ).inc()
+
+    return confidence, eligibility
 
-    # 6. Controlled answer generation (only if allowed)
-    answer = None
-    if eligibility.decision.value == "ALLOW":
-        from app.generation.evidence import EvidenceBundle
 
+def _generate(user_query, retrieval, confidence, eligibility, timer: StageTimer):
+    """Stage 6: controlled answer generation (only if allowed)."""
+    if eligibility.decision.value != "ALLOW":
+        return None
+
+    from app.generation.evidence import EvidenceBundle
+
+    with timer.stage("generation"):
         bundle = EvidenceBundle(
             query=user_query,
             documents=retrieval.documents,
             confidence=confidence.score,
         )
 
-        answer = generate_answer(bundle)
+        return generate_answer(bundle)
 
 
+def _respond(
+    request_id, timestamp, user_query, risk, policy, retrieval, confidence, eligibility, answer, timer,
+    cache_hit=False, embedding_model=None, coalesced=False,
+) -> tuple[dict, dict]:
+    """Stage 7: the API response and the audit record."""
     # 7. API-safe response (frontend & Docker ready)
     response = {
         "request_id": request_id,
@@ -64,8 +171,7 @@ def handle_request(user_query: str, embedding_model: str | None = None) -> dict:
         "answer": answer,
     }
 
-    # 8. Mandatory audit logging (authoritative record)
-    audit_log(
+    record = dict(
         request_id=request_id,
         timestamp=timestamp,
         user_query=user_query,
@@ -75,11 +181,322 @@ def handle_request(user_query: str, embedding_model: str | None = None) -> dict:
         confidence=confidence.to_dict(),
         decision=eligibility.to_dict(),
         response=response,
+        cache_hit=cache_hit,
+        coalesced=coalesced,
+        embedding_model="/".join(encoder_key(embedding_model)),
     )
 
+    # Sampled requests carry their stage timings (audit excluded: it is the write itself)
+    if timer.sampled:
+        record["timings"] = timer.timings()
+
+    return response, record
+
+
+def _decide(
+    request_id, timestamp, user_query, risk, policy, retrieval, timer,
+    cache_hit=False, embedding_model=None, coalesced=False,
+) -> tuple[dict, dict]:
+    """
+    Stages 4-7: everything after retrieval except the audit write.
+    Returns (response, audit record); shared by every entry point.
+    """
+    confidence, eligibility = _judge(risk, policy, retrieval, timer)
+    answer = _generate(user_query, retrieval, confidence, eligibility, timer)
+    return _respond(
+        request_id, timestamp, user_query, risk, policy, retrieval, confidence, eligibility, answer, timer,
+        cache_hit, embedding_model, coalesced,
+    )
+
+
+def _complete(
+    request_id, timestamp, user_query, risk, policy, retrieval, timer,
+    cache_hit=False, embedding_model=None, coalesced=False,
+) -> dict:
+    response, record = _decide(
+        request_id, timestamp, user_query, risk, policy, retrieval, timer, cache_hit, embedding_model, coalesced
+    )
+
+    # 8. Mandatory audit logging (authoritative record)
+    with timer.stage("audit"):
+        audit_log(**record)
+
+    timer.finish()
     return response
 
 
+def handle_request(user_query: str, embedding_model: str | None = None) -> dict:
+    """
+    Handle a single user query through the LLM control pipeline.
+
+    Deterministic, auditable, and safe by default.
+    """
+    request_id, timestamp = _new_request()
+    timer = StageTimer("sync")
+
+    # Repeated queries reuse stages 1-3; they still get their own audit record
+    key = _cache_key(user_query, embedding_model)
+    cached = _results.get(key)
+    if cached is not None:
+        return _complete(
+            request_id, timestamp, user_query, *cached, timer, cache_hit=True, embedding_model=embedding_model
+        )
+
+    def stages():
+        # 1. Risk classification
+        # 2. Policy resolution
+        risk, policy = _classify(user_query, timer)
+
+        # 3. Grounded retrieval
+        if policy_blocks(policy):
+            retrieval = _SKIPPED
+        else:
+            with timer.stage("retrieval"):
+                retrieval = retrieve_context(
+                    user_query,
+                    policy,
+                    embedding_model=embedding_model,
+                )
+
+        _results.put(key, (risk, policy, retrieval))
+        return risk, policy, retrieval
+
+    result, coalesced = _coalesce(key, stages, timer)
+    return _complete(
+        request_id, timestamp, user_query, *result, timer,
+        embedding_model=embedding_model, coalesced=coalesced,
+    )
+
+
+async def handle_request_async(
+    user_query: str, embedding_model: str | None = None, classified: tuple | None = None
+) -> dict:
+    """
+    Async handle_request for the API server.
+
+    Same stages and results; encoding, vector search and the audit
+    write run off the event loop, so one worker can keep many
+    requests in flight while they wait. classified is a
+    classify_query() result the caller already has.
+    """
+    request_id, timestamp = _new_request()
+    timer = StageTimer("async")
+
+    key = _cache_key(user_query, embedding_model)
+    coalesced = False
+    cached = _results.get(key)
+    if cached is not None:
+        risk, policy, retrieval = cached
+    else:
+        async def stages():
+            risk, policy = classified or _classify(user_query, timer)
+
+            if policy_blocks(policy):
+                retrieval = _SKIPPED
+            else:
+                with timer.stage("retrieval"):
+                    retrieval = await retrieve_context_async(
+                        user_query,
+                        policy,
+                        embedding_model=embedding_model,
+                    )
+
+            _results.put(key, (risk, policy, retrieval))
+            return risk, policy, retrieval
+
+        (risk, policy, retrieval), coalesced = await _acoalesce(key, stages, timer)
+
+    response, record = _decide(
+        request_id, timestamp, user_query, risk, policy, retrieval, timer,
+        cached is not None, embedding_model, coalesced,
+    )
+
+    with timer.stage("audit"):
+        await audit_log_async(**record)
+
+    timer.finish()
+    return response
+
+
+# Streamed requests still running or waiting to write their audit record
+_streams: set = set()
+
+
+class StreamedRequest:
+    """
+    handle_request_async, one event per stage as it completes.
+
+    - events() yields (event, data): risk, policy, retrieval, confidence,
+      decision, answer (ALLOW only), then done with the /query response;
+      an abstention goes from decision straight to done
+    - the stages run in their own task, so a client that goes away does
+      not cut the request short; the audit record is written once the
+      last event has been taken, the consumer has closed events() or
+      called close(), or at the latest send_timeout seconds after the
+      stages finish (events() may never be started at all)
+    - task completes after the audit write
+    """
+
+    send_timeout = settings.stream_send_timeout
+
+    def __init__(self, user_query: str, embedding_model: str | None = None, classified: tuple | None = None):
+        self.user_query = user_query
+        self.embedding_model = embedding_model
+        self.request_id, self.timestamp = _new_request()
+        self._classified = classified
+        self._timer = StageTimer("stream")
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._sent = asyncio.Event()
+        self._record = None
+
+        self.task = asyncio.ensure_future(self._run())
+        _streams.add(self.task)
+        self.task.add_done_callback(_streams.discard)
+
+    async def events(self):
+        try:
+            while True:
+                item = await self._events.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self._sent.set()
+
+    def close(self) -> None:
+        """The response is over, whether or not events() ran: audit now."""
+        self._sent.set()
+
+    async def _run(self) -> None:
+        try:
+            async for event in self._stages():
+                self._events.put_nowait(event)
+        except Exception as error:
+            # Raised to the consumer; no decision, so nothing to audit
+            self._events.put_nowait(error)
+            return
+        self._events.put_nowait(None)
+
+        try:
+            await asyncio.wait_for(self._sent.wait(), self.send_timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._timer.stage("audit"):
+            await audit_log_async(**self._record)
+        self._timer.finish()
+
+    async def _stages(self):
+        query, model, timer = self.user_query, self.embedding_model, self._timer
+        coalesced = False
+
+        key = _cache_key(query, model)
+        cached = _results.get(key)
+        if cached is not None:
+            risk, policy, retrieval = cached
+        else:
+            risk, policy = self._classified or _classify(query, timer)
+
+        yield "risk", {"request_id": self.request_id, **risk.to_dict()}
+        yield "policy", policy.to_dict()
+
+        if cached is None:
+            async def stages():
+                if policy_blocks(policy):
+                    retrieval = _SKIPPED
+                else:
+                    with timer.stage("retrieval"):
+                        retrieval = await retrieve_context_async(query, policy, embedding_model=model)
+
+                _results.put(key, (risk, policy, retrieval))
+                return risk, policy, retrieval
+
+            (_, _, retrieval), coalesced = await _acoalesce(key, stages, timer)
+
+        yield "retrieval", {
+            "evidence_count": retrieval.candidate_count,
+            "retrieval_score": retrieval.retrieval_score,
+        }
+
+        confidence, eligibility = _judge(risk, policy, retrieval, timer)
+        yield "confidence", confidence.to_dict()
+        yield "decision", eligibility.to_dict()
+
+        answer = _generate(query, retrieval, confidence, eligibility, timer)
+        response, self._record = _respond(
+            self.request_id, self.timestamp, query, risk, policy, retrieval, confidence, eligibility, answer,
+            timer, cached is not None, model, coalesced,
+        )
+        if answer is not None:
+            yield "answer", {"answer": answer}
+        yield "done", response
+
+
+def handle_requests(user_queries: list[str], embedding_model: str | None = None) -> list[dict]:
+    """
+    Batch entry point for offline evaluation and traffic replay.
+
+    Each query gets its own request_id and audit record; retrieval
+    for the whole batch runs as one encoder call and one vector search.
+    Responses are returned in input order.
+    """
+    requests = [_new_request() for _ in user_queries]
+    timers = [StageTimer("batch") for _ in user_queries]
+    keys = [_cache_key(query, embedding_model) for query in user_queries]
+    results = [_results.get(key) for key in keys]
+
+    misses = [i for i, cached in enumerate(results) if cached is None]
+    classified = {i: _classify(user_queries[i], timers[i]) for i in misses}
+    retrieved = [i for i in misses if not policy_blocks(classified[i][1])]
+
+    # Retrieval is shared by the batch, so it is timed once
+    batch_timer = StageTimer("batch", sample_rate=0)
+    with batch_timer.stage("retrieval_batch"):
+        retrievals = dict(zip(retrieved, retrieve_context_batch(
+            [user_queries[i] for i in retrieved],
+            [classified[i][1] for i in retrieved],
+            embedding_model=embedding_model,
+        )))
+
+    for i in misses:
+        results[i] = (*classified[i], retrievals.get(i, _SKIPPED))
+        _results.put(keys[i], results[i])
+
+    missed = set(misses)
+    return [
+        _complete(
+            request_id, timestamp, query, *result, timer,
+            cache_hit=i not in missed, embedding_model=embedding_model,
+        )
+        for i, ((request_id, timestamp), query, result, timer)
+        in enumerate(zip(requests, user_queries, results, timers))
+    ]
+
+
+def result_cache_stats() -> dict:
+    return _results.stats()
+
+
+def clear_result_cache() -> None:
+    _results.clear()
+
+
+def _collect_metrics():
+    stats = _results.stats()
+    yield "result_cache_size", "gauge", "Cached pipeline results", [({}, stats["size"])]
+    for name in ("hits", "misses", "evictions", "expirations"):
+        yield f"result_cache_{name}_total", "counter", f"Result cache {name}", [({}, stats[name])]
+
+    flights = _inflight.stats()
+    yield "request_coalescing_in_flight", "gauge", "Distinct queries running stages 1-3", [({}, flights["in_flight"])]
+    yield "request_coalescing_leaders_total", "counter", "Cache misses that ran stages 1-3", [({}, flights["leaders"])]
+    yield "request_coalescing_coalesced_total", "counter", "Requests that shared an identical in-flight run", [({}, flights["coalesced"])]
+
+
+REGISTRY.register_collector(_collect_metrics)
+
+
 if __name__ == "__main__":
     while True:
         query = input("query> ").strip()
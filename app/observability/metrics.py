@@ -0,0 +1,188 @@
+import bisect
+import threading
+from typing import Callable, Iterable, Sequence, Tuple
+
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (Prometheus semantics: each bucket counts
+    observations <= its upper bound). Thread-safe, O(log buckets) per observe.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[slot] += 1
+            self._sum += value
+            self._count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (inf if beyond the last)."""
+        with self._lock:
+            if self._count == 0:
+                return 0.0
+            target = q * self._count
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+                seen += count
+                if seen >= target:
+                    return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative, running = [], 0
+            for count in self._counts:
+                running += count
+                cumulative.append(running)
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "buckets": dict(zip(self.buckets + (float("inf"),), cumulative)),
+            }
+
+
+class Counter:
+    """Monotonic, thread-safe counter."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        with self._lock:
+            return self._value
+
+
+class MetricFamily:
+    """One named metric with a child Counter or Histogram per label combination."""
+
+    def __init__(self, name: str, kind: str, help: str, labelnames: Sequence[str] = (), **options):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._options = options
+        self._children: dict[tuple, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: str):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = Counter() if self.kind == "counter" else Histogram(**self._options)
+                    self._children[key] = child
+        return child
+
+    def children(self) -> list:
+        with self._lock:
+            return [(dict(zip(self.labelnames, key)), child) for key, child in self._children.items()]
+
+
+# A collector returns [(name, kind, help, [(labels, value), ...])] at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, Iterable[Tuple[dict, float]]]]]
+
+
+class Registry:
+    """
+    Process-wide metrics, rendered in the Prometheus text format.
+
+    - counters and histograms are owned by the registry
+    - collectors report values that already live elsewhere
+      (encoder registry, audit writer) when /metrics is scraped
+    """
+
+    def __init__(self):
+        self._families: dict[str, MetricFamily] = {}
+        self._collectors: list[Collector] = []
+        self._lock = threading.Lock()
+
+    def _family(self, name: str, kind: str, help: str, labelnames: Sequence[str], **options) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = MetricFamily(name, kind, help, labelnames, **options)
+                self._families[name] = family
+            elif family.kind != kind or family.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with a different shape")
+            return family
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._family(name, "counter", help, labelnames)
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> MetricFamily:
+        return self._family(name, "histogram", help, labelnames, buckets=buckets)
+
+    def register_collector(self, collector: Collector) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            families = list(self._families.values())
+            collectors = list(self._collectors)
+
+        lines: list[str] = []
+        for family in families:
+            lines += [f"# HELP {family.name} {family.help}", f"# TYPE {family.name} {family.kind}"]
+            for labels, child in family.children():
+                if family.kind == "counter":
+                    lines.append(f"{family.name}{_labels(labels)} {_number(child.value)}")
+                    continue
+
+                snapshot = child.snapshot()
+                for bound, count in snapshot["buckets"].items():
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    lines.append(f"{family.name}_bucket{_labels({**labels, 'le': le})} {count}")
+                lines.append(f"{family.name}_sum{_labels(labels)} {_number(snapshot['sum'])}")
+                lines.append(f"{family.name}_count{_labels(labels)} {snapshot['count']}")
+
+        for collector in collectors:
+            for name, kind, help, samples in collector():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples]
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+REGISTRY = Registry()
@@ -0,0 +1,68 @@
+import random
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
+
+from app.config import settings
+from app.observability.metrics import REGISTRY
+
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_seconds", "Time spent in each pipeline stage", ["stage"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "pipeline_request_seconds", "End-to-end pipeline latency", ["entrypoint"]
+)
+
+# Called with (entrypoint, {stage: seconds}, elapsed seconds) for every finished request
+ProfileHook = Callable[[str, dict, float], None]
+_hooks: List[ProfileHook] = []
+
+
+def add_profile_hook(hook: ProfileHook) -> None:
+    _hooks.append(hook)
+
+
+def remove_profile_hook(hook: ProfileHook) -> None:
+    _hooks.remove(hook)
+
+
+class StageTimer:
+    """
+    Per-request stage timings on the monotonic clock.
+
+    Every stage feeds the pipeline_stage_seconds histogram. When the
+    request is sampled (PROFILE_SAMPLE_RATE), timings() is attached
+    to its audit record as milliseconds per stage.
+    """
+
+    def __init__(self, entrypoint: str = "sync", sample_rate: float | None = None):
+        rate = settings.profile_sample_rate if sample_rate is None else sample_rate
+        self.entrypoint = entrypoint
+        self.sampled = rate > 0 and random.random() < rate
+        self._started = time.perf_counter()
+        self._stages: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        self._stages[name] = self._stages.get(name, 0.0) + seconds
+        STAGE_SECONDS.labels(stage=name).observe(seconds)
+
+    def timings(self) -> dict:
+        return {
+            "stages_ms": {name: round(s * 1000, 3) for name, s in self._stages.items()},
+            "elapsed_ms": round((time.perf_counter() - self._started) * 1000, 3),
+        }
+
+    def finish(self) -> None:
+        elapsed = time.perf_counter() - self._started
+        REQUEST_SECONDS.labels(entrypoint=self.entrypoint).observe(elapsed)
+        for hook in _hooks:
+            hook(self.entrypoint, dict(self._stages), elapsed)
@@ -1,3 +1,4 @@
+import hashlib
 from dataclasses import dataclass
 
 
@@ -8,3 +9,13 @@ class Document:
     content: str
     source: str
     reliability: float  # 0.0 – 1.0
+
+
+def fingerprint(documents) -> str:
+    """Content fingerprint of a corpus: changes when any document is added, removed or edited."""
+    digest = hashlib.sha256()
+    for doc in documents:
+        for field in (doc.id, doc.title, doc.content, doc.source, repr(doc.reliability)):
+            digest.update(field.encode("utf-8"))
+            digest.update(b"\0")
+    return digest.hexdigest()[:16]
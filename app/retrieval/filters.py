@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Iterable, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class RetrievalFilter:
+    """
+    Metadata constraint on retrievable documents.
+
+    - min_reliability: documents below it are never retrieved
+    - sources: glob patterns such as "internal:*"; empty allows any source
+    Filters combine with AND. RetrievalIndex evaluates them as boolean
+    masks over its vector rows, precomputed once per corpus version.
+    """
+
+    min_reliability: float = 0.0
+    sources: Tuple[str, ...] = ()
+
+    def allows_source(self, source: str) -> bool:
+        return not self.sources or any(fnmatchcase(source, pattern) for pattern in self.sources)
+
+    def allows(self, doc) -> bool:
+        return doc.reliability >= self.min_reliability and self.allows_source(doc.source)
+
+
+def policy_filter(policy) -> Optional[RetrievalFilter]:
+    """The constraint a policy puts on evidence, or None if it trusts every document."""
+    if not policy.allowed_sources and not policy.min_reliability:
+        return None
+    return RetrievalFilter(policy.min_reliability, tuple(policy.allowed_sources))
+
+
+def effective_filters(policy, filters: Iterable[RetrievalFilter] = ()) -> Tuple[RetrievalFilter, ...]:
+    """Policy constraint plus the caller's; callers can narrow retrieval, never widen it."""
+    combined = [policy_filter(policy), *filters]
+    return tuple(dict.fromkeys(f for f in combined if f is not None))
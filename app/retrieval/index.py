@@ -1,21 +1,346 @@
-from app.embeddings.factory import get_embedding_encoder
-from app.vectorstore.memory import InMemoryVectorStore
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.embeddings.factory import encoder_key, encoder_lease
+from app.executors import run_cpu
+from app.observability.metrics import REGISTRY
+from app.vectorstore.factory import get_vector_store
+from app.vectorstore.ops import score, top_k
+from app.retrieval.filters import RetrievalFilter
 from app.retrieval.knowledge_base import KNOWLEDGE_BASE
 
 
+ENCODE_SECONDS = REGISTRY.histogram(
+    "embedding_encode_seconds", "Query encoding latency", ["backend"]
+)
+SEARCH_SECONDS = REGISTRY.histogram(
+    "vector_search_seconds", "Vector search latency", ["store"]
+)
+
+
+def _elapsed(histogram, started: float, **labels) -> None:
+    histogram.labels(**labels).observe(time.perf_counter() - started)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass(frozen=True)
+class _Overlay:
+    """
+    Rows changed since the base store was built, with the metadata
+    columns of those rows; replaced, never mutated. cache holds filter
+    masks computed against this state and goes away with it.
+    """
+
+    ids: Tuple[str, ...]
+    matrix: np.ndarray
+    masked: frozenset  # base rows that were updated or deleted
+    live: Optional[np.ndarray]  # False for masked base rows; None if there are none
+    source: np.ndarray
+    reliability: np.ndarray
+    cache: dict = field(default_factory=dict, compare=False)
+
+    @classmethod
+    def empty(cls) -> "_Overlay":
+        return cls((), np.empty((0, 0), dtype=np.float32), frozenset(), None, _codes([]), _floats([]))
+
+    def without(self, doc_ids) -> "_Overlay":
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in doc_ids]
+        return _Overlay(
+            tuple(self.ids[i] for i in keep), self.matrix[keep], self.masked, self.live,
+            self.source[keep], self.reliability[keep],
+        )
+
+
+def _codes(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.int32)
+
+
+def _floats(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float32)
+
+
 class RetrievalIndex:
-    def __init__(self):
-        self.store = InMemoryVectorStore()
+    """
+    Embedding index over the knowledge base.
+
+    - the base vector store is built once and not written afterwards
+    - upsert()/delete() re-embed only documents whose content hash
+      changed, into a small overlay; a change of source or reliability
+      alone only rewrites those documents' metadata rows that is rebuilt and swapped in with
+      a single assignment: searches read one overlay reference, so they
+      see the index before or after an update, never in between
+    - searches merge base and overlay hits; owners rebuild a fresh
+      index once overlay_rows() grows large
+    - source and reliability are kept as columns aligned with the
+      vector rows; RetrievalFilters become boolean masks (cached until
+      the next update) that the store applies while selecting top-k,
+      so a filtered search costs about the same as an unfiltered one
+    """
+
+    def __init__(self, documents=None):
+        self.store = get_vector_store()
+        documents = KNOWLEDGE_BASE if documents is None else documents
+
+        # Metadata columns follow the rows the store had when it was built
+        if getattr(self.store, "auto_refresh", None) is not None:
+            self.store.auto_refresh = None
+
+        self._overlay = _Overlay.empty()
+        self._write_lock = threading.Lock()
+        self._source_names: List[Optional[str]] = [None]  # code 0: row without a document
+        self._source_codes: Dict[str, int] = {}
+
+        if getattr(self.store, "read_only", False):
+            # Base published by another process (the supervisor): keep its
+            # vectors and overlay only the documents that differ from it
+            self._hashes = self.store.content_hashes()
+            self._meta = {doc.id: (doc.source, doc.reliability) for doc in documents}
+            self._index_base({doc.id: doc for doc in documents})
+            self.delete(self._base_rows.keys() - {doc.id for doc in documents})
+            self.upsert(documents)
+            return
+
+        self._hashes = {doc.id: content_hash(doc.content) for doc in documents}
+
+        # Persistent stores may hold documents that have since been removed
+        stale = set(self.store.ids) - self._hashes.keys()
+        if stale:
+            self.store.delete(sorted(stale))
+
+        # Documents a persistent store already holds, encoded by the same
+        # model from the same content, are neither re-encoded nor
+        # rewritten: reopening an unchanged snapshot is just the memmap
+        keeps_hashes = hasattr(self.store, "content_hashes")
+        model = "/".join(encoder_key())
+        wanted = {doc.id: content_hash(f"{model}\0{doc.content}") for doc in documents} if keeps_hashes else {}
+        stored = self.store.content_hashes() if keeps_hashes else {}
+        todo = [doc for doc in documents if not keeps_hashes or stored.get(doc.id) != wanted[doc.id]]
+        if todo:
+            # Default encoder for indexing
+            with encoder_lease() as encoder:
+                vectors = np.asarray(encoder.encode_documents([doc.content for doc in todo]), dtype=np.float32)
+            ids = [doc.id for doc in todo]
+            extra = {"hashes": [wanted[d] for d in ids]} if keeps_hashes else {}
+            self.store.upsert(ids, vectors, **extra)
+
+        self._meta = {doc.id: (doc.source, doc.reliability) for doc in documents}
+        self._index_base({doc.id: doc for doc in documents})
+
+    def _index_base(self, documents: dict) -> None:
+        self._base_ids = self.store.ids
+        self._base_rows = {doc_id: row for row, doc_id in enumerate(self._base_ids)}
+        docs = [documents.get(doc_id) for doc_id in self._base_ids]
+        # (source codes, reliabilities) of the base rows; replaced as a pair, never mutated
+        self._base_meta = (
+            _codes([self._source_code(d.source) if d else 0 for d in docs]),
+            _floats([d.reliability if d else -np.inf for d in docs]),
+        )
+
+    def _source_code(self, source: str) -> int:
+        # Writers only; readers see a prefix of _source_names that covers every code they can meet
+        code = self._source_codes.get(source)
+        if code is None:
+            code = self._source_codes[source] = len(self._source_names)
+            self._source_names.append(source)
+        return code
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._hashes
+
+    def overlay_rows(self) -> int:
+        return len(self._overlay.ids)
+
+    def _masking(self, overlay: _Overlay, doc_ids) -> Tuple[frozenset, Optional[np.ndarray]]:
+        """overlay.masked and overlay.live once doc_ids no longer come from the base."""
+        rows = [self._base_rows[d] for d in doc_ids if d in self._base_rows and d not in overlay.masked]
+        if not rows:
+            return overlay.masked, overlay.live
+        live = np.ones(len(self._base_ids), dtype=bool) if overlay.live is None else overlay.live.copy()
+        live[rows] = False
+        return overlay.masked | {self._base_ids[r] for r in rows}, live
+
+    def _retag(self, overlay: _Overlay, documents: dict) -> _Overlay:
+        """overlay with the metadata rows of documents (same content, new source/reliability) rewritten."""
+        base_rows = [
+            (self._base_rows[d], doc) for d, doc in documents.items()
+            if d in self._base_rows and d not in overlay.masked
+        ]
+        if base_rows:
+            source, reliability = (column.copy() for column in self._base_meta)
+            for row, doc in base_rows:
+                source[row], reliability[row] = self._source_code(doc.source), doc.reliability
+            self._base_meta = (source, reliability)
+
+        # A new overlay also drops filter masks computed from the old metadata
+        source, reliability = overlay.source.copy(), overlay.reliability.copy()
+        for i, doc_id in enumerate(overlay.ids):
+            doc = documents.get(doc_id)
+            if doc is not None:
+                source[i], reliability[i] = self._source_code(doc.source), doc.reliability
+        return _Overlay(overlay.ids, overlay.matrix, overlay.masked, overlay.live, source, reliability)
+
+    def upsert(self, documents: Iterable) -> List[str]:
+        """Add or update documents; returns the ids that were re-embedded."""
+        with self._write_lock:
+            latest = {doc.id: doc for doc in documents}
+            hashes = {doc_id: content_hash(doc.content) for doc_id, doc in latest.items()}
+            changed = {d: h for d, h in hashes.items() if self._hashes.get(d) != h}
+            retagged = {
+                d: doc for d, doc in latest.items()
+                if d not in changed and self._meta.get(d) != (doc.source, doc.reliability)
+            }
+            if not changed and not retagged:
+                return []
+
+            ids = list(changed)
+            if ids:
+                with encoder_lease() as encoder:
+                    vectors = np.asarray(encoder.encode_documents([latest[d].content for d in ids]), dtype=np.float32)
+
+            overlay = self._retag(self._overlay, retagged) if retagged else self._overlay
+            self._meta.update((d, (latest[d].source, latest[d].reliability)) for d in (*changed, *retagged))
+            if not ids:
+                self._overlay = overlay
+                return []
+
+            overlay = overlay.without(changed.keys())
+            matrix = vectors if not overlay.ids else np.vstack([overlay.matrix, vectors])
+            masked, live = self._masking(overlay, ids)
+            source = np.concatenate([overlay.source, _codes([self._source_code(latest[d].source) for d in ids])])
+            reliability = np.concatenate([overlay.reliability, _floats([latest[d].reliability for d in ids])])
+            self._overlay = _Overlay(overlay.ids + tuple(ids), matrix, masked, live, source, reliability)
+            self._hashes.update(changed)
+            return ids
+
+    def delete(self, doc_ids: Iterable[str]) -> List[str]:
+        """Remove documents; returns the ids that were present."""
+        with self._write_lock:
+            doomed = {d for d in doc_ids if d in self._hashes}
+            if not doomed:
+                return []
+
+            overlay = self._overlay.without(doomed)
+            masked, live = self._masking(overlay, doomed)
+            self._overlay = _Overlay(
+                overlay.ids, overlay.matrix, masked, live, overlay.source, overlay.reliability
+            )
+            for doc_id in doomed:
+                del self._hashes[doc_id]
+                self._meta.pop(doc_id, None)
+            return sorted(doomed)
+
+    def _masks(self, overlay: _Overlay, filters: Tuple[RetrievalFilter, ...]):
+        """(base rows mask, overlay rows mask) for filters; None where every row is allowed."""
+        cached = overlay.cache.get(filters)
+        if cached is not None:
+            return cached
+
+        base, extra = overlay.live, None
+        if filters:
+            # Per distinct source, not per row: the row columns are then one gather
+            names = list(self._source_names)
+            allowed = np.array([s is not None and all(f.allows_source(s) for f in filters) for s in names])
+            floor = max(f.min_reliability for f in filters)
+
+            base_source, base_reliability = self._base_meta
+            rows = allowed[base_source] & (base_reliability >= floor)
+            base = rows if base is None else rows & base
+            extra = allowed[overlay.source] & (overlay.reliability >= floor)
+
+        overlay.cache[filters] = (base, extra)
+        return base, extra
+
+    def allowed_ids(self, filters: Tuple[RetrievalFilter, ...]) -> frozenset:
+        """Ids of the live documents that pass filters (computed once per update)."""
+        overlay = self._overlay
+        key = ("ids", filters)
+        ids = overlay.cache.get(key)
+        if ids is None:
+            base, extra = self._masks(overlay, filters)
+            base_ids = self._base_ids if base is None else compress(self._base_ids, base)
+            overlay_ids = overlay.ids if extra is None else compress(overlay.ids, extra)
+            ids = overlay.cache[key] = frozenset(base_ids) | frozenset(overlay_ids)
+        return ids
+
+    def _search_vectors(
+        self, queries: np.ndarray, k: int, filters: Tuple[RetrievalFilter, ...] = ()
+    ) -> List[List[Tuple[str, float]]]:
+        overlay = self._overlay
+        base_mask, extra_mask = self._masks(overlay, filters)
+        if base_mask is None and not overlay.ids:
+            return self.store.search_batch(queries, k)
+
+        if base_mask is None:
+            base = self.store.search_batch(queries, k)
+        else:
+            # Base rows that were updated, deleted or filtered out are skipped inside the store's top-k
+            base = self.store.search_batch(queries, k, base_mask)
+        if not overlay.ids:
+            return base
+
+        extra = score(overlay.matrix, queries)
+        rows = None if extra_mask is None else np.flatnonzero(extra_mask)
+
+        ranked = []
+        for q, hits in enumerate(base):
+            merged = hits + [(overlay.ids[i], float(extra[q, i])) for i in top_k(extra[q], k, rows)]
+            merged.sort(key=lambda hit: hit[1], reverse=True)
+            ranked.append(merged[:k])
+        return ranked
+
+    def search(self, query: str, k: int, embedding_model: str | None = None, filters=()):
+        started = time.perf_counter()
+        with encoder_lease(embedding_model) as encoder:  # UPDATED
+            query_vec = encoder.encode([query])[0]
+        _elapsed(ENCODE_SECONDS, started, backend=settings.embedding_backend)
+
+        started = time.perf_counter()
+        ranked = self._search_vectors(np.asarray([query_vec], dtype=np.float32), k, tuple(filters))[0]
+        _elapsed(SEARCH_SECONDS, started, store=settings.vector_store)
+        return ranked
+
+    async def asearch(self, query: str, k: int, embedding_model: str | None = None, filters=()):
+        """search() without blocking the event loop: encoding and scoring run on the encoder executor."""
+        started = time.perf_counter()
+        with encoder_lease(embedding_model) as encoder:
+            query_vec = (await encoder.aencode([query]))[0]
+        _elapsed(ENCODE_SECONDS, started, backend=settings.embedding_backend)
+
+        started = time.perf_counter()
+        ranked = await run_cpu(
+            self._search_vectors, np.asarray([query_vec], dtype=np.float32), k, tuple(filters)
+        )
+        _elapsed(SEARCH_SECONDS, started, store=settings.vector_store)
+        return ranked[0]
 
-        # Default encoder for indexing
-        encoder = get_embedding_encoder()
-        texts = [doc.content for doc in KNOWLEDGE_BASE]
-        ids = [doc.id for doc in KNOWLEDGE_BASE]
+    def search_batch(self, queries: list[str], k: int, embedding_model: str | None = None, filters=()):
+        """
+        Rank the corpus for many queries at once:
+        one encoder call and one matrix product for the whole batch.
+        filters (RetrievalFilters, ANDed) apply to every query.
+        """
+        if not queries:
+            return []
 
-        vectors = encoder.encode(texts)
-        self.store.upsert(ids, vectors)
+        started = time.perf_counter()
+        with encoder_lease(embedding_model) as encoder:
+            query_vecs = encoder.encode(list(queries))
+        _elapsed(ENCODE_SECONDS, started, backend=settings.embedding_backend)
 
-    def search(self, query: str, k: int, embedding_model: str | None = None):
-        encoder = get_embedding_encoder(embedding_model)  # UPDATED
-        query_vec = encoder.encode([query])[0]
-        return self.store.search(query_vec, k)
+        started = time.perf_counter()
+        ranked = self._search_vectors(np.asarray(query_vecs, dtype=np.float32), k, tuple(filters))
+        _elapsed(SEARCH_SECONDS, started, store=settings.vector_store)
+        return ranked
@@ -0,0 +1,88 @@
+import re
+from typing import AbstractSet, Iterable, List, Optional
+
+from app.retrieval.documents import Document
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> set[str]:
+    return set(_TOKEN.findall(text.lower()))
+
+
+class KeywordIndex:
+    """
+    Token -> posting-list inverted index over document content.
+
+    - documents are tokenized once, when added
+    - candidates are the union of the query tokens' posting lists
+    - candidates come back in document insertion order, which is
+      what a linear scan over the corpus would produce
+    - safe to query while one writer adds or removes documents: each
+      document is swapped in or out whole, and lookups tolerate ids
+      that disappear mid-query
+    """
+
+    def __init__(self, documents: Iterable[Document] = ()):
+        self._postings: dict[str, set[str]] = {}
+        self._docs: dict[str, Document] = {}
+        self._tokens: dict[str, set[str]] = {}
+        self._order: dict[str, int] = {}
+        self._next = 0
+
+        self.add(documents)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def add(self, documents: Iterable[Document]) -> None:
+        """Add documents; an existing id is re-indexed in place."""
+        for doc in documents:
+            if doc.id not in self._order:
+                self._order[doc.id] = self._next
+                self._next += 1
+
+            # Link new tokens before unlinking old ones, so concurrent
+            # readers never miss a document that is being re-indexed
+            tokens = tokenize(doc.content)
+            old = self._tokens.get(doc.id, set())
+            self._docs[doc.id] = doc
+            for token in tokens - old:
+                self._postings.setdefault(token, set()).add(doc.id)
+            self._tokens[doc.id] = tokens
+            self._unlink(doc.id, old - tokens)
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        for doc_id in doc_ids:
+            if doc_id not in self._docs:
+                continue
+
+            self._unlink(doc_id, self._tokens.pop(doc_id))
+            del self._docs[doc_id]
+            del self._order[doc_id]
+
+    def _unlink(self, doc_id: str, tokens: set[str]) -> None:
+        for token in tokens:
+            posting = self._postings[token]
+            posting.discard(doc_id)
+            if not posting:
+                del self._postings[token]
+
+    def get(self, doc_id: str) -> Document | None:
+        return self._docs.get(doc_id)
+
+    def candidates(self, query_tokens: set[str], allowed: Optional[AbstractSet[str]] = None) -> List[Document]:
+        """Documents sharing a token with the query; only ids in allowed, if given."""
+        postings = [p for p in map(self._postings.get, query_tokens) if p]
+        if not postings:
+            return []
+
+        doc_ids = set().union(*postings)
+        if allowed is not None:
+            doc_ids &= allowed
+        docs = ((self._order.get(d), self._docs.get(d)) for d in doc_ids)
+        return [doc for _, doc in sorted((o, doc) for o, doc in docs if doc is not None and o is not None)]
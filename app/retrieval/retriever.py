@@ -1,39 +1,141 @@
-import re
+import hashlib
+import threading
+import time
+
+from app.config import settings
+from app.ingest.sources import load_documents
 from app.schemas.contracts import RetrievalResult
+from app.retrieval.documents import fingerprint
+from app.retrieval.filters import effective_filters
 from app.retrieval.knowledge_base import KNOWLEDGE_BASE
-from app.retrieval.index import RetrievalIndex
+from app.retrieval.index import RetrievalIndex, content_hash
+from app.retrieval.keyword_index import KeywordIndex, tokenize
 
 
-_index = RetrievalIndex()
+def source_documents() -> list:
+    """The configured corpus: KNOWLEDGE_BASE_PATH, else the bundled documents."""
+    if settings.knowledge_base_path:
+        return load_documents(settings.knowledge_base_path)
+    return list(KNOWLEDGE_BASE)
 
 
-def _normalize(text: str) -> set[str]:
-    return set(re.findall(r"[a-z0-9]+", text.lower()))
+# Built by warm_up() (server startup) or on first use, never at import
+_write_lock = threading.Lock()
+_ready = threading.Event()
+_documents: dict = {}
+_index: RetrievalIndex | None = None
+_keyword_index: KeywordIndex | None = None
+_version = ""
 
 
-def retrieve_context(query: str, policy, embedding_model: str | None = None) -> RetrievalResult:
-    if not policy.retrieval_required:
-        return RetrievalResult(documents=[], retrieval_score=0.0, candidate_count=0)
+def warm_up() -> None:
+    """Load the knowledge base and build both indexes, once."""
+    if _ready.is_set():
+        return
+    with _write_lock:
+        if not _ready.is_set():
+            _rebuild({doc.id: doc for doc in source_documents()})
 
-    query_tokens = _normalize(query)
 
-    # 1. Keyword filtering (authoritative)
-    candidates = []
-    for doc in KNOWLEDGE_BASE:
-        doc_tokens = _normalize(doc.content)
-        if query_tokens & doc_tokens:
-            candidates.append(doc)
+def is_ready() -> bool:
+    return _ready.is_set()
 
-    if not candidates:
-        return RetrievalResult(documents=[], retrieval_score=0.0, candidate_count=0)
 
-    # 2. Embedding ranking (non-authoritative)
-    ranked_ids = _index.search(
-    query,
-    k=len(candidates),
-    embedding_model=embedding_model,  # NEW
-    )
+def set_knowledge_base(documents) -> None:
+    """Rebuild both indexes over another corpus (benchmarks, evaluation)."""
+    with _write_lock:
+        _rebuild({doc.id: doc for doc in documents})
+
+
+def _rebuild(documents: dict) -> None:
+    global _documents, _index, _keyword_index, _version
+    corpus = list(documents.values())
+    index, keyword_index = RetrievalIndex(corpus), KeywordIndex(corpus)
+    _documents, _index, _keyword_index, _version = documents, index, keyword_index, fingerprint(corpus)
+    _ready.set()
+
+
+def _next_version(version: str, upserts: list, deletes: list) -> str:
+    # Chained over the change set: O(changes), not a re-hash of the corpus
+    digest = hashlib.sha256(version.encode())
+    for doc in upserts:
+        digest.update(f"+{doc.id}\0{doc.title}\0{doc.source}\0{doc.reliability!r}\0".encode())
+        digest.update(content_hash(doc.content).encode())
+    for doc_id in deletes:
+        digest.update(f"-{doc_id}\0".encode())
+    return digest.hexdigest()[:16]
+
+
+def update_documents(upserts=(), deletes=()) -> dict:
+    """
+    Apply a change set to the live indexes.
+
+    - unchanged documents are skipped; only changed content is re-embedded
+    - requests keep being served from the previous state until each
+      index swaps in its update
+    - past INDEX_OVERLAY_MAX changed rows, both indexes are rebuilt
+      off to the side and swapped in instead
+    """
+    warm_up()
+    with _write_lock:
+        return _apply(list(upserts), list(deletes))
+
+
+def reload_knowledge_base() -> dict:
+    """Re-read the document source (KNOWLEDGE_BASE_PATH) and apply the difference."""
+    warm_up()
+    documents = {doc.id: doc for doc in source_documents()}
+    with _write_lock:
+        return _apply(list(documents.values()), list(_documents.keys() - documents.keys()))
+
+
+def _apply(upserts: list, deletes: list) -> dict:
+    global _version
+    started = time.perf_counter()
+
+    upserts = [doc for doc in {d.id: d for d in upserts}.values() if _documents.get(doc.id) != doc]
+    deletes = sorted({d for d in deletes if d in _documents} - {doc.id for doc in upserts})
+    stats = {"upserted": len(upserts), "deleted": len(deletes), "reembedded": 0, "rebuilt": False}
+
+    if upserts or deletes:
+        # Only writers (holding _write_lock) read _documents
+        _documents.update((doc.id, doc) for doc in upserts)
+        for doc_id in deletes:
+            del _documents[doc_id]
+
+        if _index.overlay_rows() + len(upserts) > settings.index_overlay_max:
+            _rebuild(_documents)
+            stats["reembedded"], stats["rebuilt"] = len(_documents), True
+        else:
+            stats["reembedded"] = len(_index.upsert(upserts))
+            _index.delete(deletes)
+            _keyword_index.add(upserts)
+            _keyword_index.remove(deletes)
+            _version = _next_version(_version, upserts, deletes)
+
+    stats["version"] = _version
+    stats["seconds"] = round(time.perf_counter() - started, 6)
+    return stats
+
+
+def knowledge_base_version() -> str:
+    """Fingerprint of the corpus the indexes currently serve."""
+    warm_up()
+    return _version
+
+
+def _empty() -> RetrievalResult:
+    return RetrievalResult(documents=[], retrieval_score=0.0, candidate_count=0)
+
+
+def _keyword_candidates(query: str, filters: tuple = ()) -> list:
+    warm_up()
+    # Same precomputed masks as the vector search, as a set of ids
+    allowed = _index.allowed_ids(filters) if filters else None
+    return _keyword_index.candidates(tokenize(query), allowed)
+
 
+def _rank(candidates: list, ranked_ids) -> RetrievalResult:
     ranked_map = {doc_id: score for doc_id, score in ranked_ids}
 
     # 3. Sort candidates by embedding similarity
@@ -44,10 +146,100 @@ def retrieve_context(query: str, policy, embedding_model: str | None = None) ->
 
     documents = [doc.content for doc in candidates]
 
-    retrieval_score = len(documents) / len(KNOWLEDGE_BASE)
+    retrieval_score = len(documents) / len(_keyword_index)
 
     return RetrievalResult(
         documents=documents,
         retrieval_score=retrieval_score,
         candidate_count=len(candidates),
     )
+
+
+def retrieve_context(
+    query: str, policy, embedding_model: str | None = None, filters=()
+) -> RetrievalResult:
+    """
+    Keyword candidates ranked by embedding similarity. Only documents
+    passing the policy's evidence restrictions and every RetrievalFilter
+    in filters are retrieved.
+    """
+    if not policy.retrieval_required:
+        return _empty()
+
+    filters = effective_filters(policy, filters)
+
+    # 1. Keyword filtering (authoritative)
+    candidates = _keyword_candidates(query, filters)
+
+    if not candidates:
+        return _empty()
+
+    # 2. Embedding ranking (non-authoritative)
+    ranked_ids = _index.search(
+        query,
+        k=len(candidates),
+        embedding_model=embedding_model,
+        filters=filters,
+    )
+
+    return _rank(candidates, ranked_ids)
+
+
+async def retrieve_context_async(
+    query: str, policy, embedding_model: str | None = None, filters=()
+) -> RetrievalResult:
+    """retrieve_context for the async pipeline; same results."""
+    if not policy.retrieval_required:
+        return _empty()
+
+    filters = effective_filters(policy, filters)
+    candidates = _keyword_candidates(query, filters)
+
+    if not candidates:
+        return _empty()
+
+    ranked_ids = await _index.asearch(
+        query,
+        k=len(candidates),
+        embedding_model=embedding_model,
+        filters=filters,
+    )
+
+    return _rank(candidates, ranked_ids)
+
+
+def retrieve_context_batch(
+    queries: list[str], policies: list, embedding_model: str | None = None, filters=()
+) -> list[RetrievalResult]:
+    """
+    Batched retrieve_context: same results, but all queries that need
+    embedding ranking under the same filters share one encoder call and
+    one vector search.
+    """
+    results: list[RetrievalResult] = [_empty() for _ in queries]
+    pending: dict[tuple, list[tuple[int, list]]] = {}
+
+    for i, (query, policy) in enumerate(zip(queries, policies)):
+        if not policy.retrieval_required:
+            continue
+
+        query_filters = effective_filters(policy, filters)
+        candidates = _keyword_candidates(query, query_filters)
+        if candidates:
+            pending.setdefault(query_filters, []).append((i, candidates))
+
+    for query_filters, group in pending.items():
+        # Search once with the largest k; top-k of a larger k truncated
+        # to k is identical to a top-k search with k itself.
+        k = max(len(candidates) for _, candidates in group)
+        ranked = _index.search_batch(
+            [queries[i] for i, _ in group],
+            k=k,
+            embedding_model=embedding_model,
+            filters=query_filters,
+        )
+
+        for (i, candidates), ranked_ids in zip(group, ranked):
+            results[i] = _rank(candidates, ranked_ids[: len(candidates)])
+
+    return results
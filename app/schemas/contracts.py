@@ -48,6 +48,9 @@ class PolicyDecision:
     min_confidence: float
     retrieval_required: bool
     generation_allowed: bool
+    # evidence restrictions: source glob patterns (empty = any) and reliability floor
+    allowed_sources: tuple = ()
+    min_reliability: float = 0.0
 
     def to_dict(self) -> dict:
         return asdict(self)
@@ -0,0 +1,42 @@
+import os
+
+from app.config import settings
+from app.vectorstore.store import VectorStore
+from app.vectorstore.memory import InMemoryVectorStore
+from app.vectorstore.mmap_store import MmapVectorStore
+from app.vectorstore.ivf import IVFVectorStore
+from app.vectorstore.quantized import QuantizedVectorStore
+from app.vectorstore.shm_store import SharedMemoryVectorStore, shared_index
+
+
+def get_vector_store() -> VectorStore:
+    kind = settings.vector_store.lower()
+
+    if kind == "memory":
+        return InMemoryVectorStore()
+
+    if kind == "mmap":
+        root = settings.vector_store_dir or os.path.join(settings.log_dir, "vector_index")
+        return MmapVectorStore(root)
+
+    if kind == "ivf":
+        return IVFVectorStore(
+            nlist=settings.ivf_nlist,
+            nprobe=settings.ivf_nprobe,
+            exact_threshold=settings.ivf_exact_threshold,
+        )
+
+    if kind == "quantized":
+        return QuantizedVectorStore(
+            mode=settings.quantization,
+            rerank=settings.quantization_rerank,
+            pq_subspaces=settings.pq_subspaces,
+        )
+
+    if kind == "shared":
+        handle = shared_index()
+        if handle is None:
+            raise RuntimeError("VECTOR_STORE=shared serves an index published by python -m app.api.supervisor")
+        return SharedMemoryVectorStore(handle)
+
+    raise ValueError(f"Unknown vector store: {kind}")
@@ -0,0 +1,129 @@
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.vectorstore.memory import InMemoryVectorStore
+from app.vectorstore.ops import as_mask, kmeans, nearest_centroid, score, top_k
+
+
+class IVFVectorStore(InMemoryVectorStore):
+    """
+    Inverted-file approximate index over the in-memory matrix.
+
+    - spherical k-means splits the rows into nlist cells
+    - a query scores the centroids, then only the rows of the nprobe
+      best cells (nprobe == nlist is exact)
+    - inserts after training are assigned to their nearest cell;
+      call train() again once the data distribution has drifted
+    - collections below exact_threshold rows are searched exactly
+    """
+
+    def __init__(
+        self,
+        nlist: int = 0,
+        nprobe: int = 8,
+        exact_threshold: int = 10_000,
+        iterations: int = 20,
+        seed: int = 0,
+        dim: int | None = None,
+    ):
+        super().__init__(dim=dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.iterations = iterations
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self._assign = np.empty(0, dtype=np.int32)
+        self._lists: Optional[tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, nlist: int | None = None, sample: int = 100_000) -> None:
+        """(Re)build the coarse quantizer from the current rows."""
+        size = len(self._ids)
+        if size == 0:
+            return
+
+        # Rule of thumb: about sqrt(N) cells
+        cells = nlist or self.nlist or max(1, int(math.sqrt(size)))
+        matrix = self._matrix[:size]
+
+        rng = np.random.default_rng(self.seed)
+        data = matrix if size <= sample else matrix[np.sort(rng.choice(size, sample, replace=False))]
+
+        self.centroids, _ = kmeans(data, cells, self.iterations, metric="ip", seed=self.seed)
+        self._assign = nearest_centroid(matrix, self.centroids, metric="ip")
+        self._lists = None
+
+    def upsert(self, ids: List[str], vectors: List[List[float]]) -> None:
+        super().upsert(ids, vectors)
+
+        if self.centroids is None:
+            if len(self._ids) >= self.exact_threshold:
+                self.train()
+            return
+
+        size = len(self._ids)
+        if self._assign.shape[0] < size:
+            grown = np.empty(size, dtype=np.int32)
+            grown[: self._assign.shape[0]] = self._assign
+            self._assign = grown
+
+        rows = np.fromiter({self._rows[d] for d in ids}, dtype=np.intp)
+        self._assign[rows] = nearest_centroid(self._matrix[rows], self.centroids, metric="ip")
+        self._lists = None
+
+    def _compact(self, keep: np.ndarray) -> None:
+        super()._compact(keep)
+        if self.centroids is not None:
+            self._assign = self._assign[: keep.shape[0]][keep]
+            self._lists = None
+
+    def _inverted_lists(self) -> tuple[np.ndarray, np.ndarray]:
+        """Rows grouped by cell: (row order, per-cell offsets). Rebuilt lazily after writes."""
+        if self._lists is None:
+            assign = self._assign[: len(self._ids)]
+            order = np.argsort(assign, kind="stable")
+            offsets = np.searchsorted(assign[order], np.arange(self.centroids.shape[0] + 1))
+            self._lists = (order, offsets)
+        return self._lists
+
+    def _exact(self) -> bool:
+        return self.centroids is None or len(self._ids) < self.exact_threshold
+
+    def _probe(self, query: np.ndarray, k: int, mask=None) -> List[Tuple[str, float]]:
+        order, offsets = self._inverted_lists()
+
+        nprobe = min(max(1, self.nprobe), self.centroids.shape[0])
+        cells = top_k(self.centroids @ query, nprobe)
+
+        # Candidates in ascending row order keep exact-search tie-breaking
+        rows = np.sort(np.concatenate([order[offsets[c]:offsets[c + 1]] for c in cells]))
+        if mask is not None:
+            rows = rows[mask[rows]]  # only allowed rows are scored
+        if rows.size == 0:
+            return []
+
+        scores = score(self._matrix[rows], query[None, :])[0]
+        return [(self._ids[rows[i]], float(scores[i])) for i in top_k(scores, k)]
+
+    def search(self, vector: List[float], k: int) -> List[Tuple[str, float]]:
+        if self._exact():
+            return super().search(vector, k)
+
+        return self._probe(np.asarray(vector, dtype=np.float32), k)
+
+    def search_batch(
+        self, vectors: List[List[float]], k: int, mask=None
+    ) -> List[List[Tuple[str, float]]]:
+        if self._exact():
+            return super().search_batch(vectors, k, mask)
+
+        mask = as_mask(mask, len(self._ids))
+        queries = np.asarray(vectors, dtype=np.float32)
+        return [self._probe(query, k, mask) for query in queries]
@@ -1,24 +1,151 @@
 import numpy as np
 from typing import List, Tuple
 
+from app.vectorstore.ops import allowed_rows, score, top_k
 from app.vectorstore.store import VectorStore
 
 
 class InMemoryVectorStore(VectorStore):
-    def __init__(self):
-        self.vectors: dict[str, np.ndarray] = {}
+    """
+    Contiguous float32 matrix store.
+
+    - one row per document, in insertion order
+    - upserts replace existing rows in place, new rows use amortized growth
+    - deletes compact the matrix and keep the remaining row order
+    - search is a single matrix product plus top-k partitioning,
+      for one query or a batch of queries
+    """
+
+    def __init__(self, dim: int | None = None, capacity: int = 1024):
+        self.dim = dim
+        self._capacity = max(1, capacity)
+        self._matrix: np.ndarray | None = None
+        self._ids: list[str] = []
+        self._rows: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Live rows as a read-only view (no copy)."""
+        if self._matrix is None:
+            return np.empty((0, self.dim or 0), dtype=self._dtype)
+        view = self._matrix[: len(self._ids)]
+        view.flags.writeable = False
+        return view
+
+    def _as_matrix(self, vectors) -> np.ndarray:
+        arr = np.asarray(vectors, dtype=np.float32)
+        if arr.ndim != 2:
+            raise ValueError("vectors must be a 2-D sequence")
+
+        if self.dim is None:
+            self.dim = arr.shape[1]
+        elif arr.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dim {self.dim}, got {arr.shape[1]}")
+
+        return arr
+
+    # Storage hooks: subclasses may keep rows in a compressed form
+    _dtype = np.float32
+
+    def _width(self) -> int:
+        return self.dim
+
+    def _encode(self, arr: np.ndarray) -> np.ndarray:
+        return arr
+
+    def _reserve(self, size: int) -> None:
+        if self._matrix is None:
+            capacity = max(self._capacity, size)
+            self._matrix = np.zeros((capacity, self._width()), dtype=self._dtype)
+            return
+
+        if size <= self._matrix.shape[0]:
+            return
+
+        capacity = self._matrix.shape[0]
+        while capacity < size:
+            capacity *= 2
+
+        grown = np.zeros((capacity, self._width()), dtype=self._dtype)
+        grown[: len(self._ids)] = self._matrix[: len(self._ids)]
+        self._matrix = grown
 
     def upsert(self, ids: List[str], vectors: List[List[float]]) -> None:
-        for i, v in zip(ids, vectors):
-            self.vectors[i] = np.array(v)
+        if len(ids) == 0:
+            return
+
+        arr = self._as_matrix(vectors)
+        if arr.shape[0] != len(ids):
+            raise ValueError("ids and vectors must have the same length")
+
+        # Last occurrence wins for ids repeated within one batch
+        latest = {doc_id: i for i, doc_id in enumerate(ids)}
+
+        new_ids = [doc_id for doc_id in latest if doc_id not in self._rows]
+        self._reserve(len(self._ids) + len(new_ids))
+
+        for doc_id in new_ids:
+            self._rows[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+
+        rows = np.fromiter((self._rows[d] for d in latest), dtype=np.intp, count=len(latest))
+        src = np.fromiter(latest.values(), dtype=np.intp, count=len(latest))
+        self._matrix[rows] = self._encode(arr[src])
+
+    def get(self, ids: List[str]) -> np.ndarray:
+        """Stored rows for ids, in the given order (KeyError for unknown ids)."""
+        rows = np.fromiter((self._rows[d] for d in ids), dtype=np.intp, count=len(ids))
+        return self._matrix[rows]
+
+    def delete(self, ids: List[str]) -> None:
+        doomed = {self._rows[d] for d in ids if d in self._rows}
+        if not doomed:
+            return
+
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[list(doomed)] = False
+        self._compact(keep)
+
+    def _compact(self, keep: np.ndarray) -> None:
+        """Drop rows where keep is False, preserving the order of the rest."""
+        remaining = self._matrix[: len(self._ids)][keep]
+        self._matrix[: remaining.shape[0]] = remaining
+
+        self._ids = [d for i, d in enumerate(self._ids) if keep[i]]
+        self._rows = {d: i for i, d in enumerate(self._ids)}
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        if queries.ndim != 2 or queries.shape[1] != self.dim:
+            raise ValueError(f"Expected query vectors of dim {self.dim}")
+
+        return score(self._matrix[: len(self._ids)], queries)
+
+    def _ranked(self, scores: np.ndarray, k: int, rows=None) -> List[Tuple[str, float]]:
+        return [(self._ids[i], float(scores[i])) for i in top_k(scores, k, rows)]
 
     def search(self, vector: List[float], k: int) -> List[Tuple[str, float]]:
-        query = np.array(vector)
-        scores = []
+        if not self._ids:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        return self._ranked(self._scores(query)[0], k)
 
-        for doc_id, vec in self.vectors.items():
-            score = float(np.dot(query, vec))
-            scores.append((doc_id, score))
+    def search_batch(
+        self, vectors: List[List[float]], k: int, mask=None
+    ) -> List[List[Tuple[str, float]]]:
+        queries = np.asarray(vectors, dtype=np.float32)
+        if queries.shape[0] == 0:
+            return []
+        if not self._ids:
+            return [[] for _ in range(queries.shape[0])]
 
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[:k]
+        rows = allowed_rows(mask, len(self._ids))
+        scores = self._scores(queries)
+        return [self._ranked(row, k, rows) for row in scores]
@@ -0,0 +1,374 @@
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.fileutils import FileLock, fsync_dir
+from app.vectorstore.ops import allowed_rows, score, top_k
+from app.vectorstore.store import VectorStore
+
+
+_CURRENT = "CURRENT"
+_GEN_PREFIX = "gen-"
+_CHUNK_ROWS = 65536
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    generation: Optional[str]
+    matrix: np.ndarray
+    ids: List[str]
+    rows: dict
+    hashes: List[str]  # content hash per row; "" where unknown
+
+
+class SnapshotWriter:
+    """
+    Writes one index generation and publishes it atomically.
+
+    Rows are streamed into a private temp directory; commit() fsyncs the
+    files, renames the directory into place and then swaps CURRENT with
+    os.replace, so readers see either the old or the new generation,
+    never a partial one. With dim None, the width of the first appended
+    matrix is used.
+    """
+
+    def __init__(self, root: str | Path, dim: Optional[int], staging: str | Path | None = None):
+        self.root = Path(root)
+        self.dim = dim
+        self.count = 0
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        # A fixed staging directory lets a long write be resumed (see resume())
+        self.tmp = Path(staging) if staging else self.root / f".tmp-{os.getpid()}-{time.monotonic_ns()}"
+        if staging:
+            shutil.rmtree(self.tmp, ignore_errors=True)
+        self.tmp.mkdir()
+
+        self._vectors = (self.tmp / "vectors.f32").open("wb")
+        self._ids = (self.tmp / "ids.txt").open("w", encoding="utf-8")
+        self._hashes = (self.tmp / "hashes.txt").open("w", encoding="utf-8")
+
+    @classmethod
+    def resume(cls, root: str | Path, dim: Optional[int], staging: str | Path, count: int) -> "SnapshotWriter":
+        """Reopen a staging directory, keeping its first `count` rows and dropping any torn tail."""
+        writer = cls.__new__(cls)
+        writer.root = Path(root)
+        writer.dim = dim
+        writer.count = count
+        writer.tmp = Path(staging)
+
+        size = count * (dim or 0) * 4
+        if (writer.tmp / "vectors.f32").stat().st_size < size:
+            raise ValueError(f"Staging directory holds fewer than {count} vectors")
+
+        writer._ids = _keep_lines(writer.tmp / "ids.txt", count)
+        writer._hashes = _keep_lines(writer.tmp / "hashes.txt", count, pad=True)
+        writer._vectors = (writer.tmp / "vectors.f32").open("r+b")
+        writer._vectors.truncate(size)
+        writer._vectors.seek(0, os.SEEK_END)
+        return writer
+
+    def append(self, ids: List[str], matrix: np.ndarray, hashes: Optional[Sequence[str]] = None) -> None:
+        """Add rows; hashes are the rows' content hashes, if the caller tracks them."""
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if self.dim is None and matrix.ndim == 2:
+            self.dim = matrix.shape[1]
+        if matrix.shape != (len(ids), self.dim):
+            raise ValueError(f"Expected a ({len(ids)}, {self.dim}) matrix, got {matrix.shape}")
+
+        for doc_id in ids:
+            if "\n" in doc_id:
+                raise ValueError(f"Document ids cannot contain newlines: {doc_id!r}")
+
+        self._vectors.write(matrix.tobytes())
+        self._ids.write("".join(f"{doc_id}\n" for doc_id in ids))
+        self._hashes.write("\n" * len(ids) if hashes is None else "".join(f"{h}\n" for h in hashes))
+        self.count += len(ids)
+
+    def sync(self) -> None:
+        """Make every appended row durable in the staging directory."""
+        for f in (self._vectors, self._ids, self._hashes):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def commit(self) -> str:
+        self.sync()
+        for f in (self._vectors, self._ids, self._hashes):
+            f.close()
+
+        meta = {"count": self.count, "dim": self.dim or 0, "dtype": "float32"}
+        with (self.tmp / "meta.json").open("w", encoding="utf-8") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with FileLock(self.root / ".lock"):
+            generation = f"{_GEN_PREFIX}{_latest_generation(self.root) + 1:06d}"
+            self.tmp.rename(self.root / generation)
+            fsync_dir(self.root)
+
+            pointer = self.root / f"{_CURRENT}.tmp"
+            with pointer.open("w", encoding="utf-8") as f:
+                f.write(generation)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(pointer, self.root / _CURRENT)
+            fsync_dir(self.root)
+
+        return generation
+
+    def release(self) -> None:
+        """Close the staging files without publishing or deleting them."""
+        for f in (self._vectors, self._ids, self._hashes):
+            if not f.closed:
+                f.close()
+
+    def abort(self) -> None:
+        self.release()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def _keep_lines(path: Path, count: int, pad: bool = False):
+    """Truncate path to its first count lines and open it for appending; pad adds missing ones."""
+    offset, lines = 0, 0
+    path.touch()
+    with path.open("rb") as f:
+        for _ in range(count):
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            lines += 1
+    if lines < count and not pad:
+        raise ValueError(f"Staging directory holds fewer than {count} rows")
+
+    with path.open("r+b") as f:
+        f.truncate(offset)
+    handle = path.open("a", encoding="utf-8")
+    handle.write("\n" * (count - lines))
+    return handle
+
+
+def _latest_generation(root: Path) -> int:
+    numbers = [
+        int(p.name[len(_GEN_PREFIX):])
+        for p in root.glob(f"{_GEN_PREFIX}*")
+        if p.name[len(_GEN_PREFIX):].isdigit()
+    ]
+    return max(numbers, default=0)
+
+
+def read_current(root: str | Path) -> Optional[str]:
+    try:
+        return (Path(root) / _CURRENT).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class MmapVectorStore(VectorStore):
+    """
+    Persistent vector index served straight from disk.
+
+    - each generation is a directory holding vectors.f32 (row-major
+      float32, data at offset 0 so rows are page aligned), ids.txt and meta.json
+    - loading is a numpy.memmap: no copy, and every worker process that
+      maps the same generation shares the same physical pages
+    - writes produce a new generation and swap CURRENT atomically;
+      in-flight searches keep using the snapshot they started with
+    - refresh() (or auto_refresh) picks up generations published
+      by other processes
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        keep_generations: int = 2,
+        auto_refresh: float | None = 1.0,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.keep_generations = max(1, keep_generations)
+        self.auto_refresh = auto_refresh
+
+        self._checked = time.monotonic()
+        self._snapshot = self._load(read_current(self.root))
+
+    @property
+    def generation(self) -> Optional[str]:
+        return self._snapshot.generation
+
+    @property
+    def dim(self) -> Optional[int]:
+        matrix = self._snapshot.matrix
+        return matrix.shape[1] if matrix.shape[0] else None
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._snapshot.ids)
+
+    def __len__(self) -> int:
+        return len(self._snapshot.ids)
+
+    def content_hashes(self) -> Dict[str, str]:
+        """Stored id -> content hash, for the rows that were upserted with one."""
+        snapshot = self._snapshot
+        return {doc_id: h for doc_id, h in zip(snapshot.ids, snapshot.hashes) if h}
+
+    def _load(self, generation: Optional[str]) -> _Snapshot:
+        if generation is None:
+            return _Snapshot(None, np.empty((0, 0), dtype=np.float32), [], {}, [])
+
+        path = self.root / generation
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        count, dim = meta["count"], meta["dim"]
+
+        ids = (path / "ids.txt").read_text(encoding="utf-8").splitlines()
+        if len(ids) != count:
+            raise RuntimeError(f"Corrupt vector index generation: {path}")
+
+        if count:
+            matrix = np.memmap(path / "vectors.f32", dtype=np.float32, mode="r", shape=(count, dim))
+        else:
+            matrix = np.empty((0, dim), dtype=np.float32)
+
+        # Generations written before hashes were kept have none
+        hashes_file = path / "hashes.txt"
+        hashes = hashes_file.read_text(encoding="utf-8").split("\n")[:count] if hashes_file.exists() else []
+        hashes += [""] * (count - len(hashes))
+
+        return _Snapshot(generation, matrix, ids, {d: i for i, d in enumerate(ids)}, hashes)
+
+    def refresh(self) -> bool:
+        """Switch to the latest published generation. Returns True if it changed."""
+        self._checked = time.monotonic()
+        generation = read_current(self.root)
+        if generation == self._snapshot.generation:
+            return False
+
+        self._snapshot = self._load(generation)
+        return True
+
+    def _current(self) -> _Snapshot:
+        if self.auto_refresh is not None and time.monotonic() - self._checked >= self.auto_refresh:
+            self.refresh()
+        return self._snapshot
+
+    def _chunks(self, snapshot: _Snapshot) -> Iterator[Tuple[int, np.ndarray]]:
+        for start in range(0, len(snapshot.ids), _CHUNK_ROWS):
+            yield start, np.array(snapshot.matrix[start:start + _CHUNK_ROWS])
+
+    def _publish(self, writer: SnapshotWriter) -> None:
+        try:
+            generation = writer.commit()
+        except BaseException:
+            writer.abort()
+            raise
+
+        self._snapshot = self._load(generation)
+        self._checked = time.monotonic()
+        self._collect()
+
+    def _collect(self) -> None:
+        """Remove generations older than the retention window."""
+        current = read_current(self.root)
+        generations = sorted(p for p in self.root.glob(f"{_GEN_PREFIX}*") if p.is_dir())
+        for path in generations[: -self.keep_generations]:
+            if path.name != current:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], hashes: Optional[Sequence[str]] = None) -> None:
+        """Add or replace rows; hashes (content hashes of ids) are kept for content_hashes()."""
+        if len(ids) == 0:
+            return
+
+        arr = np.asarray(vectors, dtype=np.float32)
+        if arr.ndim != 2 or arr.shape[0] != len(ids):
+            raise ValueError("ids and vectors must have the same length")
+
+        self.refresh()
+        snapshot = self._snapshot
+        if snapshot.ids and arr.shape[1] != snapshot.matrix.shape[1]:
+            raise ValueError(f"Expected vectors of dim {snapshot.matrix.shape[1]}, got {arr.shape[1]}")
+
+        latest = {doc_id: arr[i] for i, doc_id in enumerate(ids)}
+        replaced = {
+            snapshot.rows[d]: v for d, v in latest.items()
+            if d in snapshot.rows and not np.array_equal(snapshot.matrix[snapshot.rows[d]], v)
+        }
+        added = [d for d in latest if d not in snapshot.rows]
+        given = {} if hashes is None else dict(zip(ids, hashes))
+        rehashed = any(d in snapshot.rows and snapshot.hashes[snapshot.rows[d]] != h for d, h in given.items())
+
+        # Unchanged vectors and hashes: keep serving the current generation
+        if not replaced and not added and not rehashed:
+            return
+
+        writer = SnapshotWriter(self.root, arr.shape[1])
+        try:
+            for start, block in self._chunks(snapshot):
+                for row, vector in replaced.items():
+                    if start <= row < start + block.shape[0]:
+                        block[row - start] = vector
+                block_ids = snapshot.ids[start:start + block.shape[0]]
+                block_hashes = snapshot.hashes[start:start + block.shape[0]]
+                writer.append(block_ids, block, [given.get(d, h) for d, h in zip(block_ids, block_hashes)])
+
+            if added:
+                writer.append(added, np.stack([latest[d] for d in added]), [given.get(d, "") for d in added])
+        except BaseException:
+            writer.abort()
+            raise
+
+        self._publish(writer)
+
+    def delete(self, ids: List[str]) -> None:
+        self.refresh()
+        snapshot = self._snapshot
+
+        doomed = np.array(sorted({snapshot.rows[d] for d in ids if d in snapshot.rows}), dtype=np.intp)
+        if doomed.size == 0:
+            return
+
+        writer = SnapshotWriter(self.root, snapshot.matrix.shape[1])
+        try:
+            for start, block in self._chunks(snapshot):
+                rows = np.arange(start, start + block.shape[0])
+                keep = np.flatnonzero(~np.isin(rows, doomed))
+                writer.append(
+                    [snapshot.ids[start + i] for i in keep], block[keep], [snapshot.hashes[start + i] for i in keep]
+                )
+        except BaseException:
+            writer.abort()
+            raise
+
+        self._publish(writer)
+
+    def search(self, vector: List[float], k: int) -> List[Tuple[str, float]]:
+        return self.search_batch([vector], k)[0]
+
+    def search_batch(
+        self, vectors: List[List[float]], k: int, mask=None
+    ) -> List[List[Tuple[str, float]]]:
+        queries = np.asarray(vectors, dtype=np.float32)
+        if queries.shape[0] == 0:
+            return []
+
+        snapshot = self._current()
+        if not snapshot.ids:
+            return [[] for _ in range(queries.shape[0])]
+
+        if queries.ndim != 2 or queries.shape[1] != snapshot.matrix.shape[1]:
+            raise ValueError(f"Expected query vectors of dim {snapshot.matrix.shape[1]}")
+
+        rows = allowed_rows(mask, len(snapshot.ids))
+        scores = score(snapshot.matrix, queries)
+        return [
+            [(snapshot.ids[i], float(row[i])) for i in top_k(row, k, rows)]
+            for row in scores
+        ]
@@ -0,0 +1,132 @@
+import numpy as np
+
+
+def as_mask(mask, n: int) -> np.ndarray | None:
+    """Validate a row-aligned boolean mask over n rows (None: every row)."""
+    if mask is None:
+        return None
+    mask = np.asarray(mask, dtype=bool)
+    if mask.shape != (n,):
+        raise ValueError(f"Expected a mask over {n} rows, got shape {mask.shape}")
+    return mask
+
+
+def allowed_rows(mask, n: int) -> np.ndarray | None:
+    """Ascending row indices where a row-aligned boolean mask is True (None: every row)."""
+    mask = as_mask(mask, n)
+    return None if mask is None else np.flatnonzero(mask)
+
+
+def top_k(scores: np.ndarray, k: int, rows: np.ndarray | None = None) -> np.ndarray:
+    """
+    Row indices of the k highest scores, best first.
+
+    Equal scores keep ascending row order, so the result matches a
+    stable full sort while only partitioning the array (O(N)).
+    rows (ascending, see allowed_rows) restricts the result to those rows.
+    """
+    if rows is not None:
+        return rows[top_k(scores[rows], k)]
+
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+
+    part = np.argpartition(-scores, k - 1)[:k]
+    kth = scores[part].min()
+
+    # argpartition picks an arbitrary subset of ties at the boundary;
+    # take ties in row order instead so results are deterministic.
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[: k - above.size]
+    idx = np.concatenate([above, ties])
+
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def score(matrix: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """
+    Inner products of each query row against each matrix row, shape (Q, N).
+    """
+    # BLAS routes a single row through GEMV, whose rounding differs
+    # from GEMM. Pad to two rows so single and batched searches
+    # return bit-identical scores.
+    if queries.shape[0] == 1:
+        padded = np.zeros((2, queries.shape[1]), dtype=np.float32)
+        padded[0] = queries[0]
+        return (padded @ matrix.T)[:1]
+
+    return queries @ matrix.T
+
+
+def kmeans(
+    data: np.ndarray,
+    k: int,
+    iterations: int = 20,
+    metric: str = "l2",
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Lloyd's k-means in plain NumPy. Returns (centroids, assignments).
+
+    metric="ip" runs spherical k-means (unit-norm centroids, assignment by
+    inner product), which matches inner-product search on normalized
+    embeddings; metric="l2" is the classic Euclidean variant.
+    """
+    if metric not in ("l2", "ip"):
+        raise ValueError(f"Unknown k-means metric: {metric}")
+
+    data = np.asarray(data, dtype=np.float32)
+    n = data.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        raise ValueError("k-means needs at least one point and one cluster")
+
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(n, size=k, replace=False)].copy()
+    assign = np.zeros(n, dtype=np.int32)
+
+    for _ in range(iterations):
+        assign = nearest_centroid(data, centroids, metric)
+
+        # Per-dimension bincount is much faster than np.add.at
+        sums = np.stack(
+            [np.bincount(assign, weights=data[:, j], minlength=k) for j in range(data.shape[1])],
+            axis=1,
+        )
+        counts = np.bincount(assign, minlength=k)
+
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters from random points
+            sums[empty] = data[rng.choice(n, size=int(empty.sum()), replace=False)]
+            counts[empty] = 1
+
+        updated = sums / counts[:, None]
+        if metric == "ip":
+            norms = np.linalg.norm(updated, axis=1, keepdims=True)
+            updated = updated / np.maximum(norms, 1e-12)
+
+        if np.allclose(updated, centroids):
+            centroids = updated.astype(np.float32)
+            break
+        centroids = updated.astype(np.float32)
+
+    return centroids, nearest_centroid(data, centroids, metric)
+
+
+def nearest_centroid(
+    data: np.ndarray, centroids: np.ndarray, metric: str = "l2", chunk: int = 16384
+) -> np.ndarray:
+    out = np.empty(data.shape[0], dtype=np.int32)
+    # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2; ||x||^2 does not change the argmin
+    half_norms = 0.5 * (centroids * centroids).sum(axis=1) if metric == "l2" else 0.0
+
+    for start in range(0, data.shape[0], chunk):
+        sims = data[start:start + chunk] @ centroids.T - half_norms
+        out[start:start + chunk] = sims.argmax(axis=1)
+
+    return out
@@ -0,0 +1,192 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.vectorstore.memory import InMemoryVectorStore
+from app.vectorstore.ops import allowed_rows, kmeans, score, top_k
+
+
+MODES = ("float16", "int8", "pq")
+
+_CHUNK_ROWS = 65536
+
+
+class QuantizedVectorStore(InMemoryVectorStore):
+    """
+    Compressed in-memory vector store.
+
+    - float16: 2 bytes per dimension
+    - int8: 1 byte per dimension, symmetric per-dimension scales
+    - pq: product quantization, one byte per subspace, scored with
+      asymmetric distance computation (the query stays float32)
+
+    Quantizers are fitted on the first upsert (or an explicit train()),
+    so that batch should be representative of the corpus.
+
+    With rerank > 0 the float32 originals are kept as well and the top
+    `rerank` approximate candidates are re-scored exactly. That trades
+    back 4 bytes per dimension for exact top-k ordering.
+    """
+
+    def __init__(
+        self,
+        mode: str = "int8",
+        rerank: int = 0,
+        pq_subspaces: int = 48,
+        train_sample: int = 10_000,
+        iterations: int = 20,
+        seed: int = 0,
+        dim: int | None = None,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+
+        super().__init__(dim=dim)
+        self.mode = mode
+        self.rerank = rerank
+        self.pq_subspaces = pq_subspaces
+        self.train_sample = train_sample
+        self.iterations = iterations
+        self.seed = seed
+
+        self._dtype = {"float16": np.float16, "int8": np.int8, "pq": np.uint8}[mode]
+        self.scales: Optional[np.ndarray] = None      # int8
+        self.codebooks: Optional[np.ndarray] = None   # pq: (m, 256, dim / m)
+        self._originals = InMemoryVectorStore() if rerank > 0 else None
+
+    @property
+    def trained(self) -> bool:
+        if self.mode == "int8":
+            return self.scales is not None
+        if self.mode == "pq":
+            return self.codebooks is not None
+        return True
+
+    def _width(self) -> int:
+        return self.pq_subspaces if self.mode == "pq" else self.dim
+
+    def bytes_per_vector(self) -> int:
+        """Resident bytes per stored vector, including rerank originals."""
+        code = self._width() * np.dtype(self._dtype).itemsize if self.dim else 0
+        return code + (4 * self.dim if self._originals is not None and self.dim else 0)
+
+    def train(self, vectors) -> None:
+        """Fit the quantizer. Existing rows keep their codes."""
+        data = self._as_matrix(vectors)
+
+        if self.mode == "int8":
+            scales = np.abs(data).max(axis=0) / 127.0
+            self.scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+
+        elif self.mode == "pq":
+            m = self.pq_subspaces
+            if self.dim % m:
+                raise ValueError(f"dim {self.dim} is not divisible by pq_subspaces {m}")
+
+            # ~40 points per centroid is plenty for the codebooks
+            if data.shape[0] > self.train_sample:
+                rng = np.random.default_rng(self.seed)
+                data = data[rng.choice(data.shape[0], self.train_sample, replace=False)]
+
+            sub = self.dim // m
+            codebooks = np.zeros((m, 256, sub), dtype=np.float32)
+            for j in range(m):
+                centroids, _ = kmeans(
+                    data[:, j * sub:(j + 1) * sub], 256, self.iterations, metric="l2", seed=self.seed + j
+                )
+                codebooks[j, : centroids.shape[0]] = centroids
+                # Unused slots repeat a real centroid so no code decodes to zero
+                codebooks[j, centroids.shape[0]:] = centroids[0]
+            self.codebooks = codebooks
+
+    def _encode(self, arr: np.ndarray) -> np.ndarray:
+        if self.mode == "float16":
+            return arr.astype(np.float16)
+
+        if self.mode == "int8":
+            return np.clip(np.rint(arr / self.scales), -127, 127).astype(np.int8)
+
+        m, _, sub = self.codebooks.shape
+        codes = np.empty((arr.shape[0], m), dtype=np.uint8)
+        for j in range(m):
+            part = arr[:, j * sub:(j + 1) * sub]
+            book = self.codebooks[j]
+            # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+            codes[:, j] = (part @ book.T - 0.5 * (book * book).sum(axis=1)).argmax(axis=1)
+        return codes
+
+    def upsert(self, ids: List[str], vectors: List[List[float]]) -> None:
+        if len(ids) == 0:
+            return
+
+        arr = self._as_matrix(vectors)
+        if not self.trained:
+            self.train(arr)
+
+        super().upsert(ids, arr)
+        if self._originals is not None:
+            self._originals.upsert(ids, arr)
+
+    def delete(self, ids: List[str]) -> None:
+        super().delete(ids)
+        if self._originals is not None:
+            self._originals.delete(ids)
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        if queries.ndim != 2 or queries.shape[1] != self.dim:
+            raise ValueError(f"Expected query vectors of dim {self.dim}")
+
+        size = len(self._ids)
+        out = np.empty((queries.shape[0], size), dtype=np.float32)
+
+        if self.mode == "pq":
+            m, _, sub = self.codebooks.shape
+            # Lookup tables: (m, Q, 256) partial inner products per subspace
+            tables = np.stack([
+                queries[:, j * sub:(j + 1) * sub] @ self.codebooks[j].T for j in range(m)
+            ])
+
+        # Decode in chunks so the float32 working set stays bounded
+        for start in range(0, size, _CHUNK_ROWS):
+            codes = self._matrix[start:min(size, start + _CHUNK_ROWS)]
+
+            if self.mode == "pq":
+                block = np.zeros((queries.shape[0], codes.shape[0]), dtype=np.float32)
+                for j in range(m):
+                    block += tables[j][:, codes[:, j]]
+            elif self.mode == "int8":
+                block = score(codes.astype(np.float32), queries * self.scales)
+            else:
+                block = score(codes.astype(np.float32), queries)
+
+            out[:, start:start + codes.shape[0]] = block
+
+        return out
+
+    def _top(self, query: np.ndarray, scores: np.ndarray, k: int, rows=None) -> List[Tuple[str, float]]:
+        if self._originals is None:
+            return self._ranked(scores, k, rows)
+
+        candidates = [self._ids[i] for i in top_k(scores, max(k, self.rerank), rows)]
+        exact = score(self._originals.get(candidates), query[None, :])[0]
+        return [(candidates[i], float(exact[i])) for i in top_k(exact, k)]
+
+    def search(self, vector: List[float], k: int) -> List[Tuple[str, float]]:
+        if not self._ids:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        return self._top(query[0], self._scores(query)[0], k)
+
+    def search_batch(
+        self, vectors: List[List[float]], k: int, mask=None
+    ) -> List[List[Tuple[str, float]]]:
+        queries = np.asarray(vectors, dtype=np.float32)
+        if queries.shape[0] == 0:
+            return []
+        if not self._ids:
+            return [[] for _ in range(queries.shape[0])]
+
+        rows = allowed_rows(mask, len(self._ids))
+        scores = self._scores(queries)
+        return [self._top(query, row, k, rows) for query, row in zip(queries, scores)]
@@ -0,0 +1,119 @@
+"""
+Recall@k measurement for approximate vector stores.
+
+Compares an approximate store against the exact InMemoryVectorStore on
+the same data, so nprobe / nlist can be chosen from numbers:
+
+    python -m app.vectorstore.recall --docs 200000 --nprobe 1,4,8,16,32
+    python -m app.vectorstore.recall --vectors corpus.npy --queries 500
+"""
+
+import argparse
+import json
+import time
+from typing import List
+
+import numpy as np
+
+from app.vectorstore.ivf import IVFVectorStore
+from app.vectorstore.memory import InMemoryVectorStore
+from app.vectorstore.store import VectorStore
+
+
+def recall_at_k(exact: List[List[tuple]], approx: List[List[tuple]], k: int) -> float:
+    """Mean fraction of the exact top-k ids that the approximate search found."""
+    if not exact:
+        return 1.0
+
+    found = 0
+    for truth, got in zip(exact, approx):
+        truth_ids = {doc_id for doc_id, _ in truth[:k]}
+        found += len(truth_ids & {doc_id for doc_id, _ in got[:k]})
+
+    return found / sum(min(k, len(truth)) for truth in exact)
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Unit vectors drawn around random centres, a rough stand-in for text embeddings."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    data = centres[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def _timed_search(store: VectorStore, queries: np.ndarray, k: int):
+    started = time.perf_counter()
+    results = [store.search(q, k) for q in queries]
+    return results, (time.perf_counter() - started) / max(1, len(queries))
+
+
+def evaluate(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    nlist: int,
+    nprobes: List[int],
+) -> List[dict]:
+    ids = [str(i) for i in range(vectors.shape[0])]
+
+    exact = InMemoryVectorStore()
+    exact.upsert(ids, vectors)
+    truth, exact_latency = _timed_search(exact, queries, k)
+
+    # exact_threshold=0 trains the quantizer on the first upsert
+    ivf = IVFVectorStore(nlist=nlist, exact_threshold=0)
+    ivf.upsert(ids, vectors)
+
+    rows = [{"store": "exact", "recall": 1.0, "latency_ms": exact_latency * 1000}]
+    for nprobe in nprobes:
+        ivf.nprobe = nprobe
+        got, latency = _timed_search(ivf, queries, k)
+        rows.append({
+            "store": "ivf",
+            "nlist": ivf.centroids.shape[0],
+            "nprobe": nprobe,
+            "recall": recall_at_k(truth, got, k),
+            "latency_ms": latency * 1000,
+            "speedup": exact_latency / latency if latency else float("inf"),
+        })
+
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure IVF recall@k against exact search")
+    parser.add_argument("--vectors", help=".npy file of corpus vectors (default: synthetic)")
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = sqrt(docs)")
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+        rng = np.random.default_rng(args.seed)
+        queries = vectors[rng.choice(vectors.shape[0], args.queries, replace=False)]
+    else:
+        data = synthetic_vectors(args.docs + args.queries, args.dim, seed=args.seed)
+        vectors, queries = data[: args.docs], data[args.docs:]
+
+    rows = evaluate(vectors, queries, args.k, args.nlist, [int(p) for p in args.nprobe.split(",")])
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'store':<6} {'nlist':>6} {'nprobe':>6} {'recall@' + str(args.k):>10} {'ms/query':>9} {'speedup':>8}")
+    for row in rows:
+        print(
+            f"{row['store']:<6} {row.get('nlist', '-'):>6} {row.get('nprobe', '-'):>6} "
+            f"{row['recall']:>10.3f} {row['latency_ms']:>9.3f} {row.get('speedup', 1.0):>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
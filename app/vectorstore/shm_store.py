@@ -0,0 +1,179 @@
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.vectorstore.ops import allowed_rows, score, top_k
+from app.vectorstore.store import VectorStore
+
+
+_DIGEST_BYTES = 16
+
+
+@dataclass(frozen=True)
+class SharedIndexHandle:
+    """Everything a process needs to attach to a published index (picklable)."""
+
+    name: str
+    count: int
+    dim: int
+    blob_bytes: int
+
+
+def _layout(count: int, dim: int, blob_bytes: int) -> Tuple[int, int, int, int]:
+    """
+    One segment per index generation:
+    [float32 vectors][int64 id offsets][16-byte content digests][utf-8 ids]
+    Vectors start at offset 0, so rows are page aligned.
+    """
+    offsets_at = -(-count * dim * 4 // 8) * 8
+    digests_at = offsets_at + (count + 1) * 8
+    blob_at = digests_at + count * _DIGEST_BYTES
+    return offsets_at, digests_at, blob_at, blob_at + blob_bytes
+
+
+def _views(buf, handle: SharedIndexHandle):
+    offsets_at, digests_at, blob_at, _ = _layout(handle.count, handle.dim, handle.blob_bytes)
+    matrix = np.ndarray((handle.count, handle.dim), dtype=np.float32, buffer=buf)
+    offsets = np.ndarray((handle.count + 1,), dtype=np.int64, buffer=buf, offset=offsets_at)
+    digests = np.ndarray((handle.count, _DIGEST_BYTES), dtype=np.uint8, buffer=buf, offset=digests_at)
+    blob = np.ndarray((handle.blob_bytes,), dtype=np.uint8, buffer=buf, offset=blob_at)
+    return matrix, offsets, digests, blob
+
+
+def build_shared_index(
+    ids: List[str],
+    texts: List[str],
+    hashes: List[str],
+    encoder,
+    name: str,
+    dim: int,
+    batch_size: int = 256,
+) -> SharedIndexHandle:
+    """
+    Encode texts straight into a new shared memory segment, batch by
+    batch, and return its handle. hashes are hex content digests kept
+    next to the rows. The segment outlives this process; whoever
+    publishes it calls unlink_shared_index() once no worker needs it.
+    """
+    encode = getattr(encoder, "encode_documents", encoder.encode)
+    batches = (texts[i:i + batch_size] for i in range(0, len(texts), batch_size))
+    first = np.asarray(encode(next(batches)), dtype=np.float32) if texts else None
+    if first is not None:
+        dim = first.shape[1]  # the encoder decides, not the configured default
+
+    encoded = [doc_id.encode("utf-8") for doc_id in ids]
+    handle = SharedIndexHandle(name, len(ids), dim, sum(map(len, encoded)))
+    size = _layout(handle.count, dim, handle.blob_bytes)[3]
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=max(1, size))
+    try:
+        matrix, offsets, digests, blob = _views(shm.buf, handle)
+        offsets[0] = 0
+        offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+        blob[:] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        for row, digest in enumerate(hashes):
+            digests[row] = np.frombuffer(bytes.fromhex(digest), dtype=np.uint8)
+
+        row, vectors = 0, first
+        while vectors is not None:
+            matrix[row:row + len(vectors)] = vectors
+            row += len(vectors)
+            batch = next(batches, None)
+            vectors = None if batch is None else np.asarray(encode(batch), dtype=np.float32)
+        del matrix, offsets, digests, blob
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+
+    shm.close()
+    return handle
+
+
+def unlink_shared_index(handle: SharedIndexHandle) -> None:
+    try:
+        shm = shared_memory.SharedMemory(name=handle.name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+class SharedMemoryVectorStore(VectorStore):
+    """
+    Read-only view of an index published in shared memory.
+
+    - attaching maps the segment: no copy, and every worker attached
+      to the same generation shares the same physical pages
+    - ids are decoded from the shared id table only for returned hits
+    - the store is never written; RetrievalIndex keeps documents that
+      differ from the published base in its own overlay
+    """
+
+    read_only = True
+
+    def __init__(self, handle: SharedIndexHandle):
+        self.handle = handle
+        self._shm = shared_memory.SharedMemory(name=handle.name)
+        self._matrix, self._offsets, self._digests, self._blob = _views(self._shm.buf, handle)
+
+    def __len__(self) -> int:
+        return self.handle.count
+
+    @property
+    def dim(self) -> int:
+        return self.handle.dim
+
+    def _id(self, row: int) -> str:
+        return self._blob[self._offsets[row]:self._offsets[row + 1]].tobytes().decode("utf-8")
+
+    @property
+    def ids(self) -> List[str]:
+        return [self._id(row) for row in range(self.handle.count)]
+
+    def content_hashes(self) -> Dict[str, str]:
+        """Published id -> content hash, to find documents that changed since."""
+        return {self._id(row): self._digests[row].tobytes().hex() for row in range(self.handle.count)}
+
+    def upsert(self, ids: List[str], vectors: List[List[float]]) -> None:
+        raise RuntimeError("SharedMemoryVectorStore is read-only")
+
+    def delete(self, ids: List[str]) -> None:
+        raise RuntimeError("SharedMemoryVectorStore is read-only")
+
+    def search(self, vector: List[float], k: int) -> List[Tuple[str, float]]:
+        return self.search_batch([vector], k)[0]
+
+    def search_batch(
+        self, vectors: List[List[float]], k: int, mask=None
+    ) -> List[List[Tuple[str, float]]]:
+        queries = np.asarray(vectors, dtype=np.float32)
+        if queries.shape[0] == 0:
+            return []
+        if not self.handle.count:
+            return [[] for _ in range(queries.shape[0])]
+        if queries.ndim != 2 or queries.shape[1] != self.handle.dim:
+            raise ValueError(f"Expected query vectors of dim {self.handle.dim}")
+
+        rows = allowed_rows(mask, self.handle.count)
+        scores = score(self._matrix, queries)
+        return [[(self._id(i), float(row[i])) for i in top_k(row, k, rows)] for row in scores]
+
+    def close(self) -> None:
+        del self._matrix, self._offsets, self._digests, self._blob
+        self._shm.close()
+
+
+# Set in each worker by the supervisor before the retrieval index is built
+_attached: Optional[SharedIndexHandle] = None
+
+
+def set_shared_index(handle: Optional[SharedIndexHandle]) -> None:
+    global _attached
+    _attached = handle
+
+
+def shared_index() -> Optional[SharedIndexHandle]:
+    return _attached
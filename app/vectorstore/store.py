@@ -1,4 +1,6 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+import numpy as np
 
 
 class VectorStore:
@@ -6,8 +8,33 @@ class VectorStore:
     Deterministic vector search interface.
     """
 
+    @property
+    def ids(self) -> List[str]:
+        raise NotImplementedError
+
     def upsert(self, ids: List[str], vectors: List[List[float]]) -> None:
         raise NotImplementedError
 
+    def delete(self, ids: List[str]) -> None:
+        raise NotImplementedError
+
     def search(self, vector: List[float], k: int) -> List[Tuple[str, float]]:
         raise NotImplementedError
+
+    def search_batch(
+        self, vectors: List[List[float]], k: int, mask: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k per query. mask is a boolean per row, aligned with ids;
+        rows where it is False are never returned. Stores apply it while
+        selecting the top k; this fallback filters a full ranking.
+        """
+        if mask is None:
+            return [self.search(vector, k) for vector in vectors]
+
+        ids = self.ids
+        allowed = {doc_id for doc_id, keep in zip(ids, mask) if keep}
+        return [
+            [hit for hit in self.search(vector, len(ids)) if hit[0] in allowed][:k]
+            for vector in vectors
+        ]
@@ -0,0 +1,151 @@
+"""
+Offline, reproducible benchmarks for the control plane.
+
+    python -m benchmarks --docs 10000 --queries 1000 --out bench.json
+    python -m benchmarks --suites vectorstore --docs 1000000 --stores memory,ivf,int8
+    python -m benchmarks --baseline bench.json --tolerance 0.2   # exit 1 on regression
+
+Uses the deterministic hash encoder and writes audit records to a
+temporary LOG_DIR, so runs need no model download, network or API key.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SUITES = ("classifier", "vectorstore", "pipeline")
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the control-plane pipeline")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"comma-separated subset of {SUITES}")
+    parser.add_argument("--docs", type=int, default=10_000, help="synthetic knowledge-base size")
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--stores", default="memory,ivf,float16,int8,pq,mmap")
+    parser.add_argument("--pipeline-store", default="memory", help="VECTOR_STORE for the pipeline suite")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc peak-memory runs")
+    parser.add_argument("--out", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed fractional regression")
+    parser.add_argument("--thresholds", help='JSON of {"metric glob": tolerance} overrides')
+    return parser.parse_args()
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def main() -> int:
+    args = _parse_args()
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        raise SystemExit(f"Unknown suites: {sorted(unknown)}")
+
+    # Settings are read at import time: configure before importing app
+    log_dir = tempfile.mkdtemp(prefix="bench-logs-")
+    os.environ.setdefault("EMBEDDING_BACKEND", "hash")
+    os.environ.setdefault("EMBEDDING_CACHE", "0")
+    os.environ.setdefault("LOG_DIR", log_dir)
+    # Audit records carry full candidate documents; gzipping rotated
+    # segments of a large run would dominate wall time at exit
+    os.environ.setdefault("AUDIT_COMPRESS", "0")
+    # Measure the pipeline itself, not repeated-query cache hits
+    os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+    os.environ.setdefault("VECTOR_STORE", args.pipeline_store)
+    os.environ.setdefault("VECTOR_STORE_DIR", os.path.join(log_dir, "vector_index"))
+
+    import numpy as np
+
+    from benchmarks import suites as bench
+    from benchmarks.regression import compare
+    from benchmarks.synthetic import synthetic_documents, synthetic_queries
+
+    documents = synthetic_documents(args.docs, seed=args.seed)
+    queries = synthetic_queries(documents, args.queries, seed=args.seed + 1)
+
+    results: dict = {}
+    started = time.perf_counter()
+
+    if "classifier" in suites:
+        results["classifier"] = bench.bench_classifier(queries)
+        results["classifier_keyword_scaling"] = bench.classifier_scaling(queries)
+
+    if "vectorstore" in suites:
+        results["vectorstore"] = bench.bench_vector_stores(
+            args.docs, args.queries, dim=args.dim, k=args.k,
+            stores=[s for s in args.stores.split(",") if s],
+            memory=not args.no_memory, seed=args.seed,
+        )
+
+    if "pipeline" in suites:
+        results["pipeline"] = bench.bench_pipeline(documents, queries, memory=not args.no_memory)
+
+        from app.audit.logger import close_audit
+        close_audit()
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+            "embedding_backend": os.environ["EMBEDDING_BACKEND"],
+            "total_seconds": round(time.perf_counter() - started, 3),
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    thresholds = {}
+    if args.thresholds:
+        with open(args.thresholds, encoding="utf-8") as f:
+            thresholds = json.load(f)
+
+    rows = compare(baseline, report, tolerance=args.tolerance, thresholds=thresholds)
+    regressions = [row for row in rows if row["regressed"]]
+
+    print(f"\n{len(rows)} metrics compared against {args.baseline}", file=sys.stderr)
+    for row in regressions:
+        print(
+            f"REGRESSION {row['metric']}: {row['baseline']:g} -> {row['current']:g} "
+            f"({row['change']:+.1%}, allowed {row['tolerance']:.0%})",
+            file=sys.stderr,
+        )
+    if not regressions:
+        print("no regressions", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
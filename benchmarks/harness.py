@@ -0,0 +1,68 @@
+"""Timing and memory measurement helpers shared by the suites."""
+
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Iterable, List, Tuple
+
+import numpy as np
+
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def summarize(seconds: Iterable[float]) -> dict:
+    """Latency percentiles in milliseconds."""
+    samples = np.asarray(list(seconds), dtype=np.float64) * 1000
+    if samples.size == 0:
+        return {}
+
+    summary = {f"p{p}": round(float(np.percentile(samples, p)), 4) for p in PERCENTILES}
+    summary["mean"] = round(float(samples.mean()), 4)
+    summary["max"] = round(float(samples.max()), 4)
+    return summary
+
+
+def measure(fn: Callable[[Any], Any], inputs: List[Any], warmup: int = 10) -> dict:
+    """Call fn once per input; per-call latency percentiles and throughput."""
+    for item in inputs[:warmup]:
+        fn(item)
+
+    gc.collect()
+    latencies = []
+    started = time.perf_counter()
+    for item in inputs:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - started
+
+    return {
+        "calls": len(inputs),
+        "latency_ms": summarize(latencies),
+        "throughput_per_s": round(len(inputs) / total, 2) if total else None,
+    }
+
+
+def peak_memory(fn: Callable[[], Any]) -> Tuple[Any, int, float]:
+    """
+    Run fn under tracemalloc: (result, peak bytes allocated, seconds).
+    numpy buffers are included; the seconds are inflated by tracing.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def timed(fn: Callable[[], Any]) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
@@ -0,0 +1,78 @@
+"""
+Compare a benchmark run with a baseline.
+
+Only comparable metrics are checked, each in its own direction:
+- latency p50/p95, build times, peak memory: lower is better
+- throughput: higher is better
+p99 and max are too noisy at benchmark sample sizes to gate on; they
+and every other number (counts, recall, decision mix) are only reported.
+"""
+
+import fnmatch
+from typing import Dict, List, Optional
+
+
+_LOWER_IS_BETTER = ("*.p50", "*.p95", "*_seconds", "*_memory_bytes")
+_HIGHER_IS_BETTER = ("*throughput_per_s",)
+
+
+def flatten(result: dict, prefix: str = "") -> Dict[str, float]:
+    flat: Dict[str, float] = {}
+    for key, value in result.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def _direction(path: str) -> int:
+    """+1 if higher is worse, -1 if lower is worse, 0 if not gated."""
+    if any(fnmatch.fnmatch(path, p) for p in _HIGHER_IS_BETTER):
+        return -1
+    if any(fnmatch.fnmatch(path, p) for p in _LOWER_IS_BETTER):
+        return 1
+    return 0
+
+
+def _tolerance(path: str, default: float, overrides: Dict[str, float]) -> float:
+    # Most specific (longest) matching pattern wins
+    matches = [p for p in overrides if fnmatch.fnmatch(path, p)]
+    return overrides[max(matches, key=len)] if matches else default
+
+
+def compare(
+    baseline: dict,
+    current: dict,
+    tolerance: float = 0.25,
+    thresholds: Optional[Dict[str, float]] = None,
+    min_absolute: float = 0.05,
+) -> List[dict]:
+    """
+    One row per gated metric present in both runs. A row regresses when
+    it is worse than the baseline by more than its tolerance (a fraction)
+    and by more than min_absolute in its own unit, which keeps
+    sub-0.05 ms jitter from failing a run.
+    """
+    thresholds = thresholds or {}
+    old, new = flatten(baseline.get("results", baseline)), flatten(current.get("results", current))
+
+    rows = []
+    for path in sorted(old.keys() & new.keys()):
+        direction = _direction(path)
+        if direction == 0 or old[path] == 0:
+            continue
+
+        change = (new[path] - old[path]) / old[path]
+        allowed = _tolerance(path, tolerance, thresholds)
+        worse = change * direction
+        rows.append({
+            "metric": path,
+            "baseline": old[path],
+            "current": new[path],
+            "change": round(change, 4),
+            "tolerance": allowed,
+            "regressed": worse > allowed and abs(new[path] - old[path]) > min_absolute,
+        })
+    return rows
@@ -0,0 +1,168 @@
+"""
+Benchmark suites. Each returns a JSON-serialisable dict.
+
+The pipeline suite imports app.main, so the process environment
+(EMBEDDING_BACKEND=hash, LOG_DIR, VECTOR_STORE) must be set before
+this module is first used; benchmarks.__main__ takes care of that.
+"""
+
+import json
+import os
+import tempfile
+from typing import List
+
+from app.core.risk_classifier import classify_risk
+from app.retrieval.documents import Document
+from app.vectorstore.ivf import IVFVectorStore
+from app.vectorstore.memory import InMemoryVectorStore
+from app.vectorstore.mmap_store import MmapVectorStore
+from app.vectorstore.quantized import QuantizedVectorStore
+from app.vectorstore.recall import recall_at_k, synthetic_vectors
+from benchmarks.harness import measure, peak_memory, summarize, timed
+
+
+STORES = ("memory", "ivf", "float16", "int8", "pq", "mmap")
+
+
+def bench_classifier(queries: List[str]) -> dict:
+    return measure(classify_risk, queries)
+
+
+def _make_store(kind: str, dim: int, root: str):
+    if kind == "memory":
+        return InMemoryVectorStore()
+    if kind == "ivf":
+        return IVFVectorStore(exact_threshold=0)
+    if kind in ("float16", "int8", "pq"):
+        # PQ needs dim divisible by the subspace count
+        subspaces = next(m for m in (48, 32, 24, 16, 8, 4, 2, 1) if dim % m == 0)
+        return QuantizedVectorStore(mode=kind, pq_subspaces=subspaces)
+    if kind == "mmap":
+        return MmapVectorStore(root, auto_refresh=0)
+    raise ValueError(f"Unknown store for benchmark: {kind}")
+
+
+def bench_vector_stores(
+    docs: int,
+    queries: int,
+    dim: int = 384,
+    k: int = 10,
+    stores=STORES,
+    batch_size: int = 64,
+    memory: bool = True,
+    seed: int = 0,
+) -> dict:
+    data = synthetic_vectors(docs + queries, dim, seed=seed)
+    vectors, probes = data[:docs], data[docs:]
+    ids = [f"v{i}" for i in range(docs)]
+
+    exact = InMemoryVectorStore()
+    exact.upsert(ids, vectors)
+    truth = exact.search_batch(probes, k)
+
+    results = {}
+    for kind in stores:
+        with tempfile.TemporaryDirectory() as root:
+            store = _make_store(kind, dim, root)
+            _, build_seconds = timed(lambda: store.upsert(ids, vectors))
+
+            single = measure(lambda q: store.search(q, k), list(probes))
+            batches = [probes[i:i + batch_size] for i in range(0, queries, batch_size)]
+            batched = measure(lambda b: store.search_batch(b, k), batches, warmup=1)
+
+            row = {
+                "build_seconds": round(build_seconds, 4),
+                "search": single,
+                "search_batch": {
+                    "batch_size": batch_size,
+                    "latency_ms": batched["latency_ms"],
+                    "throughput_per_s": round(batched["throughput_per_s"] * batch_size, 2),
+                },
+                f"recall@{k}": round(recall_at_k(truth, store.search_batch(probes, k), k), 4),
+            }
+            if hasattr(store, "bytes_per_vector"):
+                row["bytes_per_vector"] = store.bytes_per_vector()
+
+        if memory:
+            with tempfile.TemporaryDirectory() as root:
+                fresh = _make_store(kind, dim, root)
+                _, peak, _ = peak_memory(lambda: fresh.upsert(ids, vectors))
+                row["build_peak_memory_bytes"] = peak
+                _, peak, _ = peak_memory(lambda: fresh.search_batch(probes[:batch_size], k))
+                row["search_batch_peak_memory_bytes"] = peak
+
+        results[kind] = row
+
+    return results
+
+
+def bench_pipeline(documents: List[Document], queries: List[str], memory: bool = True) -> dict:
+    from app.audit.logger import flush_audit, get_audit_writer
+    from app.main import handle_request, handle_requests
+    from app.observability.profiler import add_profile_hook, remove_profile_hook
+    from app.retrieval import retriever
+
+    if memory:
+        _, build_peak, build_seconds = peak_memory(lambda: retriever.set_knowledge_base(documents))
+    else:
+        _, build_seconds = timed(lambda: retriever.set_knowledge_base(documents))
+        build_peak = None
+
+    stages: dict[str, list] = {}
+
+    def collect(entrypoint, timings, elapsed):
+        if entrypoint == "sync":
+            for stage, seconds in timings.items():
+                stages.setdefault(stage, []).append(seconds)
+
+    add_profile_hook(collect)
+    try:
+        single = measure(handle_request, queries)
+    finally:
+        remove_profile_hook(collect)
+
+    batches = [queries[i:i + 32] for i in range(0, len(queries), 32)]
+    batched = measure(handle_requests, batches, warmup=1)
+
+    _, flush_seconds = timed(flush_audit)
+    decisions: dict[str, int] = {}
+    for response in handle_requests(queries[:200]):
+        decisions[response["status"]] = decisions.get(response["status"], 0) + 1
+
+    row = {
+        "documents": len(documents),
+        "index_build_seconds": round(build_seconds, 4),
+        "handle_request": single,
+        "stages_ms": {stage: summarize(samples) for stage, samples in stages.items()},
+        "handle_requests_batch32": {
+            "latency_ms": batched["latency_ms"],
+            "throughput_per_s": round(batched["throughput_per_s"] * 32, 2),
+        },
+        "audit_flush_seconds": round(flush_seconds, 4),
+        "audit": get_audit_writer().stats(),
+        "decision_mix": decisions,
+    }
+    if build_peak is not None:
+        row["index_build_peak_memory_bytes"] = build_peak
+    return row
+
+
+def classifier_scaling(queries: List[str], keyword_counts=(0, 1_000, 10_000)) -> dict:
+    """Classifier latency as the loaded keyword set grows (should stay flat)."""
+    from app.core import risk_classifier
+
+    original = risk_classifier.matcher()
+    results = {}
+    try:
+        for count in keyword_counts:
+            with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+                json.dump({"medical": [f"term{i}" for i in range(count)]}, f)
+            try:
+                risk_classifier.load_keywords(f.name)
+            finally:
+                os.unlink(f.name)
+            results[str(count)] = measure(classify_risk, queries)["latency_ms"]
+    finally:
+        risk_classifier.set_matcher(original)
+    return results
+
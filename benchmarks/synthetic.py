@@ -0,0 +1,89 @@
+"""
+Synthetic knowledge bases and query workloads.
+
+Documents draw words from a Zipf-distributed vocabulary, so posting
+lists have a realistic long tail. Queries mix words from a real
+document with filler and, for a fraction of them, risk keywords, so
+every classifier branch and eligibility outcome is exercised.
+"""
+
+import random
+from typing import List
+
+from app.core.risk_classifier import (
+    ADVICE_PATTERNS,
+    FINANCIAL_KEYWORDS,
+    LEGAL_KEYWORDS,
+    MEDICAL_KEYWORDS,
+    POLICY_KEYWORDS,
+)
+from app.retrieval.documents import Document
+
+
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "qu", "ba", "do", "fi", "gu"]
+
+_RISKY = [
+    sorted(POLICY_KEYWORDS),
+    sorted(MEDICAL_KEYWORDS),
+    sorted(LEGAL_KEYWORDS),
+    sorted(FINANCIAL_KEYWORDS),
+    [p.replace(r"\b", "") for p in ADVICE_PATTERNS],
+]
+
+
+def vocabulary(size: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    words: set[str] = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def synthetic_documents(
+    n: int, words_per_doc: int = 24, vocab_size: int = 20_000, seed: int = 0
+) -> List[Document]:
+    rng = random.Random(seed)
+    vocab = vocabulary(vocab_size, seed)
+    cumulative = _cumulative(_zipf_weights(len(vocab)))
+
+    documents = []
+    for i in range(n):
+        words = rng.choices(vocab, cum_weights=cumulative, k=words_per_doc)
+        documents.append(Document(
+            id=f"doc_{i:07d}",
+            title=" ".join(words[:3]),
+            content=" ".join(words),
+            source="internal:synthetic" if i % 4 else "external:synthetic",
+            reliability=round(0.5 + 0.5 * rng.random(), 3),
+        ))
+    return documents
+
+
+def synthetic_queries(
+    documents: List[Document], n: int, risky_fraction: float = 0.3, seed: int = 1
+) -> List[str]:
+    rng = random.Random(seed)
+    vocab = vocabulary(2_000, seed + 1000)  # mostly unseen words: some queries find nothing
+
+    queries = []
+    for _ in range(n):
+        doc_words = rng.choice(documents).content.split()
+        words = rng.sample(doc_words, min(len(doc_words), rng.randint(1, 4)))
+        words += rng.sample(vocab, rng.randint(0, 3))
+        if rng.random() < risky_fraction:
+            words.append(rng.choice(rng.choice(_RISKY)))
+        rng.shuffle(words)
+        queries.append(" ".join(words))
+    return queries
+
+
+def _cumulative(weights: List[float]) -> List[float]:
+    total, out = 0.0, []
+    for w in weights:
+        total += w
+        out.append(total)
+    return out
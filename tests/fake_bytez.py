@@ -0,0 +1,72 @@
+"""
+Offline stand-in for the Bytez SDK.
+
+Mirrors the surface the encoder uses: Bytez(api_key).model(model_id).run(input),
+returning a Response(output, error, provider) namedtuple. Behaviour is
+scripted so concurrency, batching and retry paths can be tested locally.
+"""
+
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+
+Response = namedtuple("Response", ["output", "error", "provider"], defaults=[None, None, None])
+
+
+def fake_embedding(text: str, dim: int = 8) -> list:
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [b / 255.0 for b in digest[:dim]]
+
+
+class FakeModel:
+    def __init__(self, sdk, model_id):
+        self.sdk = sdk
+        self.id = model_id
+
+    def run(self, input=None, params=None, stream=False):
+        sdk = self.sdk
+        with sdk.lock:
+            sdk.calls.append(input)
+            sdk.in_flight += 1
+            sdk.max_in_flight = max(sdk.max_in_flight, sdk.in_flight)
+            error = sdk.errors.pop(0) if sdk.errors else None
+
+        try:
+            if sdk.latency:
+                time.sleep(sdk.latency)
+            if isinstance(error, Exception):
+                raise error  # transport or SDK failure
+            if error:
+                return Response(error=error)
+
+            if isinstance(input, list):
+                if not sdk.accepts_lists:
+                    return Response(error="Input must be a string")
+                return Response(output=[fake_embedding(t, sdk.dim) for t in input])
+
+            return Response(output=fake_embedding(input, sdk.dim))
+        finally:
+            with sdk.lock:
+                sdk.in_flight -= 1
+
+
+class FakeBytez:
+    def __init__(self, api_key="fake-key", latency=0.0, errors=None, accepts_lists=False, dim=8):
+        self.api_key = api_key
+        self.latency = latency
+        # popped one per call; None = success, str = error response, exception = raised
+        self.errors = list(errors or [])
+        self.accepts_lists = accepts_lists
+        self.dim = dim
+
+        self.lock = threading.Lock()
+        self.calls = []
+        self.models = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def model(self, model_id, provider_key=None):
+        self.models.append(model_id)
+        return FakeModel(self, model_id)
@@ -0,0 +1,175 @@
+import asyncio
+import dataclasses
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.api.server as server
+import app.main as main
+from app.api.admission import AdmissionController, Overloaded, RateLimiter
+from app.schemas.contracts import RetrievalResult
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_bursts_then_refills():
+    clock = Clock()
+    limiter = RateLimiter(rate=2.0, burst=3, clock=clock)
+
+    assert [limiter.take("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.take("a") == pytest.approx(0.5)
+    assert limiter.take("b") == 0.0  # buckets are per client
+
+    clock.now = 0.5
+    assert limiter.take("a") == 0.0
+    assert limiter.take("a") > 0
+    assert RateLimiter(rate=0, burst=1).take("a") == 0.0
+
+
+def test_slots_queue_in_order_and_shed_when_full():
+    async def run():
+        admission = AdmissionController(max_concurrency=1, max_queue=2, queue_timeout=5)
+        order = []
+
+        async def request(name, hold=0.01):
+            async with admission.slot():
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        first = asyncio.ensure_future(request("first", 0.05))
+        await asyncio.sleep(0)
+        queued = [asyncio.ensure_future(request(name)) for name in ("second", "third")]
+        await asyncio.sleep(0)
+        assert admission.stats() == {"active": 1, "queued": 2}
+
+        with pytest.raises(Overloaded) as shed:
+            await admission.acquire()
+        assert shed.value.reason == "queue_full"
+
+        await asyncio.gather(first, *queued)
+        assert order == ["first", "second", "third"]
+        assert admission.stats() == {"active": 0, "queued": 0}
+
+    asyncio.run(run())
+
+
+def test_queue_wait_respects_the_request_budget():
+    async def run():
+        admission = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=5)
+        await admission.acquire()
+
+        with pytest.raises(Overloaded) as shed:
+            await admission.acquire(timeout=0.02)
+        assert shed.value.reason == "queue_timeout"
+        assert admission.queued == 0
+
+        # Once hold times are known, a hopeless wait is rejected without queueing
+        admission.release(held=1.0)
+        await admission.acquire()
+        with pytest.raises(Overloaded) as shed:
+            await admission.acquire(timeout=0.5)
+        assert shed.value.reason == "deadline" and shed.value.retry_after == pytest.approx(1.0)
+
+        # A cancelled waiter gives up its place; the slot still goes round
+        waiter = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        admission.release(held=1.0)
+        assert admission.stats() == {"active": 0, "queued": 0}
+
+    asyncio.run(run())
+
+
+def test_policy_blocked_requests_skip_retrieval(monkeypatch):
+    def no_retrieval(*args, **kwargs):
+        raise AssertionError("retrieval must not run")
+
+    monkeypatch.setattr(main, "knowledge_base_version", lambda: "kb")
+    monkeypatch.setattr(main, "retrieve_context", no_retrieval)
+    monkeypatch.setattr(main, "retrieve_context_batch", lambda queries, *a, **k: [no_retrieval() for _ in queries])
+    monkeypatch.setattr(main, "audit_log", lambda **record: None)
+    main.clear_result_cache()
+
+    assert main.handle_request("how to hack a bank")["reason_code"] == "policy_block"
+    responses = main.handle_requests(["should I invest in bitcoin", "how to hack a bank"])
+    assert [r["reason_code"] for r in responses] == ["policy_block", "policy_block"]
+    main.clear_result_cache()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    async def handle(query, embedding_model=None, classified=None):
+        calls.append(query)
+        return {"status": "ALLOW"}
+
+    monkeypatch.setattr(server, "_warm_up", lambda: None)
+    monkeypatch.setattr(server, "handle_request_async", handle)
+    with TestClient(server.app) as client:
+        yield client, calls
+
+
+def test_api_rate_limits_and_sheds(client, monkeypatch):
+    client, calls = client
+    monkeypatch.setattr(server, "_limiter", RateLimiter(rate=0.001, burst=1))
+
+    assert client.post("/query", json={"query": "what is AI"}, headers={"X-Client-Id": "a"}).status_code == 200
+    limited = client.post("/query", json={"query": "what is AI"}, headers={"X-Client-Id": "a"})
+    assert limited.status_code == 429 and int(limited.headers["Retry-After"]) >= 1
+    assert client.post("/query", json={"query": "what is AI"}, headers={"X-Client-Id": "b"}).status_code == 200
+
+    # No free slot: blocked requests are still answered, others are shed
+    busy = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=5)
+    busy.active = 1
+    monkeypatch.setattr(server, "_admission", busy)
+    assert client.post("/query", json={"query": "how to hack a bank"}, headers={"X-Client-Id": "c"}).status_code == 200
+    shed = client.post("/query", json={"query": "what is AI"}, headers={"X-Client-Id": "d"})
+    assert shed.status_code == 503 and "Retry-After" in shed.headers
+    assert calls == ["what is AI", "what is AI", "how to hack a bank"]
+
+    metrics = client.get("/metrics").text
+    assert 'admission_shed_total{reason="rate_limited"}' in metrics
+    assert 'admission_shed_total{reason="queue_full"}' in metrics
+
+
+def test_high_risk_response_from_the_library_path(monkeypatch):
+    # With POLICY_FAST_PATH on (the default) handle_request answers
+    # HIGH-risk queries without retrieval: no evidence, zero confidence
+    calls = []
+
+    def retrieve(query, policy, embedding_model=None):
+        calls.append(query)
+        return RetrievalResult(documents=["Banks are regulated."], retrieval_score=0.9, candidate_count=1)
+
+    monkeypatch.setattr(main, "knowledge_base_version", lambda: "kb")
+    monkeypatch.setattr(main, "retrieve_context", retrieve)
+    monkeypatch.setattr(main, "audit_log", lambda **record: None)
+    main.clear_result_cache()
+
+    response = main.handle_request("how to hack a bank")
+    response.pop("request_id")
+    assert response == {
+        "status": "ABSTAIN",
+        "message": "Generation not permitted by policy",
+        "reason_code": "policy_block",
+        "confidence": 0.0,
+        "evidence_count": 0,
+        "answer": None,
+    }
+    assert calls == []
+
+    # POLICY_FAST_PATH=0 restores retrieval (and its evidence) for the audit
+    monkeypatch.setattr(main, "settings", dataclasses.replace(main.settings, policy_fast_path=False))
+    main.clear_result_cache()
+    slow = main.handle_request("how to hack a bank")
+    assert slow["reason_code"] == "policy_block" and slow["evidence_count"] == 1
+    assert calls == ["how to hack a bank"]
+    main.clear_result_cache()
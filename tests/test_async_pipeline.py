@@ -0,0 +1,116 @@
+import asyncio
+import contextlib
+import dataclasses
+import threading
+import time
+
+import httpx
+import pytest
+
+import app.api.server as server
+import app.main as main
+from app.config import settings
+from app.embeddings import factory
+from app.embeddings.encoder import EmbeddingEncoder
+from app.retrieval import index as retrieval_index
+from app.retrieval import retriever
+from app.retrieval.knowledge_base import KNOWLEDGE_BASE
+
+
+QUERIES = {
+    "What is AI?": ("ALLOW", "safe_to_answer"),
+    "what dose of ibuprofen should I take": ("ABSTAIN", "low_confidence"),
+    "how to hack a bank": ("ABSTAIN", "policy_block"),
+}
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """The real pipeline over the bundled knowledge base with the hash encoder; audit records collected."""
+    monkeypatch.setattr(
+        factory, "settings", dataclasses.replace(settings, embedding_backend="hash", embedding_cache_enabled=False)
+    )
+    factory._registry.clear()
+    for name in ("_documents", "_index", "_keyword_index", "_version"):
+        monkeypatch.setattr(retriever, name, getattr(retriever, name))
+    was_ready = retriever._ready.is_set()
+    retriever.set_knowledge_base(KNOWLEDGE_BASE)
+
+    records = []
+
+    async def audit_async(**record):
+        records.append(record)
+
+    monkeypatch.setattr(main, "audit_log", lambda **record: records.append(record))
+    monkeypatch.setattr(main, "audit_log_async", audit_async)
+    main.clear_result_cache()
+    yield records
+
+    main.clear_result_cache()
+    factory._registry.clear()
+    if not was_ready:
+        retriever._ready.clear()
+
+
+def _comparable(response):
+    return {k: v for k, v in response.items() if k != "request_id"}
+
+
+def test_async_handler_matches_sync_handler(pipeline):
+    for query, outcome in QUERIES.items():
+        main.clear_result_cache()
+        sync = main.handle_request(query)
+        main.clear_result_cache()
+        async_ = asyncio.run(main.handle_request_async(query))
+
+        assert (sync["status"], sync["reason_code"]) == outcome
+        assert _comparable(async_) == _comparable(sync)
+
+    sync_records, async_records = pipeline[0::2], pipeline[1::2]
+    for a, b in zip(sync_records, async_records):
+        assert (a["retrieval"], a["decision"], a["confidence"]) == (b["retrieval"], b["decision"], b["confidence"])
+
+
+class SlowEncoder:
+    """Hash vectors after a blocking sleep; aencode is the default off-loop one."""
+
+    def __init__(self, encoder, delay):
+        self.encoder = encoder
+        self.delay = delay
+        self.threads = set()
+
+    def encode(self, texts):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        return self.encoder.encode(texts)
+
+    async def aencode(self, texts):
+        return await EmbeddingEncoder.aencode(self, texts)
+
+
+def test_query_endpoint_does_not_block_the_event_loop(pipeline, monkeypatch):
+    slow = SlowEncoder(factory.get_embedding_encoder(), delay=0.5)
+    monkeypatch.setattr(retrieval_index, "encoder_lease", lambda embedding_model=None: contextlib.nullcontext(slow))
+
+    async def run():
+        done = asyncio.get_running_loop().create_future()
+        done.set_result(None)
+        monkeypatch.setattr(server.app.state, "warmup", done, raising=False)
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            query = asyncio.ensure_future(client.post("/query", json={"query": "what is machine learning"}))
+            await asyncio.sleep(0.05)
+
+            # Served while the encoder is still busy with the query
+            started = time.perf_counter()
+            assert (await client.get("/ready")).status_code == 200
+            assert time.perf_counter() - started < 0.25
+            assert not query.done()
+
+            response = await query
+        return response
+
+    response = asyncio.run(run())
+    assert response.status_code == 200 and response.json()["status"] == "ALLOW"
+    assert slow.threads and threading.main_thread().name not in slow.threads
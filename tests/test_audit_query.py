@@ -0,0 +1,141 @@
+import gzip
+import json
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from app.audit.index import index_path, index_segment, load_index
+from app.audit.query import count_records, find_records, get_record, parse_time
+from app.audit.reader import iter_records, segment_paths
+from app.audit.writer import AuditWriter
+
+
+ROOT = Path(__file__).resolve().parents[1]
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+DECISIONS = ["ALLOW", "ABSTAIN", "POLICY_BLOCK"]
+
+
+def _record(i: int) -> dict:
+    decision = DECISIONS[i % 3]
+    return {
+        "request_id": f"req-{i}",
+        "timestamp": (START + timedelta(minutes=i)).isoformat(),
+        "risk": {"category": "medical" if i % 2 else "general", "level": "low"},
+        "decision": {"decision": decision, "reason_code": f"{decision}_CODE"},
+        "response": {"status": decision},
+        "embedding_model": "hash/hash-384",
+        "pad": "x" * 200,
+    }
+
+
+@pytest.fixture
+def trail(tmp_path, monkeypatch):
+    """600 records over 10 hours: closed segments of several gzip members each, and the active one."""
+    monkeypatch.setattr("app.audit.index._BLOCK_BYTES", 4096)
+    writer = AuditWriter(tmp_path, flush_interval=0.0, max_bytes=40_000, compress=True)
+    for i in range(600):
+        writer.write(_record(i))
+        if i % 50 == 49:
+            writer.flush()
+    writer.close()
+    return tmp_path
+
+
+def _expected(since=None, until=None, **filters):
+    out = []
+    for i in range(600):
+        ts = (START + timedelta(minutes=i)).timestamp()
+        r = _record(i)
+        if (since is None or ts >= since) and (until is None or ts < until):
+            if all(
+                {"decision": r["decision"]["decision"], "risk_category": r["risk"]["category"]}[k] == v
+                for k, v in filters.items()
+            ):
+                out.append(r["request_id"])
+    return out
+
+
+def test_segments_are_indexed_and_still_readable(trail):
+    closed = [p for p in segment_paths(trail) if p.name.startswith("audit-")]
+    assert len(closed) > 2
+    indexes = [load_index(p) for p in closed]
+    assert all(p.name.endswith(".log.gz") for p in closed) and None not in indexes
+    assert len(set(indexes[0].records["block"])) > 1
+    # Member-blocked gzip is still plain gzip to existing readers
+    assert [r["request_id"] for r in iter_records(trail)] == [f"req-{i}" for i in range(600)]
+
+
+def test_get_find_and_count_match_a_full_scan(trail):
+    assert get_record(trail, "req-7")["timestamp"] == _record(7)["timestamp"]
+    assert get_record(trail, "req-599")["request_id"] == "req-599"  # active segment
+    assert get_record(trail, "missing") is None
+
+    since = parse_time("2026-01-01T02:30:00")
+    until = parse_time("2026-01-01T06:00:00")
+    found = find_records(trail, since, until, decision="POLICY_BLOCK", risk_category="medical")
+    assert [r["request_id"] for r in found] == _expected(since, until, decision="POLICY_BLOCK", risk_category="medical")
+    assert len(list(find_records(trail, limit=5))) == 5
+
+    counts = count_records(trail, ["decision", "embedding_model"], since=since)
+    assert counts == {(d, "hash/hash-384"): len(_expected(since, decision=d)) for d in DECISIONS}
+    assert sum(count_records(trail, ["risk_category"]).values()) == 600
+
+    with pytest.raises(ValueError):
+        count_records(trail, ["user_query"])
+
+
+def test_legacy_segments_are_read_and_can_be_indexed(tmp_path):
+    legacy = tmp_path / "audit-20250101T000000000000.log.gz"
+    with gzip.open(legacy, "wt") as f:
+        f.write('{"request_id": "old", "timestamp": "2025-01-01T00:00:00", "response": {"decision": "ABSTAIN"}}\n')
+        f.write("torn {\n")
+    (tmp_path / "audit.log").write_text(json.dumps(_record(1)) + "\n")
+
+    assert get_record(tmp_path, "old")["response"]["decision"] == "ABSTAIN"
+    assert count_records(tmp_path) == {("ABSTAIN",): 2}
+
+    index_segment(legacy)
+    assert index_path(legacy).exists()
+    assert count_records(tmp_path, ["decision", "embedding_model"]) == {
+        ("ABSTAIN", "unknown"): 1, ("ABSTAIN", "hash/hash-384"): 1,
+    }
+    assert get_record(tmp_path, "old")["request_id"] == "old"
+
+
+def test_cli(trail):
+    def run(*args):
+        return subprocess.run(
+            [sys.executable, "-m", "app.audit", "--dir", str(trail), *args],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+
+    assert json.loads(run("get", "req-42"))["request_id"] == "req-42"
+    lines = run("count", "--by", "decision", "--until", "2026-01-01T01:00:00").splitlines()
+    assert {json.loads(line)["decision"]: json.loads(line)["count"] for line in lines} == {d: 20 for d in DECISIONS}
+    assert len(run("find", "--decision", "ALLOW", "--limit", "3").splitlines()) == 3
+
+
+def test_queries_spanning_the_active_segment_see_every_record(tmp_path):
+    writer = AuditWriter(tmp_path, flush_interval=0.0, max_bytes=40_000, compress=False)
+    for i in range(300):
+        writer.write(_record(i))
+        if i % 10 == 9:
+            writer.flush()
+    writer.close()
+
+    # The newest records sit in the unindexed active segment
+    active = [json.loads(line)["request_id"] for line in (tmp_path / "audit.log").read_text().splitlines()]
+    assert len(segment_paths(tmp_path)) > 2 and len(active) >= 10 and active[-1] == "req-299"
+    first_active = int(active[0].removeprefix("req-"))
+
+    # From the last closed segments into the active one
+    since = (START + timedelta(minutes=first_active - 40)).timestamp()
+    found = [r["request_id"] for r in find_records(tmp_path, since, decision="ALLOW")]
+    assert found == [f"req-{i}" for i in range(first_active - 40, 300) if DECISIONS[i % 3] == "ALLOW"]
+    counts = count_records(tmp_path, since=since)
+    assert sum(counts.values()) == 300 - (first_active - 40)
+    assert counts[("ALLOW",)] == len(found)
+    assert get_record(tmp_path, active[0])["request_id"] == active[0]
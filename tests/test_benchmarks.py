@@ -0,0 +1,42 @@
+from app.embeddings.hashing import HashEmbeddingEncoder
+from benchmarks.harness import measure, summarize
+from benchmarks.regression import compare
+from benchmarks.synthetic import synthetic_documents, synthetic_queries
+
+
+def test_synthetic_workloads_are_reproducible():
+    docs = synthetic_documents(50, seed=3)
+    assert docs == synthetic_documents(50, seed=3)
+    assert synthetic_queries(docs, 20, seed=4) == synthetic_queries(docs, 20, seed=4)
+    assert len({d.id for d in docs}) == 50
+
+
+def test_hash_encoder_is_deterministic_and_normalised():
+    encoder = HashEmbeddingEncoder(dim=64)
+    a, b, empty = encoder.encode(["tax law court", "tax law court", ""])
+    assert a == b
+    assert abs(sum(x * x for x in a) - 1.0) < 1e-5
+    assert not any(empty)
+
+
+def test_measure_and_summarize():
+    result = measure(lambda x: x * 2, list(range(100)), warmup=5)
+    assert result["calls"] == 100
+    assert set(summarize([0.001, 0.002])) == {"p50", "p90", "p95", "p99", "mean", "max"}
+
+
+def test_compare_flags_regressions_in_the_right_direction():
+    baseline = {"results": {
+        "store": {"latency_ms": {"p50": 1.0, "p99": 2.0}, "throughput_per_s": 1000.0, "calls": 10},
+    }}
+    current = {"results": {
+        "store": {"latency_ms": {"p50": 1.5, "p99": 9.0}, "throughput_per_s": 1200.0, "calls": 99},
+    }}
+
+    rows = {row["metric"]: row for row in compare(baseline, current, tolerance=0.25)}
+    assert rows["store.latency_ms.p50"]["regressed"]
+    assert not rows["store.throughput_per_s"]["regressed"]
+    assert "store.latency_ms.p99" not in rows and "store.calls" not in rows
+
+    relaxed = compare(baseline, current, thresholds={"store.latency_ms.*": 1.0})
+    assert not any(row["regressed"] for row in relaxed)
@@ -0,0 +1,114 @@
+import pytest
+
+from app.embeddings.bytez import BytezEmbeddingEncoder, BytezError
+from app.embeddings.resilience import CircuitBreaker, CircuitOpenError
+from fake_bytez import FakeBytez, fake_embedding
+
+
+def _encoder(sdk, **kwargs):
+    kwargs.setdefault("backoff_base", 0.0)
+    kwargs.setdefault("backoff_max", 0.0)
+    return BytezEmbeddingEncoder(model_override="fake/model", sdk=sdk, **kwargs)
+
+
+TEXTS = [f"text {i}" for i in range(12)]
+
+
+def test_concurrent_encode_preserves_order_and_reuses_model_handle():
+    sdk = FakeBytez(latency=0.02)
+    encoder = _encoder(sdk, max_concurrency=4)
+
+    assert encoder.encode(TEXTS) == [fake_embedding(t) for t in TEXTS]
+    assert encoder.encode(TEXTS[:1]) == [fake_embedding(TEXTS[0])]
+
+    assert sdk.models == ["fake/model"]
+    assert sdk.max_in_flight == 4
+    assert encoder.stats()["latency"]["count"] == 13
+
+
+def test_batch_size_coalesces_texts_into_list_requests():
+    sdk = FakeBytez(accepts_lists=True)
+    encoder = _encoder(sdk, batch_size=5)
+
+    assert encoder.encode(TEXTS) == [fake_embedding(t) for t in TEXTS]
+    # Chunks run concurrently, so calls can arrive in any order
+    assert sorted(len(call) for call in sdk.calls) == [2, 5, 5]
+
+
+def test_transient_errors_are_retried():
+    sdk = FakeBytez(errors=["503 Service Unavailable", "connection reset"])
+    encoder = _encoder(sdk, max_retries=3)
+
+    assert encoder.encode(["hello"]) == [fake_embedding("hello")]
+    assert len(sdk.calls) == 3
+    assert encoder.stats()["retries"] == 2
+
+
+def test_permanent_errors_and_exhausted_retries_raise():
+    sdk = FakeBytez(errors=["Your account is not on a plan"])
+    with pytest.raises(BytezError, match="not on a plan"):
+        _encoder(sdk, max_retries=3).encode(["hello"])
+    assert len(sdk.calls) == 1
+
+    sdk = FakeBytez(errors=["timeout"] * 5)
+    with pytest.raises(BytezError):
+        _encoder(sdk, max_retries=2).encode(["hello"])
+    assert len(sdk.calls) == 3
+
+
+def test_timeout_is_retryable():
+    sdk = FakeBytez(latency=0.2)
+    with pytest.raises(BytezError, match="timed out"):
+        _encoder(sdk, timeout=0.01, max_retries=1).encode(["hello"])
+    assert len(sdk.calls) == 2
+
+
+def test_circuit_breaker_opens_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=lambda: now[0])
+    sdk = FakeBytez(errors=["502 Bad Gateway"] * 2)
+    encoder = _encoder(sdk, max_retries=5, breaker=breaker)
+
+    with pytest.raises(CircuitOpenError):
+        encoder.encode(["hello"])
+    assert len(sdk.calls) == 2
+    assert breaker.state == "open"
+
+    # Rejected without touching the provider while open
+    with pytest.raises(CircuitOpenError):
+        encoder.encode(["hello"])
+    assert len(sdk.calls) == 2
+
+    now[0] = 11.0
+    assert encoder.encode(["hello"]) == [fake_embedding("hello")]
+    assert breaker.state == "closed"
+
+
+def test_transport_errors_are_retried_and_end_a_half_open_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=lambda: now[0])
+    sdk = FakeBytez(errors=[ConnectionError("reset by peer"), None])
+    assert _encoder(sdk, max_retries=1, breaker=CircuitBreaker()).encode(["hello"]) == [fake_embedding("hello")]
+
+    sdk = FakeBytez(errors=["502 Bad Gateway", ConnectionError("reset by peer")])
+    encoder = _encoder(sdk, max_retries=0, breaker=breaker)
+    with pytest.raises(BytezError):
+        encoder.encode(["hello"])
+    assert breaker.state == "open"
+
+    # The half-open trial fails with a non-Bytez exception: the breaker re-opens
+    now[0] = 11.0
+    with pytest.raises(BytezError, match="ConnectionError"):
+        encoder.encode(["hello"])
+    assert breaker.state == "open"
+
+    now[0] = 22.0
+    assert encoder.encode(["hello"]) == [fake_embedding("hello")]
+    assert breaker.state == "closed"
+
+
+def test_aencode_matches_encode():
+    import asyncio
+
+    encoder = _encoder(FakeBytez(), max_concurrency=4)
+    assert asyncio.run(encoder.aencode(TEXTS)) == encoder.encode(TEXTS)
@@ -0,0 +1,103 @@
+import asyncio
+import dataclasses
+import threading
+import time
+
+import pytest
+
+from app.config import settings
+from app.embeddings import factory
+from app.embeddings.batching import MicroBatchingEncoder, parse_batching
+from app.embeddings.encoder import EmbeddingEncoder
+from app.embeddings.hashing import HashEmbeddingEncoder
+
+
+class RecordingEncoder(EmbeddingEncoder):
+    """Hash vectors, a fixed cost per call, and the size of every call."""
+
+    def __init__(self, delay=0.01, fail_on=None):
+        self.inner = HashEmbeddingEncoder(16)
+        self.delay = delay
+        self.fail_on = fail_on
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(len(texts))
+        time.sleep(self.delay)
+        if self.fail_on in texts:
+            raise RuntimeError("model failed")
+        return self.inner.encode(texts)
+
+
+def test_parse_batching():
+    assert parse_batching(" local=32:3, Bytez=8 ") == {"local": (32, 0.003), "bytez": (8, 0.0)}
+    assert parse_batching("") == {}
+    with pytest.raises(ValueError):
+        parse_batching("local=many")
+
+
+def test_concurrent_callers_share_encoder_calls():
+    inner = RecordingEncoder()
+    encoder = MicroBatchingEncoder(inner, max_batch=16, max_wait=0.005)
+    texts = [f"query {i} word{i % 5}" for i in range(32)]
+    results = {}
+
+    def call(text):
+        results[text] = encoder.encode([text])[0]
+
+    threads = [threading.Thread(target=call, args=(t,)) for t in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    encoder.close()
+
+    # Every caller gets its own row back, from far fewer forward passes
+    assert all(results[t] == inner.inner.encode([t])[0] for t in texts)
+    assert sum(inner.calls) == 32 and len(inner.calls) < 16
+    assert max(inner.calls) <= 16
+
+
+def test_async_callers_and_errors():
+    inner = RecordingEncoder(fail_on="boom")
+    encoder = MicroBatchingEncoder(inner, max_batch=8, max_wait=0.05)
+
+    async def run():
+        return await asyncio.gather(
+            *(encoder.aencode([f"q{i}", f"r{i}"]) for i in range(3)),
+            encoder.aencode(["boom"]),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    # One encoder call for all four requests; its failure reaches each of them
+    assert inner.calls == [7]
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def run_ok():
+        return await asyncio.gather(*(encoder.aencode([f"q{i}", f"r{i}"]) for i in range(3)))
+
+    assert asyncio.run(run_ok())[1] == inner.inner.encode(["q1", "r1"])
+    assert inner.calls[-1] == 6
+
+    # Large requests skip the queue entirely
+    assert len(encoder.encode([f"doc {i}" for i in range(20)])) == 20
+    assert inner.calls[-1] == 20
+    encoder.close()
+    with pytest.raises(RuntimeError):
+        encoder.encode(["late"])
+
+
+def test_factory_wraps_configured_backends(monkeypatch):
+    monkeypatch.setattr(
+        factory, "settings",
+        dataclasses.replace(settings, embedding_backend="hash", embedding_cache_enabled=False, embedding_microbatch="hash=4:1"),
+    )
+    _, build = factory._resolve(None)
+    encoder = build()
+    assert isinstance(encoder, MicroBatchingEncoder) and encoder.max_batch == 4
+    encoder.close()
+
+    monkeypatch.setattr(factory, "settings", dataclasses.replace(factory.settings, embedding_microbatch="local=32:3"))
+    _, build = factory._resolve(None)
+    assert isinstance(build(), HashEmbeddingEncoder)
@@ -0,0 +1,105 @@
+import os
+
+from app.embeddings.cache import CachedEmbeddingEncoder, EmbeddingCache
+from app.embeddings.encoder import EmbeddingEncoder
+
+
+class CountingEncoder(EmbeddingEncoder):
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0, 0.5, 0.25] for t in texts]
+
+
+def _encoder(root, inner):
+    return CachedEmbeddingEncoder(inner, EmbeddingCache(root, "fake", "org/model-a", 4))
+
+
+def test_restart_with_unchanged_corpus_needs_no_encoder_calls(tmp_path):
+    corpus = ["alpha", "beta", "gamma", "alpha"]
+
+    first = CountingEncoder()
+    vectors = _encoder(tmp_path, first).encode_documents(corpus)
+    assert first.calls == [["alpha", "beta", "gamma"]]
+
+    second = CountingEncoder()
+    assert _encoder(tmp_path, second).encode_documents(corpus) == vectors
+    assert second.calls == []
+
+    third = CountingEncoder()
+    _encoder(tmp_path, third).encode_documents(["beta", "delta"])
+    assert third.calls == [["delta"]]
+
+    # Opened lazily, as the factory does: the dimension comes from disk, not an encode
+    def open_cache(dim):
+        if dim is None:
+            return EmbeddingCache.open_existing(tmp_path, "fake", "org/model-a")
+        return EmbeddingCache(tmp_path, "fake", "org/model-a", dim)
+
+    fourth = CountingEncoder()
+    lazy = CachedEmbeddingEncoder(fourth, open_cache)
+    assert lazy.encode_documents(corpus) == vectors
+    assert fourth.calls == [] and lazy.cache.dim == 4
+
+
+def test_namespaces_are_isolated(tmp_path):
+    _encoder(tmp_path, CountingEncoder()).encode_documents(["alpha"])
+
+    other = CountingEncoder()
+    cache = EmbeddingCache(tmp_path, "fake", "org/model-b", 4)
+    CachedEmbeddingEncoder(other, cache).encode_documents(["alpha"])
+    assert other.calls == [["alpha"]]
+
+
+def test_queries_are_never_stored(tmp_path):
+    inner = CountingEncoder()
+    encoder = _encoder(tmp_path, inner)
+    encoder.encode(["what is alpha?"])
+    encoder.encode(["what is alpha?"])
+    assert len(inner.calls) == 2 and len(encoder.cache) == 0
+
+
+def test_cache_opens_at_the_encoders_real_dimension(tmp_path):
+    class Wide(CountingEncoder):
+        def encode(self, texts):
+            self.calls.append(list(texts))
+            return [[float(len(t))] * 768 for t in texts]
+
+    def open_cache(dim):
+        if dim is None:
+            return EmbeddingCache.open_existing(tmp_path, "fake", "org/wide")
+        return EmbeddingCache(tmp_path, "fake", "org/wide", dim)
+
+    first = Wide()
+    vectors = CachedEmbeddingEncoder(first, open_cache).encode_documents(["alpha", "beta"])
+    assert len(vectors[0]) == 768 and sum(len(c) for c in first.calls) == 2
+
+    second = Wide()
+    encoder = CachedEmbeddingEncoder(second, open_cache)
+    assert encoder.encode_documents(["alpha", "beta"]) == vectors
+    assert second.calls == []  # the namespace on disk records its dimension
+    assert encoder.cache.dim == 768 and len(encoder.cache) == 2
+
+
+def test_max_rows_bounds_the_cache(tmp_path):
+    inner = CountingEncoder()
+    encoder = CachedEmbeddingEncoder(inner, EmbeddingCache(tmp_path, "fake", "org/model-a", 4, max_rows=2))
+    encoder.encode_documents(["a", "bb", "ccc"])
+    assert len(encoder.cache) == 2
+    assert encoder.encode_documents(["a", "bb", "ccc"])[2] == [3.0, 1.0, 0.5, 0.25]
+    assert inner.calls[-1] == ["ccc"]
+
+
+def test_torn_tail_is_trimmed_on_open(tmp_path):
+    encoder = _encoder(tmp_path, CountingEncoder())
+    encoder.encode_documents(["alpha", "beta"])
+
+    # Simulate a crash after the vector append but before the key append
+    with (encoder.cache.path / "vectors.f32").open("ab") as f:
+        f.write(b"\x00" * 10)
+
+    reopened = EmbeddingCache(tmp_path, "fake", "org/model-a", 4)
+    assert len(reopened) == 2
+    assert os.path.getsize(reopened.path / "vectors.f32") == 2 * 4 * 4
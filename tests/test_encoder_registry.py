@@ -0,0 +1,155 @@
+import threading
+import time
+
+import pytest
+
+from app.embeddings.encoder import EmbeddingEncoder
+from app.embeddings.factory import EncoderRegistry
+
+
+class FakeEncoder(EmbeddingEncoder):
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def encode(self, texts):
+        return [[1.0] for _ in texts]
+
+    def close(self):
+        self.closed = True
+
+
+def _eventually(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def _builder(name, built):
+    def build():
+        built.append(name)
+        return FakeEncoder(name)
+
+    return build
+
+
+def test_lru_eviction_spares_pinned_keys():
+    registry = EncoderRegistry(max_size=2)
+    built = []
+
+    default = registry.get(("fake", "default"), _builder("default", built), pin=True)
+    a = registry.get(("fake", "a"), _builder("a", built))
+    registry.get(("fake", "b"), _builder("b", built))
+
+    # Over capacity: the least recently used unpinned key goes, the pinned one stays
+    assert registry.keys() == [("fake", "default"), ("fake", "b")]
+    assert _eventually(lambda: a.closed) and not default.closed
+
+    registry.get(("fake", "b"), _builder("b", built))
+    registry.get(("fake", "c"), _builder("c", built))
+    assert set(registry.keys()) == {("fake", "default"), ("fake", "c")}
+
+    # An evicted key is rebuilt on its next use
+    registry.get(("fake", "a"), _builder("a", built))
+    assert built == ["default", "a", "b", "c", "a"]
+
+    stats = registry.stats()
+    assert stats["pinned"] == 1 and stats["evictions"] == 3
+    assert (stats["hits"], stats["misses"], stats["loads"]) == (1, 5, 5)
+
+
+def test_a_hit_can_pin_an_existing_encoder():
+    registry = EncoderRegistry(max_size=1)
+    registry.get(("fake", "warm"), _builder("warm", []))
+    registry.get(("fake", "warm"), _builder("warm", []), pin=True)
+    registry.get(("fake", "other"), _builder("other", []))
+    assert ("fake", "warm") in registry.keys()
+
+
+def test_concurrent_requests_for_one_key_build_it_once():
+    registry = EncoderRegistry(max_size=4)
+    barrier = threading.Barrier(8)
+    release = threading.Event()
+    built = []
+
+    def slow_build():
+        built.append(1)
+        release.wait(5)
+        return FakeEncoder("slow")
+
+    results = []
+
+    def request():
+        barrier.wait()
+        results.append(registry.get(("fake", "slow"), slow_build))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Everyone has missed and is waiting on the one build
+    while registry.stats()["misses"] < 8:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert len({id(encoder) for encoder in results}) == 1
+    assert registry.stats()["loads"] == 1
+
+
+def test_failed_loads_are_counted_and_retried():
+    registry = EncoderRegistry(max_size=2)
+
+    def broken():
+        raise RuntimeError("model download failed")
+
+    with pytest.raises(RuntimeError):
+        registry.get(("fake", "x"), broken)
+    assert registry.stats()["load_failures"] == 1 and registry.keys() == []
+
+    assert registry.get(("fake", "x"), _builder("x", [])).name == "x"
+
+
+class ClosingEncoder(FakeEncoder):
+    """Fails once closed, like an encoder whose worker pool has shut down; close() is slow."""
+
+    def __init__(self, name, release):
+        super().__init__(name)
+        self.release = release
+
+    def encode(self, texts):
+        if self.closed:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        return super().encode(texts)
+
+    def close(self):
+        self.release.wait(5)
+        super().close()
+
+
+def test_a_leased_encoder_stays_usable_after_eviction():
+    registry = EncoderRegistry(max_size=1)
+    release = threading.Event()
+
+    with registry.lease(("fake", "a"), lambda: ClosingEncoder("a", release)) as a:
+        # "a" is evicted by "b" while a request still holds it
+        registry.get(("fake", "b"), lambda: ClosingEncoder("b", release))
+        assert registry.keys() == [("fake", "b")]
+        assert a.encode(["x"]) == [[1.0]]
+        assert registry.stats()["leased"] == 1
+
+    # Closed only after the lease ends, and on another thread: a slow
+    # close() does not hold up lookups
+    started = time.monotonic()
+    registry.get(("fake", "c"), lambda: ClosingEncoder("c", release))
+    assert registry.get(("fake", "c"), lambda: None).name == "c"
+    assert time.monotonic() - started < 1.0
+    assert not a.closed
+
+    release.set()
+    assert _eventually(lambda: a.closed)
+    assert registry.stats()["leased"] == 0
@@ -0,0 +1,30 @@
+import json
+import subprocess
+import sys
+
+# Generous for slow CI machines; a torch import alone takes several seconds
+IMPORT_BUDGET_SECONDS = 2.0
+HEAVY_MODULES = ("torch", "sentence_transformers", "bytez")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main, app.api.server
+elapsed = time.perf_counter() - started
+from app.retrieval import retriever
+print(json.dumps({
+    "seconds": elapsed,
+    "loaded": [m for m in %r if m in sys.modules],
+    "index_built": retriever.is_ready(),
+}))
+""" % (HEAVY_MODULES,)
+
+
+def test_api_imports_within_budget_without_ml_libraries():
+    # A fresh interpreter: this process may already have imported app modules
+    out = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True, check=True)
+    probe = json.loads(out.stdout.strip().splitlines()[-1])
+
+    assert probe["loaded"] == []
+    assert probe["index_built"] is False
+    assert probe["seconds"] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,163 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.embeddings.hashing import HashEmbeddingEncoder
+from app.ingest.chunking import chunk_document, split_text
+from app.ingest.pipeline import IndexSink, SnapshotSink, ingest
+from app.ingest.sources import iter_documents, load_documents
+from app.retrieval.documents import Document
+from app.retrieval.keyword_index import KeywordIndex, tokenize
+from app.vectorstore.memory import InMemoryVectorStore
+from app.vectorstore.mmap_store import MmapVectorStore
+
+
+DIM = 32
+
+
+def _write_corpus(path, n=50):
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(n):
+            words = " ".join(f"t{i}x{j}" for j in range(5 + (i % 7) * 40))
+            f.write(json.dumps({"id": f"d{i}", "content": words, "source": "test"}) + "\n")
+
+
+def test_split_text_bounds_and_overlap():
+    text = " ".join(f"word{i}" for i in range(200))
+    pieces = split_text(text, max_chars=100, overlap=20)
+
+    assert all(len(p) <= 100 for p in pieces)
+    assert pieces[0].startswith("word0 ") and pieces[-1].endswith("word199")
+    # Consecutive pieces share at least one whole word
+    for a, b in zip(pieces, pieces[1:]):
+        assert b.split()[0] in a.split()
+
+    doc = Document(id="x", title="t", content=text, source="s", reliability=0.9)
+    chunks = chunk_document(doc, max_chars=100, overlap=20)
+    assert [c.id for c in chunks] == [f"x#{n}" for n in range(len(pieces))]
+    assert {(c.title, c.source, c.reliability) for c in chunks} == {("t", "s", 0.9)}
+    assert chunk_document(Document("y", "t", "short", "s", 0.5)) == [Document("y", "t", "short", "s", 0.5)]
+
+    # "x#1" would collide with the second chunk of "x"
+    with pytest.raises(ValueError, match="reserved for chunk ids"):
+        chunk_document(Document("x#1", "t", "short", "s", 0.5))
+
+
+def test_sources_read_jsonl_and_directories(tmp_path):
+    (tmp_path / "a.jsonl").write_text('{"id": "1", "content": "one"}\n\n{"id": "2", "content": "two"}\n')
+    (tmp_path / "notes").mkdir()
+    (tmp_path / "notes" / "b.md").write_text("# Title\nbody")
+    (tmp_path / "ignored.bin").write_bytes(b"\0")
+
+    docs = list(iter_documents([tmp_path]))
+    assert [d.id for d in docs] == ["1", "2", "notes/b.md"]
+    assert docs[2].title == "Title" and docs[2].source == "file:notes/b.md"
+
+    (tmp_path / "bad.jsonl").write_text('{"id": "3"}\n')
+    with pytest.raises(ValueError, match="bad.jsonl:1"):
+        list(iter_documents([tmp_path / "bad.jsonl"]))
+
+
+def test_snapshot_ingest_matches_batch_encoding(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    _write_corpus(corpus)
+    encoder = HashEmbeddingEncoder(DIM)
+
+    sink = SnapshotSink(tmp_path / "index", DIM)
+    stats = ingest(iter_documents([corpus]), encoder, sink, batch_size=8, max_chars=200, overlap=20)
+
+    chunks = load_documents(tmp_path / "index")
+    assert stats.documents == 50 and stats.chunks == len(chunks) > 50
+    assert len({c.id for c in chunks}) == len(chunks)
+
+    store = MmapVectorStore(tmp_path / "index", auto_refresh=None)
+    assert store.generation == stats.generation
+    assert store.ids == [c.id for c in chunks]
+
+    expected = InMemoryVectorStore()
+    expected.upsert([c.id for c in chunks], encoder.encode([c.content for c in chunks]))
+    query = encoder.encode(["t3x1 t3x2"])[0]
+    assert store.search(query, 5) == expected.search(query, 5)
+
+
+def test_interrupted_ingest_resumes_from_checkpoint(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    _write_corpus(corpus)
+    encoder = HashEmbeddingEncoder(DIM)
+
+    class Failing:
+        calls = 0
+
+        def encode(self, texts):
+            self.calls += 1
+            if self.calls == 6:
+                raise RuntimeError("encoder died")
+            return encoder.encode(texts)
+
+    sink = SnapshotSink(tmp_path / "index", DIM, fingerprint="f1")
+    with pytest.raises(RuntimeError):
+        ingest(iter_documents([corpus]), Failing(), sink, batch_size=8, max_chars=200, checkpoint_every=2)
+    assert not (tmp_path / "index" / "CURRENT").exists()
+
+    resumed = SnapshotSink(tmp_path / "index", DIM, fingerprint="f1", resume=True)
+    assert resumed.start > 0
+    stats = ingest(iter_documents([corpus]), encoder, resumed, batch_size=8, max_chars=200)
+    assert stats.resumed_from == resumed.start
+
+    full = SnapshotSink(tmp_path / "full", DIM)
+    ingest(iter_documents([corpus]), encoder, full, batch_size=8, max_chars=200)
+
+    assert load_documents(tmp_path / "index") == load_documents(tmp_path / "full")
+    a = MmapVectorStore(tmp_path / "index", auto_refresh=None)
+    b = MmapVectorStore(tmp_path / "full", auto_refresh=None)
+    assert a.ids == b.ids
+    assert np.array_equal(a._snapshot.matrix, b._snapshot.matrix)
+
+    # A different fingerprint starts over instead of resuming
+    restarted = SnapshotSink(tmp_path / "index", DIM, fingerprint="f2", resume=True)
+    assert restarted.start == 0
+    restarted.release()
+
+
+def test_index_sink_upserts_incrementally(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    _write_corpus(corpus, n=20)
+    store, keywords = InMemoryVectorStore(), KeywordIndex()
+
+    stats = ingest(iter_documents([corpus]), HashEmbeddingEncoder(DIM), IndexSink(store, keywords), batch_size=4)
+
+    assert len(store) == len(keywords) == stats.chunks
+    assert [d.id for d in keywords.candidates(tokenize("t7x0"))] == ["d7"]
+
+
+def test_snapshot_dimension_comes_from_the_encoder(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    _write_corpus(corpus)
+    encoder = HashEmbeddingEncoder(48)
+
+    class Failing:
+        calls = 0
+
+        def encode(self, texts):
+            self.calls += 1
+            if self.calls == 4:
+                raise RuntimeError("encoder died")
+            return encoder.encode(texts)
+
+    sink = SnapshotSink(tmp_path / "index", fingerprint="f1")
+    with pytest.raises(RuntimeError):
+        ingest(iter_documents([corpus]), Failing(), sink, batch_size=8, max_chars=200, checkpoint_every=2)
+
+    # The checkpoint carries the dimension the first batch had
+    resumed = SnapshotSink(tmp_path / "index", fingerprint="f1", resume=True)
+    assert resumed.start > 0 and resumed.writer.dim == 48
+    ingest(iter_documents([corpus]), encoder, resumed, batch_size=8, max_chars=200)
+    assert MmapVectorStore(tmp_path / "index", auto_refresh=None).dim == 48
+
+    with pytest.raises(ValueError, match="matrix"):
+        ingest(iter_documents([corpus]), encoder, SnapshotSink(tmp_path / "other", DIM), batch_size=8)
+
+    empty = SnapshotSink(tmp_path / "empty")
+    ingest([], encoder, empty)
+    assert len(MmapVectorStore(tmp_path / "empty", auto_refresh=None)) == 0
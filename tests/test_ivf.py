@@ -0,0 +1,55 @@
+import numpy as np
+
+from app.vectorstore.ivf import IVFVectorStore
+from app.vectorstore.memory import InMemoryVectorStore
+from app.vectorstore.recall import recall_at_k, synthetic_vectors
+
+
+def _stores(n=3000, dim=16, **ivf_args):
+    vectors = synthetic_vectors(n, dim, clusters=12, seed=3)
+    ids = [f"doc_{i}" for i in range(n)]
+
+    exact = InMemoryVectorStore()
+    exact.upsert(ids, vectors)
+    ivf = IVFVectorStore(**ivf_args)
+    ivf.upsert(ids, vectors)
+    return exact, ivf
+
+
+def test_small_collections_use_exact_search():
+    exact, ivf = _stores(exact_threshold=10_000)
+    assert not ivf.trained
+
+    query = synthetic_vectors(1, 16, seed=9)[0]
+    assert ivf.search(query, 5) == exact.search(query, 5)
+
+
+def test_probing_every_cell_is_exact_and_recall_grows_with_nprobe():
+    exact, ivf = _stores(nlist=32, exact_threshold=0)
+    assert ivf.trained
+
+    queries = synthetic_vectors(50, 16, clusters=12, seed=4)
+    truth = exact.search_batch(queries, 10)
+
+    ivf.nprobe = 32
+    assert ivf.search_batch(queries, 10) == truth
+
+    recalls = []
+    for nprobe in (1, 4, 16):
+        ivf.nprobe = nprobe
+        recalls.append(recall_at_k(truth, ivf.search_batch(queries, 10), 10))
+    assert recalls == sorted(recalls)
+    assert recalls[-1] > 0.9
+
+
+def test_incremental_insert_and_delete_after_training():
+    exact, ivf = _stores(nlist=16, nprobe=16, exact_threshold=0)
+
+    extra = np.eye(16, dtype=np.float32)[:2] * 5
+    for store in (exact, ivf):
+        store.upsert(["new_a", "new_b"], extra)
+        store.delete(["doc_0", "doc_10", "new_b"])
+
+    assert len(ivf) == len(exact)
+    assert ivf.search(extra[0], 3) == exact.search(extra[0], 3)
+    assert ivf.search(extra[0], 1)[0][0] == "new_a"
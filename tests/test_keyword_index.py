@@ -0,0 +1,78 @@
+import re
+import threading
+
+from app.retrieval.documents import Document
+from app.retrieval.keyword_index import KeywordIndex, tokenize
+
+
+def _doc(doc_id: str, content: str) -> Document:
+    return Document(id=doc_id, title=doc_id, content=content, source="test", reliability=1.0)
+
+
+def linear_scan(documents, query):
+    query_tokens = set(re.findall(r"[a-z0-9]+", query.lower()))
+    return [
+        doc for doc in documents
+        if query_tokens & set(re.findall(r"[a-z0-9]+", doc.content.lower()))
+    ]
+
+
+DOCS = [
+    _doc("a", "Artificial Intelligence (AI) refers to computer systems."),
+    _doc("b", "AI is a field of computer science."),
+    _doc("c", "Stock markets, loans and taxes."),
+    _doc("d", "Pattern-recognition in 3D point clouds."),
+]
+
+
+def test_candidates_match_linear_scan():
+    index = KeywordIndex(DOCS)
+    queries = ["What is AI?", "computer", "pattern 3d", "nothing here", "", "TAXES and loans"]
+
+    for query in queries:
+        assert index.candidates(tokenize(query)) == linear_scan(DOCS, query)
+
+
+def test_incremental_add_and_remove():
+    index = KeywordIndex(DOCS)
+
+    index.remove(["a", "unknown"])
+    assert "a" not in index
+    assert index.candidates(tokenize("artificial")) == []
+    assert [d.id for d in index.candidates(tokenize("ai"))] == ["b"]
+
+    index.add([_doc("e", "Quantum AI pizza"), _doc("b", "Replaced content")])
+    assert len(index) == 4
+    assert [d.id for d in index.candidates(tokenize("ai"))] == ["e"]
+    assert [d.id for d in index.candidates(tokenize("replaced pizza"))] == ["b", "e"]
+
+
+def test_readers_see_documents_whole_during_updates():
+    index = KeywordIndex([_doc(f"d{i}", "shared alpha") for i in range(200)])
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                found = index.candidates(tokenize("shared"))
+            except Exception as error:  # pragma: no cover - the failure being tested
+                errors.append(error)
+                return
+            missing = 200 - len({d.id for d in found} - {"tmp"})
+            if missing:
+                errors.append(f"{missing} documents missing")
+                return
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    for n in range(2000):
+        index.add([_doc(f"d{n % 200}", f"shared beta{n}")])
+        index.add([_doc("tmp", "shared")])
+        index.remove(["tmp"])
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
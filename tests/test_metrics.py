@@ -0,0 +1,52 @@
+import pytest
+
+from app.observability.metrics import Registry
+from app.observability.profiler import STAGE_SECONDS, StageTimer
+
+
+def test_render_counters_histograms_and_collectors():
+    registry = Registry()
+    decisions = registry.counter("decisions_total", "Decisions", ["decision"])
+    decisions.labels(decision="ALLOW").inc()
+    decisions.labels(decision="ALLOW").inc()
+    decisions.labels(decision='AB"STAIN').inc()
+
+    latency = registry.histogram("stage_seconds", "Stage latency", ["stage"], buckets=(0.1, 1.0))
+    latency.labels(stage="risk").observe(0.05)
+    latency.labels(stage="risk").observe(0.5)
+
+    registry.register_collector(lambda: [("cache_size", "gauge", "Size", [({}, 3)])])
+
+    text = registry.render()
+    assert "# TYPE decisions_total counter" in text
+    assert 'decisions_total{decision="ALLOW"} 2' in text
+    assert 'decisions_total{decision="AB\\"STAIN"} 1' in text
+    assert 'stage_seconds_bucket{stage="risk",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="risk",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="risk",le="+Inf"} 2' in text
+    assert 'stage_seconds_count{stage="risk"} 2' in text
+    assert "cache_size 3" in text
+
+
+def test_labels_and_shapes_are_checked():
+    registry = Registry()
+    family = registry.counter("x_total", "X", ["a"])
+    with pytest.raises(ValueError):
+        family.labels(b="1")
+    with pytest.raises(ValueError):
+        registry.histogram("x_total", "X", ["a"])
+
+
+def test_stage_timer_feeds_histograms_and_samples_timings():
+    before = STAGE_SECONDS.labels(stage="unit_test").snapshot()["count"]
+
+    timer = StageTimer(sample_rate=1.0)
+    with timer.stage("unit_test"):
+        pass
+    timer.finish()
+
+    assert timer.sampled
+    assert STAGE_SECONDS.labels(stage="unit_test").snapshot()["count"] == before + 1
+    assert set(timer.timings()["stages_ms"]) == {"unit_test"}
+
+    assert not StageTimer(sample_rate=0).sampled
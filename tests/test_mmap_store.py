@@ -0,0 +1,76 @@
+import numpy as np
+
+from app.vectorstore.memory import InMemoryVectorStore
+from app.vectorstore.mmap_store import MmapVectorStore, read_current
+
+
+def _data(n=300, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return [f"doc_{i}" for i in range(n)], rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def test_matches_in_memory_store_and_survives_reload(tmp_path):
+    ids, vectors = _data()
+    memory = InMemoryVectorStore()
+    memory.upsert(ids, vectors)
+
+    store = MmapVectorStore(tmp_path)
+    store.upsert(ids, vectors)
+
+    reopened = MmapVectorStore(tmp_path)
+    assert reopened.ids == ids
+    assert isinstance(reopened._snapshot.matrix, np.memmap)
+
+    queries = np.random.default_rng(1).standard_normal((5, 8))
+    assert reopened.search_batch(queries, 10) == memory.search_batch(queries, 10)
+    assert reopened.search(queries[0], 10) == memory.search(queries[0], 10)
+
+
+def test_updates_publish_new_generations_atomically(tmp_path):
+    ids, vectors = _data(n=10)
+    store = MmapVectorStore(tmp_path, auto_refresh=None)
+    store.upsert(ids, vectors)
+    first = store.generation
+
+    # Re-upserting identical vectors does not write a new generation
+    store.upsert(ids, vectors)
+    assert store.generation == first
+
+    reader = MmapVectorStore(tmp_path, auto_refresh=None)
+    store.upsert(["doc_3", "doc_new"], np.ones((2, 8)))
+    store.delete(["doc_0"])
+
+    # The reader keeps its snapshot until it refreshes
+    assert reader.generation == first
+    assert len(reader) == 10
+
+    assert reader.refresh()
+    assert reader.generation == read_current(tmp_path) == store.generation
+    assert reader.ids == ids[1:] + ["doc_new"]
+    assert reader.search(np.ones(8), 2) == [("doc_3", 8.0), ("doc_new", 8.0)]
+
+    # Only the retention window of generations is kept on disk
+    assert len(list(tmp_path.glob("gen-*"))) == 2
+    assert not list(tmp_path.glob(".tmp-*"))
+
+
+def test_content_hashes_follow_the_rows(tmp_path):
+    ids, vectors = _data(n=10)
+    store = MmapVectorStore(tmp_path, auto_refresh=None)
+    store.upsert(ids, vectors)
+    assert store.content_hashes() == {}
+
+    # Same vectors, new hashes: published so a reopen can trust them
+    store.upsert(ids, vectors, hashes=[f"h{i}" for i in range(10)])
+    first = store.generation
+    store.upsert(ids[:2], vectors[:2], hashes=["h0", "h1"])
+    assert store.generation == first
+
+    store.upsert(["doc_3", "doc_new"], np.ones((2, 8)), hashes=["h3b", "hn"])
+    store.delete(["doc_5"])
+    expected = {f"doc_{i}": f"h{i}" for i in range(10) if i != 5} | {"doc_3": "h3b", "doc_new": "hn"}
+    assert MmapVectorStore(tmp_path).content_hashes() == expected
+
+    # Generations from before hashes were kept load without any
+    (tmp_path / store.generation / "hashes.txt").unlink()
+    assert MmapVectorStore(tmp_path).content_hashes() == {}
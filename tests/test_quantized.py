@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from app.vectorstore.memory import InMemoryVectorStore
+from app.vectorstore.quantized import QuantizedVectorStore
+from app.vectorstore.recall import recall_at_k
+
+
+def _low_rank(n, dim=32, rank=6, seed=0):
+    rng = np.random.default_rng(seed)
+    basis = np.random.default_rng(99).standard_normal((rank, dim))
+    x = rng.standard_normal((n, rank)) @ basis + 0.05 * rng.standard_normal((n, dim))
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.mark.parametrize(
+    "mode, rerank, bytes_per_vector, min_recall",
+    [
+        ("float16", 0, 64, 0.99),
+        ("int8", 0, 32, 0.95),
+        ("pq", 0, 8, 0.5),
+        ("pq", 50, 8 + 128, 0.99),
+    ],
+)
+def test_modes_recall_and_footprint(mode, rerank, bytes_per_vector, min_recall):
+    vectors, queries = _low_rank(3000), _low_rank(30, seed=1)
+    ids = [f"doc_{i}" for i in range(len(vectors))]
+
+    exact = InMemoryVectorStore()
+    exact.upsert(ids, vectors)
+    store = QuantizedVectorStore(mode=mode, rerank=rerank, pq_subspaces=8)
+    store.upsert(ids, vectors)
+
+    assert store.bytes_per_vector() == bytes_per_vector
+    truth = exact.search_batch(queries, 10)
+    assert recall_at_k(truth, store.search_batch(queries, 10), 10) >= min_recall
+    assert store.search(queries[0], 10) == store.search_batch(queries[:1], 10)[0]
+
+
+def test_rerank_returns_exact_scores_and_tracks_deletes():
+    vectors = _low_rank(500)
+    ids = [f"doc_{i}" for i in range(len(vectors))]
+    store = QuantizedVectorStore(mode="int8", rerank=20)
+    store.upsert(ids, vectors)
+    store.delete(["doc_0"])
+
+    results = store.search(vectors[0], 3)
+    assert "doc_0" not in [doc_id for doc_id, _ in results]
+    doc_id, value = results[0]
+    assert value == pytest.approx(float(vectors[int(doc_id[4:])] @ vectors[0]), abs=1e-5)
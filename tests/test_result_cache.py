@@ -0,0 +1,87 @@
+import pytest
+
+from app.core import policy_resolver
+from app.core.result_cache import ResultCache
+from app.retrieval.documents import Document, fingerprint
+from app.schemas.contracts import PolicyDecision, RiskLevel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResultCache(2, policy="lru")
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lfu_evicts_least_frequently_used_then_oldest():
+    cache = ResultCache(3, policy="lfu")
+    for key in "abc":
+        cache.put(key, key)
+    for _ in range(3):
+        cache.get("a")
+    cache.get("c")
+
+    cache.put("d", "d")  # b: 0 hits
+    assert cache.get("b") is None
+
+    cache.put("e", "e")  # d: 0 hits, newer than nothing else at 0
+    assert cache.get("d") is None
+    assert [cache.get(k) for k in "ace"] == ["a", "c", "e"]
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = ResultCache(10, ttl=5, policy="lfu", clock=clock)
+    cache.put("a", 1)
+
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+    # Expiry leaves the LFU bookkeeping consistent for later evictions
+    for i in range(20):
+        cache.put(i, i)
+    assert len(cache) == 10
+
+
+def test_zero_size_disables_cache():
+    cache = ResultCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ResultCache(1, policy="fifo")
+
+
+def test_version_stamps_track_policy_and_corpus_changes(monkeypatch):
+    before = policy_resolver.policy_version()
+    monkeypatch.setitem(
+        policy_resolver.POLICY_TABLE,
+        RiskLevel.LOW,
+        PolicyDecision(mode="normal", min_confidence=0.6, retrieval_required=True, generation_allowed=True),
+    )
+    assert policy_resolver.policy_version() != before
+
+    doc = Document(id="a", title="t", content="c", source="internal:x", reliability=0.5)
+    edited = Document(id="a", title="t", content="c2", source="internal:x", reliability=0.5)
+    assert fingerprint([doc]) == fingerprint([doc])
+    assert fingerprint([doc]) != fingerprint([edited])
+    assert fingerprint([doc]) != fingerprint([doc, edited])
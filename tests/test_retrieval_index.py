@@ -0,0 +1,183 @@
+import dataclasses
+
+import pytest
+
+from app.config import settings
+from app.embeddings import factory
+from app.retrieval.documents import Document
+from app.retrieval.filters import RetrievalFilter
+from app.retrieval.index import RetrievalIndex
+
+
+def _docs(n=200):
+    return [
+        Document(id=f"d{i}", title=f"d{i}", content=f"topic{i % 17} word{i} shared", source="test", reliability=1.0)
+        for i in range(n)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def hash_encoder(monkeypatch):
+    monkeypatch.setattr(
+        factory, "settings", dataclasses.replace(settings, embedding_backend="hash", embedding_cache_enabled=False)
+    )
+
+
+def test_updates_match_a_full_rebuild():
+    docs = _docs()
+    index = RetrievalIndex(docs)
+
+    edited = [dataclasses.replace(d, content=d.content + " edited") for d in docs[:10]]
+    added = [Document("new", "new", "topic3 brand new", "test", 1.0)]
+    assert sorted(index.upsert(edited + added + docs[10:20])) == sorted(d.id for d in edited + added)
+    assert index.delete(["d50", "missing"]) == ["d50"]
+    assert index.upsert(edited) == []  # unchanged content is not re-embedded
+
+    expected = RetrievalIndex([d for d in edited + docs[10:] + added if d.id != "d50"])
+    # Equal scores may come back in another order; compare every document's score
+    queries = ["topic3 edited", "word5", "brand new", "word50", "shared"]
+    for query in queries:
+        assert dict(index.search(query, 300)) == dict(expected.search(query, 300))
+        assert [s for _, s in index.search(query, 5)] == [s for _, s in expected.search(query, 5)]
+    batch, full = index.search_batch(queries, 300), expected.search_batch(queries, 300)
+    assert [dict(r) for r in batch] == [dict(r) for r in full]
+    assert len(index) == 200 and "d50" not in index
+
+
+def test_readers_keep_their_snapshot():
+    index = RetrievalIndex(_docs(20))
+    before = index._overlay
+    index.upsert([Document("d1", "d1", "changed", "test", 1.0)])
+
+    assert before.ids == () and index._overlay is not before
+    assert index.overlay_rows() == 1
+
+
+def _mixed(n=200):
+    return [
+        dataclasses.replace(d, source="internal:kb" if i % 3 else "web:forum", reliability=(i % 10) / 10)
+        for i, d in enumerate(_docs(n))
+    ]
+
+
+def test_filtered_search_matches_filtering_the_corpus_first():
+    docs = _mixed()
+    index = RetrievalIndex(docs)
+    # Updates and deletes go through the overlay and its masks
+    moved = [dataclasses.replace(d, source="web:forum", content=d.content + " moved") for d in docs[1:30:3]]
+    index.upsert(moved)
+    index.delete(["d2", "d4"])
+
+    live = [d for d in docs if d.id not in {"d2", "d4"} and d.id not in {m.id for m in moved}] + moved
+    filters = (RetrievalFilter(sources=("internal:*",)), RetrievalFilter(min_reliability=0.5))
+    allowed = [d for d in live if all(f.allows(d) for f in filters)]
+    expected = RetrievalIndex(allowed)
+
+    for query in ["topic3 shared", "word7 moved", "topic1"]:
+        got = index.search(query, 20, filters=filters)
+        assert [s for _, s in got] == [s for _, s in expected.search(query, 20)]
+        assert {d for d, _ in got} <= {d.id for d in allowed}
+    assert index.allowed_ids(filters) == {d.id for d in allowed}
+    assert index.search_batch(["topic3 shared"], 20, filters=filters)[0] == index.search("topic3 shared", 20, filters=filters)
+
+
+def test_strict_policy_only_retrieves_allowed_sources():
+    from app.core.policy_resolver import POLICY_TABLE
+    from app.retrieval import retriever
+    from app.retrieval.knowledge_base import KNOWLEDGE_BASE
+    from app.schemas.contracts import RiskLevel
+
+    strict, normal = POLICY_TABLE[RiskLevel.HIGH], POLICY_TABLE[RiskLevel.LOW]
+    docs = _mixed(60)
+    by_content = {d.content: d for d in docs}
+    retriever.set_knowledge_base(docs)
+    try:
+        for result in (
+            retriever.retrieve_context("topic3 shared", strict),
+            retriever.retrieve_context_batch(["topic3 shared", "topic3 shared"], [normal, strict])[1],
+        ):
+            assert result.candidate_count == 40
+            assert all(by_content[text].source == "internal:kb" for text in result.documents)
+
+        low = retriever.retrieve_context("topic3 shared", normal, filters=[RetrievalFilter(min_reliability=0.9)])
+        assert low.candidate_count == 6
+        assert retriever.retrieve_context("topic3 shared", normal).candidate_count == 60
+    finally:
+        retriever.set_knowledge_base(KNOWLEDGE_BASE)
+
+
+def test_metadata_only_updates_rewrite_the_filter_columns():
+    docs = _mixed(60)
+    index = RetrievalIndex(docs)
+    filters = (RetrievalFilter(sources=("internal:*",)), RetrievalFilter(min_reliability=0.5))
+    assert "d5" in index.allowed_ids(filters)
+
+    # d5 lives in the base rows, d7 in the overlay after a content edit
+    index.upsert([dataclasses.replace(docs[7], content=docs[7].content + " edited")])
+    assert "d7" in index.allowed_ids(filters)
+    overlay_rows = index.overlay_rows()
+
+    retagged = [
+        dataclasses.replace(docs[5], source="web:forum", reliability=0.1),
+        dataclasses.replace(docs[7], content=docs[7].content + " edited", reliability=0.1),
+        dataclasses.replace(docs[8], source="internal:kb", reliability=0.9),
+    ]
+    assert index.upsert(retagged) == []  # nothing re-embedded
+    assert index.overlay_rows() == overlay_rows
+
+    live = {d.id: d for d in docs} | {d.id: d for d in retagged}
+    allowed = {d.id for d in live.values() if all(f.allows(d) for f in filters)}
+    assert {"d5", "d7"}.isdisjoint(allowed) and "d8" in allowed
+    assert index.allowed_ids(filters) == allowed
+    assert {d for d, _ in index.search("topic5 word5 shared", 60, filters=filters)} <= allowed
+    assert index.upsert(retagged) == [] and index.allowed_ids(filters) == allowed
+
+
+def test_reopening_an_unchanged_snapshot_encodes_nothing(tmp_path, monkeypatch):
+    import contextlib
+
+    from app.retrieval import index as index_module
+    from app.vectorstore import factory as store_factory
+
+    monkeypatch.setattr(
+        store_factory, "settings", dataclasses.replace(settings, vector_store="mmap", vector_store_dir=str(tmp_path))
+    )
+    docs = _docs(50)
+    built = RetrievalIndex(docs)
+    generation = built.store.generation
+
+    encoded = []
+    real_lease = index_module.encoder_lease
+
+    @contextlib.contextmanager
+    def counting_lease(embedding_model=None):
+        with real_lease(embedding_model) as encoder:
+            class Counting:
+                def encode_documents(self, texts):
+                    encoded.extend(texts)
+                    return encoder.encode_documents(texts)
+
+            yield Counting()
+
+    def failing_lease(embedding_model=None):
+        raise AssertionError("an unchanged snapshot must not be re-encoded")
+
+    monkeypatch.setattr(index_module, "encoder_lease", failing_lease)
+    reopened = RetrievalIndex(docs)
+    assert reopened.store.generation == generation
+    assert reopened.store.content_hashes() == built.store.content_hashes()
+
+    # Only edited or added documents are encoded; removed ones are dropped
+    monkeypatch.setattr(index_module, "encoder_lease", counting_lease)
+    changed = [dataclasses.replace(docs[0], content="edited")] + docs[1:40] + [Document("new", "new", "new", "test", 1.0)]
+    RetrievalIndex(changed)
+    assert encoded == ["edited", "new"]
+
+    # Another model's vectors are not reused
+    monkeypatch.setattr(index_module, "encoder_key", lambda embedding_model=None: ("hash", "other-model"))
+    encoded.clear()
+    RetrievalIndex(changed)
+    assert len(encoded) == len(changed)
+
+    monkeypatch.setattr(index_module, "encoder_lease", real_lease)
+    assert dict(reopened.search("topic3 shared", 5))
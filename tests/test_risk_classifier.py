@@ -0,0 +1,102 @@
+import json
+import random
+import re
+import time
+
+import pytest
+
+from app.core import risk_classifier as rc
+from app.schemas.contracts import RiskAssessment, RiskCategory, RiskLevel
+
+
+def _reference(query: str) -> RiskAssessment:
+    """The original per-keyword regex classifier."""
+    def contains_any(q, keywords):
+        return any(re.search(rf"\b{k}\b", q) for k in keywords)
+
+    q = query.lower()
+    if contains_any(q, rc.POLICY_KEYWORDS):
+        return RiskAssessment(RiskCategory.POLICY, RiskLevel.HIGH)
+    if any(re.search(p, q) for p in rc.ADVICE_PATTERNS):
+        if contains_any(q, rc.FINANCIAL_KEYWORDS):
+            return RiskAssessment(RiskCategory.FINANCIAL, RiskLevel.HIGH)
+        return RiskAssessment(RiskCategory.GENERAL, RiskLevel.MEDIUM)
+    if contains_any(q, rc.MEDICAL_KEYWORDS):
+        return RiskAssessment(RiskCategory.MEDICAL, RiskLevel.HIGH)
+    if contains_any(q, rc.LEGAL_KEYWORDS):
+        return RiskAssessment(RiskCategory.LEGAL, RiskLevel.HIGH)
+    if contains_any(q, rc.FINANCIAL_KEYWORDS):
+        return RiskAssessment(RiskCategory.FINANCIAL, RiskLevel.MEDIUM)
+    return RiskAssessment(RiskCategory.GENERAL, RiskLevel.LOW)
+
+
+def _queries(n: int, seed: int = 0):
+    words = sorted(
+        rc.MEDICAL_KEYWORDS | rc.LEGAL_KEYWORDS | rc.FINANCIAL_KEYWORDS | rc.POLICY_KEYWORDS
+    ) + ["should", "i", "we", "one", "what", "do", "is", "it", "a", "good", "idea",
+         "investments", "lawful", "sued", "hacker", "taxes", "café", "über", "x_tax", "2tax"]
+    separators = [" ", "  ", "", ", ", "-", "_", "'", "\t", "\n", "?", ". ", "é"]
+    rng = random.Random(seed)
+
+    for _ in range(n):
+        parts = []
+        for _ in range(rng.randint(1, 8)):
+            word = rng.choice(words)
+            parts.append(word.upper() if rng.random() < 0.1 else word)
+            parts.append(rng.choice(separators))
+        yield "".join(parts)
+
+
+FIXED = [
+    "Should I invest in stocks?",
+    "should  i invest",
+    "is it a good idea to sue my landlord",
+    "What should I do about my symptom?",
+    "shouldn't i get a loan",
+    "should_i trade",
+    "How do I bypass the paywall?",
+    "Tell me about the court system",
+    "the investments were fine",
+    "What is the capital of France?",
+    "",
+]
+
+
+@pytest.mark.parametrize("query", FIXED)
+def test_matches_reference_on_fixed_queries(query):
+    assert rc.classify_risk(query) == _reference(query)
+
+
+def test_matches_reference_on_generated_queries():
+    for query in _queries(5000):
+        assert rc.classify_risk(query) == _reference(query), query
+
+
+def test_loaded_keywords_do_not_scale_query_cost(tmp_path, monkeypatch):
+    path = tmp_path / "keywords.json"
+    path.write_text(json.dumps({
+        "medical": [f"condition{i}" for i in range(5000)],
+        "legal": [f"statute {i}" for i in range(5000)],
+    }))
+
+    # Restore the built-in matcher afterwards
+    monkeypatch.setattr(rc, "_matcher", rc._matcher)
+    rc.load_keywords(path)
+
+    assert rc.classify_risk("is condition4321 serious").category == RiskCategory.MEDICAL
+    assert rc.classify_risk("what does statute 17 say").category == RiskCategory.LEGAL
+    assert rc.classify_risk("what does statute  17 say").category == RiskCategory.GENERAL
+
+    query = "what does the paperwork say about this " * 5
+    started = time.perf_counter()
+    for _ in range(1000):
+        rc.classify_risk(query)
+    # Thousands of regexes per query would take seconds
+    assert time.perf_counter() - started < 1.0
+
+
+def test_rejects_unknown_categories(tmp_path):
+    path = tmp_path / "keywords.json"
+    path.write_text(json.dumps({"weather": ["rain"]}))
+    with pytest.raises(ValueError):
+        rc.load_keywords(path)
@@ -0,0 +1,114 @@
+import dataclasses
+import multiprocessing as mp
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.embeddings import factory
+from app.embeddings.hashing import HashEmbeddingEncoder
+from app.retrieval.documents import Document
+from app.retrieval.index import RetrievalIndex, content_hash
+from app.vectorstore import factory as store_factory
+from app.vectorstore.memory import InMemoryVectorStore
+from app.vectorstore.shm_store import (
+    SharedMemoryVectorStore,
+    build_shared_index,
+    set_shared_index,
+    unlink_shared_index,
+)
+
+
+DIM = 32
+
+
+def _docs(n=100):
+    return [
+        Document(id=f"d{i}-ü", title="t", content=f"topic{i % 9} word{i}", source="test", reliability=1.0)
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def published():
+    docs = _docs()
+    handle = build_shared_index(
+        [d.id for d in docs],
+        [d.content for d in docs],
+        [content_hash(d.content) for d in docs],
+        HashEmbeddingEncoder(DIM),
+        f"lcp-test-{os.getpid()}",
+        dim=0,
+        batch_size=16,
+    )
+    yield docs, handle
+    unlink_shared_index(handle)
+
+
+def _search_in_child(handle, queries, out):
+    store = SharedMemoryVectorStore(handle)
+    out.put(store.search_batch(queries, 5))
+    store.close()
+
+
+def test_attached_store_matches_in_memory_store(published):
+    docs, handle = published
+    encoder = HashEmbeddingEncoder(DIM)
+    expected = InMemoryVectorStore()
+    expected.upsert([d.id for d in docs], encoder.encode([d.content for d in docs]))
+
+    store = SharedMemoryVectorStore(handle)
+    assert handle.dim == DIM and len(store) == 100
+    assert store.ids == [d.id for d in docs]
+    assert store.content_hashes()["d7-ü"] == content_hash("topic7 word7")
+
+    queries = np.asarray(encoder.encode(["topic3", "word42 topic1"]), dtype=np.float32)
+    assert store.search_batch(queries, 5) == expected.search_batch(queries, 5)
+    with pytest.raises(RuntimeError):
+        store.upsert(["x"], queries[:1])
+
+    # Another process attaches the same pages by name
+    out = mp.get_context("fork").Queue()
+    child = mp.get_context("fork").Process(target=_search_in_child, args=(handle, queries, out))
+    child.start()
+    assert out.get(timeout=30) == store.search_batch(queries, 5)
+    child.join()
+    store.close()
+
+
+def test_retrieval_index_overlays_only_changed_documents(published, monkeypatch):
+    docs, handle = published
+    monkeypatch.setattr(
+        factory, "settings", dataclasses.replace(settings, embedding_backend="hash", embedding_dim=DIM, embedding_cache_enabled=False)
+    )
+    monkeypatch.setattr(store_factory, "settings", dataclasses.replace(settings, vector_store="shared"))
+    set_shared_index(handle)
+    try:
+        edited = dataclasses.replace(docs[3], content="brand new text")
+        index = RetrievalIndex(docs[:3] + [edited] + docs[4:99])
+    finally:
+        set_shared_index(None)
+
+    assert index.overlay_rows() == 1
+    assert len(index) == 99 and docs[99].id not in index
+    assert index.search("brand new text", 1)[0][0] == docs[3].id
+    assert docs[99].id not in dict(index.search("topic0 word99", 100))
+
+
+def test_supervisor_builder_publishes_the_configured_corpus(monkeypatch):
+    from app.api.supervisor import Supervisor
+    from app.retrieval.knowledge_base import KNOWLEDGE_BASE
+
+    monkeypatch.setattr(
+        factory, "settings", dataclasses.replace(settings, embedding_backend="hash", embedding_cache_enabled=False)
+    )
+    supervisor = Supervisor(SimpleNamespace(), sock=None)
+    handle = supervisor._publish()
+    try:
+        store = SharedMemoryVectorStore(handle)
+        assert store.ids == [d.id for d in KNOWLEDGE_BASE]
+        store.close()
+    finally:
+        unlink_shared_index(handle)
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import app.main as main
+from app.core.singleflight import SingleFlight
+from app.schemas.contracts import RetrievalResult
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait()
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: flight.coalesced == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [("value", False)] + [("value", True)] * 4
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+    # Nothing is kept: the next call runs again
+    assert flight.do("k", lambda: "again") == ("again", False)
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait()
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", fail)
+        except ValueError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: flight.coalesced == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 3
+    assert flight.do("k", lambda: 1) == (1, False)
+
+
+def test_async_and_sync_callers_share_a_flight():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0)
+        sync = asyncio.get_running_loop().run_in_executor(None, flight.do, "k", lambda: "not run")
+        followers = [flight.ado("k", work) for _ in range(3)]
+        return await asyncio.gather(leader, sync, *followers)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [("value", False)] + [("value", True)] * 4
+
+
+def test_cancelled_leader_hands_over_to_a_follower():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+        return len(calls)
+
+    async def run():
+        leader = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == (2, False)
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """handle_request with counted, blockable retrieval and a captured audit log."""
+    release = threading.Event()
+    retrievals, records = [], []
+
+    def retrieve(query, policy, embedding_model=None):
+        retrievals.append(query)
+        release.wait(5)
+        return RetrievalResult(documents=[], retrieval_score=0.0, candidate_count=0)
+
+    async def aretrieve(query, policy, embedding_model=None):
+        retrievals.append(query)
+        await asyncio.sleep(0.05)
+        return RetrievalResult(documents=[], retrieval_score=0.0, candidate_count=0)
+
+    async def aaudit(**record):
+        records.append(record)
+
+    monkeypatch.setattr(main, "knowledge_base_version", lambda: "kb")
+    monkeypatch.setattr(main, "retrieve_context", retrieve)
+    monkeypatch.setattr(main, "retrieve_context_async", aretrieve)
+    monkeypatch.setattr(main, "audit_log", lambda **record: records.append(record))
+    monkeypatch.setattr(main, "audit_log_async", aaudit)
+    monkeypatch.setattr(main, "_inflight", SingleFlight())
+    main.clear_result_cache()
+    yield release, retrievals, records
+    main.clear_result_cache()
+
+
+def test_burst_of_identical_requests_runs_retrieval_once(pipeline):
+    release, retrievals, records = pipeline
+    responses = []
+    threads = [
+        threading.Thread(target=lambda: responses.append(main.handle_request("what is a burst?  ")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: main._inflight.coalesced == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert retrievals == ["what is a burst?  "]
+    assert len({r["request_id"] for r in responses}) == 4
+    assert sorted(r["coalesced"] for r in records) == [False, True, True, True]
+    assert len({r["request_id"] for r in records}) == 4
+
+
+def test_async_requests_are_coalesced(pipeline):
+    _, retrievals, records = pipeline
+
+    async def burst():
+        return await asyncio.gather(*(main.handle_request_async("what is a burst?") for _ in range(4)))
+
+    responses = asyncio.run(burst())
+    assert len(retrievals) == 1
+    assert len({r["request_id"] for r in responses}) == 4
+    assert sum(r["coalesced"] for r in records) == 3
+
+    # Later requests are result cache hits, not coalesced ones
+    asyncio.run(main.handle_request_async("what is a burst?"))
+    assert records[-1]["cache_hit"] and not records[-1]["coalesced"]
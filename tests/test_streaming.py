@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import app.api.server as server
+import app.main as main
+from app.schemas.contracts import RetrievalResult
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Streaming pipeline with canned retrieval; audit records are collected."""
+    records = []
+
+    async def retrieve(query, policy, embedding_model=None):
+        return RetrievalResult(documents=["AI is the study of agents.", "More on AI."], retrieval_score=0.8, candidate_count=2)
+
+    async def audit(**record):
+        records.append(record)
+
+    monkeypatch.setattr(main, "knowledge_base_version", lambda: "kb")
+    monkeypatch.setattr(main, "retrieve_context_async", retrieve)
+    monkeypatch.setattr(main, "audit_log_async", audit)
+    main.clear_result_cache()
+    yield records
+    main.clear_result_cache()
+
+
+def _collect(query):
+    async def run():
+        stream = main.StreamedRequest(query)
+        events = []
+        async for event, data in stream.events():
+            events.append((event, data))
+            # Nothing is audited until the consumer has taken every event
+            assert not stream.task.done()
+        await stream.task
+        return events
+
+    return asyncio.run(run())
+
+
+def test_events_follow_the_stages_and_match_the_response(pipeline):
+    events = _collect("what is AI")
+
+    assert [event for event, _ in events] == [
+        "risk", "policy", "retrieval", "confidence", "decision", "answer", "done",
+    ]
+    response = events[-1][1]
+    assert events[0][1]["request_id"] == response["request_id"]
+    assert events[5][1]["answer"] == response["answer"] == "AI is the study of agents."
+    assert response["status"] == "ALLOW" and response["evidence_count"] == 2
+
+    (record,) = pipeline
+    assert record["request_id"] == response["request_id"] and record["response"] == response
+
+
+def test_abstentions_end_at_the_decision(pipeline):
+    events = _collect("how to hack a bank")
+
+    assert [event for event, _ in events] == ["risk", "policy", "retrieval", "confidence", "decision", "done"]
+    assert events[-1][1]["reason_code"] == "policy_block"
+    assert pipeline[0]["retrieval"]["candidate_count"] == 0
+
+
+def test_a_consumer_that_leaves_early_still_gets_audited(pipeline):
+    async def run():
+        stream = main.StreamedRequest("what is AI")
+        events = stream.events()
+        assert (await events.__anext__())[0] == "risk"
+        await events.aclose()
+        await stream.task
+
+    asyncio.run(run())
+    assert len(pipeline) == 1 and pipeline[0]["decision"]["decision"] == "ALLOW"
+
+
+def test_api_streams_server_sent_events(pipeline, monkeypatch):
+    monkeypatch.setattr(server, "_warm_up", lambda: None)
+    with TestClient(server.app) as client:
+        with client.stream("POST", "/query/stream", json={"query": "what is AI"}) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            body = "".join(response.iter_text())
+
+    messages = [block.split("\n") for block in body.strip().split("\n\n")]
+    events = [(lines[0].removeprefix("event: "), json.loads(lines[1].removeprefix("data: "))) for lines in messages]
+    assert [event for event, _ in events][:2] == ["risk", "policy"]
+    assert events[-1][0] == "done" and events[-1][1]["status"] == "ALLOW"
+    assert len(pipeline) == 1
+    assert server._admission.stats() == {"active": 0, "queued": 0}
+
+
+def _endpoint_request():
+    return Request({"type": "http", "app": server.app, "headers": [], "client": ("127.0.0.1", 1)})
+
+
+def test_a_body_that_is_never_read_is_still_audited_and_frees_its_slot(pipeline, monkeypatch):
+    monkeypatch.setattr(main.StreamedRequest, "send_timeout", 0.05)
+
+    async def run():
+        done = asyncio.get_running_loop().create_future()
+        done.set_result(None)
+        monkeypatch.setattr(server.app.state, "warmup", done, raising=False)
+
+        payload = server.QueryRequest(query="what is AI")
+        # Neither the body nor the background task runs: the deadline audits it
+        await server.query_stream(payload, _endpoint_request(), None, None)
+        assert server._admission.stats()["active"] == 1
+        await asyncio.gather(*main._streams)
+        assert server._admission.stats() == {"active": 0, "queued": 0}
+
+        # The response's background task audits without waiting for the deadline
+        monkeypatch.setattr(main.StreamedRequest, "send_timeout", 60)
+        response = await server.query_stream(payload, _endpoint_request(), None, None)
+        await asyncio.sleep(0.01)
+        await response.background()
+        await asyncio.wait_for(asyncio.gather(*main._streams), 1)
+        assert server._admission.stats() == {"active": 0, "queued": 0}
+
+        def broken(*args):
+            raise RuntimeError("no stream")
+
+        monkeypatch.setattr(server, "StreamedRequest", broken)
+        with pytest.raises(RuntimeError):
+            await server.query_stream(payload, _endpoint_request(), None, None)
+        assert server._admission.stats() == {"active": 0, "queued": 0}
+
+    asyncio.run(run())
+    assert len(pipeline) == 2
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.vectorstore.memory import InMemoryVectorStore
+
+
+def reference_search(vectors: dict, query, k):
+    q = np.array(query, dtype=np.float32)
+    scores = [(doc_id, float(np.dot(q, v))) for doc_id, v in vectors.items()]
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return scores[:k]
+
+
+def test_rankings_match_reference():
+    rng = np.random.default_rng(0)
+    ids = [f"doc_{i}" for i in range(500)]
+    vectors = rng.standard_normal((500, 16)).astype(np.float32)
+    # duplicated rows force ties at every k boundary
+    vectors[250:] = vectors[:250]
+
+    store = InMemoryVectorStore(capacity=8)
+    store.upsert(ids[:100], vectors[:100])
+    store.upsert(ids[100:], vectors[100:])
+
+    reference = dict(zip(ids, vectors))
+    for _ in range(20):
+        query = rng.standard_normal(16)
+        for k in (1, 7, 250, 500, 900):
+            got = store.search(query, k)
+            expected = reference_search(reference, query, k)
+            assert [d for d, _ in got] == [d for d, _ in expected]
+            assert np.allclose([s for _, s in got], [s for _, s in expected], atol=1e-5)
+
+
+def test_upsert_replaces_in_place_and_delete_compacts():
+    store = InMemoryVectorStore()
+    store.upsert(["a", "b", "c"], [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+    store.upsert(["b", "d", "d"], [[2.0, 0.0], [9.0, 9.0], [0.5, 0.0]])
+
+    assert store.ids == ["a", "b", "c", "d"]
+    assert store.search([1.0, 0.0], 2) == [("b", 2.0), ("a", 1.0)]
+
+    store.delete(["a", "missing"])
+    assert store.ids == ["b", "c", "d"]
+    assert len(store) == 3
+    assert [d for d, _ in store.search([1.0, 0.0], 10)] == ["b", "c", "d"]
+
+
+def test_empty_store_and_non_positive_k():
+    store = InMemoryVectorStore()
+    assert store.search([1.0], 3) == []
+
+    store.upsert(["a"], [[1.0]])
+    assert store.search([1.0], 0) == []
+
+
+def test_search_batch_matches_single_query_exactly():
+    rng = np.random.default_rng(1)
+    store = InMemoryVectorStore()
+    store.upsert([f"doc_{i}" for i in range(2000)], rng.standard_normal((2000, 32)))
+
+    queries = rng.standard_normal((17, 32))
+    batched = store.search_batch(queries, 25)
+
+    assert len(batched) == 17
+    for query, results in zip(queries, batched):
+        assert results == store.search(query, 25)
+
+    assert store.search_batch([], 5) == []
+    assert InMemoryVectorStore().search_batch(queries[:2], 5) == [[], []]
+
+
+def test_masked_search_matches_filtered_reference(tmp_path):
+    from app.vectorstore.ivf import IVFVectorStore
+    from app.vectorstore.mmap_store import MmapVectorStore
+    from app.vectorstore.quantized import QuantizedVectorStore
+
+    rng = np.random.default_rng(1)
+    ids = [f"doc_{i}" for i in range(300)]
+    vectors = rng.standard_normal((300, 16)).astype(np.float32)
+    mask = rng.random(300) < 0.3
+    queries = rng.standard_normal((4, 16)).astype(np.float32)
+
+    stores = [
+        InMemoryVectorStore(),
+        QuantizedVectorStore(mode="float16"),
+        IVFVectorStore(nlist=4, nprobe=4, exact_threshold=0),
+        MmapVectorStore(tmp_path, auto_refresh=None),
+    ]
+    for store in stores:
+        store.upsert(ids, vectors)
+        if isinstance(store, IVFVectorStore):
+            store.train()
+
+        assert store.ids == ids  # the mask is aligned with these rows
+        allowed = {doc_id: v for doc_id, v, keep in zip(ids, vectors, mask) if keep}
+        for query, hits in zip(queries, store.search_batch(queries, 10, mask)):
+            assert [d for d, _ in hits] == [d for d, _ in reference_search(allowed, query, 10)]
+
+    with pytest.raises(ValueError):
+        stores[0].search_batch(queries, 10, mask[:-1])